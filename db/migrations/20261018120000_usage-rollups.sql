@@ -0,0 +1,32 @@
+-- migrate:up
+-- Per-user hourly and daily usage totals, maintained by the application as usage is written
+CREATE TABLE "usage_hourly" (
+    "user_id" INTEGER NOT NULL REFERENCES "user"("id") ON DELETE CASCADE,
+    "bucket" TIMESTAMP WITH TIME ZONE NOT NULL,
+    "characters_used" BIGINT NOT NULL DEFAULT 0,
+    "requests" BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY ("user_id", "bucket")
+);
+
+CREATE TABLE "usage_daily" (
+    "user_id" INTEGER NOT NULL REFERENCES "user"("id") ON DELETE CASCADE,
+    "bucket" DATE NOT NULL,
+    "characters_used" BIGINT NOT NULL DEFAULT 0,
+    "requests" BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY ("user_id", "bucket")
+);
+
+-- Backfill from the existing raw usage
+INSERT INTO "usage_hourly" ("user_id", "bucket", "characters_used", "requests")
+SELECT "user_id", date_trunc('hour', "created_at", 'UTC'), SUM("characters_used"), COUNT(*)
+FROM "usage"
+GROUP BY 1, 2;
+
+INSERT INTO "usage_daily" ("user_id", "bucket", "characters_used", "requests")
+SELECT "user_id", ("created_at" AT TIME ZONE 'UTC')::date, SUM("characters_used"), COUNT(*)
+FROM "usage"
+GROUP BY 1, 2;
+
+-- migrate:down
+DROP TABLE IF EXISTS "usage_daily";
+DROP TABLE IF EXISTS "usage_hourly";
@@ -0,0 +1,35 @@
+-- migrate:up
+-- Change log consumed by the in-memory user directory
+CREATE TABLE "user_change" (
+    "id" BIGSERIAL PRIMARY KEY,
+    "user_id" INTEGER NOT NULL,
+    "operation" VARCHAR NOT NULL,
+    "created_at" TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX "idx_user_change_user_id" ON "user_change" ("user_id");
+
+CREATE FUNCTION "log_user_change"() RETURNS TRIGGER AS $$
+DECLARE
+    change_id BIGINT;
+BEGIN
+    INSERT INTO "user_change" ("user_id", "operation")
+    VALUES (COALESCE(NEW."id", OLD."id"), TG_OP)
+    RETURNING "id" INTO change_id;
+
+    -- User writes are rare, so the log is pruned here rather than by a separate job
+    DELETE FROM "user_change" WHERE "created_at" < CURRENT_TIMESTAMP - INTERVAL '7 days';
+
+    PERFORM pg_notify('user_changes', change_id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "user_change_trigger"
+AFTER INSERT OR UPDATE OR DELETE ON "user"
+FOR EACH ROW EXECUTE FUNCTION "log_user_change"();
+
+-- migrate:down
+DROP TRIGGER IF EXISTS "user_change_trigger" ON "user";
+DROP FUNCTION IF EXISTS "log_user_change"();
+DROP TABLE IF EXISTS "user_change";
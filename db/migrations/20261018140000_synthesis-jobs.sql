@@ -0,0 +1,24 @@
+-- migrate:up
+-- Long-text synthesis jobs, run in the background; the audio itself is written to the jobs directory
+CREATE TABLE "synthesis_job" (
+    "id" VARCHAR PRIMARY KEY,
+    "user_id" INTEGER NOT NULL REFERENCES "user"("id") ON DELETE CASCADE,
+    "voice" VARCHAR NOT NULL,
+    "format" VARCHAR NOT NULL,
+    "text" TEXT NOT NULL,
+    "status" VARCHAR NOT NULL,
+    "chunks_total" INTEGER NOT NULL DEFAULT 0,
+    "chunks_done" INTEGER NOT NULL DEFAULT 0,
+    "error" VARCHAR,
+    "created_at" TIMESTAMP NOT NULL,
+    "updated_at" TIMESTAMP NOT NULL,
+    "completed_at" TIMESTAMP
+);
+
+CREATE INDEX "idx_synthesis_job_user_id" ON "synthesis_job" ("user_id");
+CREATE INDEX "idx_synthesis_job_status" ON "synthesis_job" ("status", "updated_at");
+
+-- migrate:down
+DROP INDEX IF EXISTS "idx_synthesis_job_status";
+DROP INDEX IF EXISTS "idx_synthesis_job_user_id";
+DROP TABLE IF EXISTS "synthesis_job";
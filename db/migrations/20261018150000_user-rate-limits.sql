@@ -0,0 +1,6 @@
+-- migrate:up
+-- Per-user character rate limit, e.g. '10000/minute'; NULL uses the configured default
+ALTER TABLE "user" ADD COLUMN "rate_limit" VARCHAR;
+
+-- migrate:down
+ALTER TABLE "user" DROP COLUMN IF EXISTS "rate_limit";
@@ -0,0 +1,6 @@
+-- migrate:up
+-- Identifies the worker currently running a job, so a worker presumed dead cannot overwrite its successor
+ALTER TABLE "synthesis_job" ADD COLUMN "claim_token" VARCHAR;
+
+-- migrate:down
+ALTER TABLE "synthesis_job" DROP COLUMN IF EXISTS "claim_token";
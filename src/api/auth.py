@@ -3,10 +3,13 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import SecretStr
 from sqlmodel import select
 
-from src.cache import TTLCache
+from src.cache import Cache
 from src.configuration import Configuration
 from src.database import Database
-from src.models.user import User
+from src.models.user import User, token_key
+from src.singleflight import SingleFlight
+from src.timing import timed
+from src.user_directory import UserDirectory
 
 
 security = HTTPBearer(auto_error=False)
@@ -38,8 +41,12 @@ async def get_current_user(
     token: SecretStr | None = None,
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
 ) -> User:
-    ttl_cache: TTLCache[User] = request.app.state.ttl_cache
-    api_token = credentials.credentials if credentials else token
+    with timed("auth"):
+        return await authenticate(request, credentials.credentials if credentials else token)
+
+
+async def authenticate(request: Request, api_token: str | SecretStr | None) -> User:
+    ttl_cache: Cache[User] = request.app.state.ttl_cache
 
     if not api_token:
         raise HTTPException(
@@ -49,24 +56,52 @@ async def get_current_user(
 
     api_token = SecretStr(api_token) if not isinstance(api_token, SecretStr) else api_token
 
-    if cached_user := await ttl_cache.get(api_token.get_secret_value()):
+    key = token_key(api_token.get_secret_value())
+    directory: UserDirectory | None = request.app.state.user_directory
+
+    # With the directory enabled every known user is in memory. A miss still falls through to the database,
+    # since a user created moments ago on another worker may not have reached this one yet.
+    if directory is not None and (user := directory.get(key)):
+        return user
+
+    if cached_user := await ttl_cache.get(key):
         return cached_user
 
-    database: Database = request.app.state.database
+    # Tokens that were recently rejected are rejected again without touching the database
+    rejected_tokens: Cache[bool] = request.app.state.rejected_tokens
 
-    async with database.get_session() as session:
-        result = await session.exec(
-            select(User)
-                .where(User.api_token == api_token.get_secret_value())
+    if await rejected_tokens.get(key):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API token",
         )
 
-        user = result.one_or_none()
+    database: Database = request.app.state.database
+    flights: SingleFlight[User | None] = request.app.state.user_flights
 
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid API token",
+    async def load_user() -> User | None:
+        async with database.get_session() as session:
+            result = await session.exec(
+                select(User)
+                    .where(User.api_token == api_token.get_secret_value())
             )
 
-    await ttl_cache.set(api_token.get_secret_value(), user)
+            user = result.one_or_none()
+
+        if user:
+            await ttl_cache.set(key, user)
+        else:
+            await rejected_tokens.set(key, True)
+
+        return user
+
+    # Concurrent requests with the same token share a single database lookup
+    user = await flights.do(key, load_user)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API token",
+        )
+
     return user
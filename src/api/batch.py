@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+import datetime
+import json
+import secrets
+from typing import AsyncIterator
+import zipfile
+
+
+@dataclass
+class BatchResult:
+    index: int
+    filename: str
+    media_type: str
+    audio: bytes | None = None
+
+    # Set instead of `audio` when the item failed
+    status_code: int | None = None
+    detail: str | None = None
+
+
+class _ZipBuffer:
+    """
+    Write-only file handed to `zipfile`. It is not seekable, so `zipfile` streams each entry followed by a
+    data descriptor, and everything written can be sent as soon as an entry is complete.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.buffer.extend(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        chunk = bytes(self.buffer)
+        self.buffer.clear()
+        return chunk
+
+
+def _error(result: BatchResult) -> dict:
+    return {"index": result.index, "status_code": result.status_code, "detail": result.detail}
+
+
+def multipart_boundary() -> str:
+    return secrets.token_hex(16)
+
+
+async def multipart_stream(results: AsyncIterator[BatchResult], boundary: str) -> AsyncIterator[bytes]:
+    """
+    Encode results as `multipart/mixed` parts, in the order they complete. Each part is named after the
+    index of its item; failed items are sent as JSON parts carrying an `X-Status-Code` header.
+    """
+    async for result in results:
+        if result.audio is not None:
+            headers = f"Content-Type: {result.media_type}\r\n"
+            body = result.audio
+        else:
+            headers = f"Content-Type: application/json\r\nX-Status-Code: {result.status_code}\r\n"
+            body = json.dumps(_error(result)).encode()
+
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: attachment; name="{result.index}"; filename="{result.filename}"\r\n'
+            f"{headers}"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode() + body + b"\r\n"
+
+    yield f"--{boundary}--\r\n".encode()
+
+
+async def zip_stream(results: AsyncIterator[BatchResult]) -> AsyncIterator[bytes]:
+    """
+    Encode results as a zip archive, streamed one entry at a time in the order they complete. Audio is
+    already compressed, so entries are stored; failed items are listed in a final `errors.json`.
+    """
+    buffer = _ZipBuffer()
+    errors: list[dict] = []
+
+    def entry(name: str) -> zipfile.ZipInfo:
+        return zipfile.ZipInfo(name, date_time=datetime.datetime.now().timetuple()[:6])
+
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        async for result in results:
+            if result.audio is None:
+                errors.append(_error(result))
+                continue
+
+            archive.writestr(entry(result.filename), result.audio)
+            yield buffer.drain()
+
+        if errors:
+            archive.writestr(entry("errors.json"), json.dumps(sorted(errors, key=lambda error: error["index"])))
+
+    yield buffer.drain()
@@ -0,0 +1,119 @@
+import re
+
+from fastapi import Request, Response, status
+
+
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def etag_for(cache_key: str) -> str:
+    # The cache key is a digest of everything that determines the audio, so it is a strong validator
+    return f'"{cache_key}"'
+
+
+def matches_etag(header: str | None, etag: str) -> bool:
+    """
+    Whether an `If-None-Match` header matches the ETag. Comparison is weak, as RFC 9110 requires for
+    `If-None-Match`, so a `W/` prefix added by an intermediary still matches.
+    """
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in header.split(",")
+    )
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single `bytes` range into inclusive (first, last) offsets. Returns None when the whole
+    representation should be sent instead: no header, a syntax we do not handle, or several ranges.
+    Raises `RangeNotSatisfiable` if the range lies entirely past the end of the audio.
+    """
+    if not header:
+        return None
+
+    match = BYTE_RANGE.match(header.strip().replace(" ", ""))
+
+    if match is None:
+        return None
+
+    first, last = match.groups()
+
+    if not first and not last:
+        return None
+
+    if size == 0:
+        raise RangeNotSatisfiable()
+
+    # Suffix range, e.g. "bytes=-500" is the final 500 bytes
+    if not first:
+        length = int(last)
+
+        if length == 0:
+            raise RangeNotSatisfiable()
+
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+
+    if end < start:
+        return None
+
+    return start, end
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={name: value for name, value in headers.items() if name in ("Cache-Control", "ETag", "Vary")},
+    )
+
+
+def audio_response(
+    request: Request,
+    content: bytes,
+    media_type: str,
+    headers: dict[str, str],
+) -> Response:
+    """
+    Respond with complete audio, honouring `Range` (and `If-Range`) so players can seek without
+    downloading the whole file again.
+    """
+    headers = {**headers, "Accept-Ranges": "bytes"}
+
+    # A range only applies to the representation the client already has part of
+    if_range = request.headers.get("if-range")
+    range_header = request.headers.get("range") if if_range in (None, headers.get("ETag")) else None
+
+    try:
+        byte_range = parse_range(range_header, len(content))
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{len(content)}"},
+        )
+
+    if byte_range is None:
+        return Response(content=content, media_type=media_type, headers=headers)
+
+    first, last = byte_range
+
+    return Response(
+        content=content[first:last + 1],
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers={**headers, "Content-Range": f"bytes {first}-{last}/{len(content)}"},
+    )
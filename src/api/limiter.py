@@ -1,32 +1,235 @@
-from fastapi import Request
-from slowapi import Limiter
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+import logging
+import math
+import time
+from typing import Protocol
+
+from fastapi import HTTPException, Request, status
+from limits import RateLimitItem, parse
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
 from src.configuration import Configuration
+from src.models.user import User
+from src.timing import timed
+
+
+logger = logging.getLogger(__name__)
+
+
+# KEYS[1] is the bucket; ARGV is capacity, period (ms) and cost. The clock is the server's, so every worker
+# and replica agrees on how much a bucket has refilled. Mirrors `take` below.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(now - updated, 0) * capacity / period)
+
+local allowed = 0
+local retry_after = 0
+local needed = math.min(cost, capacity)
+
+if tokens >= needed then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((needed - tokens) * period / capacity)
+end
+
+local reset_after = math.ceil((capacity - tokens) * period / capacity)
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.max(reset_after, 1))
+
+return {allowed, math.floor(tokens), retry_after, reset_after}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    allowed: bool
+    limit: int
+    remaining: int
+
+    # Milliseconds until the request would be allowed, and until the bucket is full again
+    retry_after: int = 0
+    reset_after: int = 0
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(self.remaining, 0)),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after / 1000)),
+        }
+
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after / 1000))
+
+        return headers
+
+
+def take(tokens: float, elapsed: float, capacity: int, period: int, cost: int) -> tuple[bool, float, int, int]:
+    """
+    Refill a bucket holding `tokens` after `elapsed` milliseconds and try to take `cost` from it. Returns
+    whether the request is allowed, the tokens left, and the milliseconds until it would be allowed and
+    until the bucket is full again.
+
+    A request costing more than the whole bucket is allowed once the bucket is full and leaves it in debt,
+    so long texts are throttled for as long as they would take to refill rather than refused outright.
+    """
+    tokens = min(capacity, tokens + max(elapsed, 0) * capacity / period)
+    needed = min(cost, capacity)
+
+    if tokens >= needed:
+        tokens -= cost
+        return True, tokens, 0, math.ceil((capacity - tokens) * period / capacity)
+
+    retry_after = math.ceil((needed - tokens) * period / capacity)
+    return False, tokens, retry_after, math.ceil((capacity - tokens) * period / capacity)
+
+
+class RateLimiter(Protocol):
+    """
+    Character-cost token buckets, one per user. A bucket holds up to a limit's amount and refills evenly
+    over its period, so `2048/minute` allows a burst of 2048 characters and then 2048 more each minute.
+    """
+
+    async def charge(self, key: str, limit: RateLimitItem, cost: int) -> RateLimit:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+class MemoryRateLimiter:
+    """
+    Token buckets held by this worker alone, so each worker enforces the limit separately. Used when there
+    is no shared backend, and as the fallback while Redis is unavailable.
+
+    There is one bucket per user, so buckets are never evicted.
+    """
+
+    def __init__(self) -> None:
+        # key -> (tokens, updated at in monotonic milliseconds)
+        self.buckets: dict[str, tuple[float, float]] = {}
+
+    async def charge(self, key: str, limit: RateLimitItem, cost: int) -> RateLimit:
+        now = time.monotonic() * 1000
+        capacity, period = limit.amount, limit.get_expiry() * 1000
+
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        allowed, tokens, retry_after, reset_after = take(tokens, now - updated, capacity, period, cost)
+
+        self.buckets[key] = (tokens, now)
+
+        return RateLimit(allowed, capacity, math.floor(tokens), retry_after, reset_after)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisRateLimiter:
+    """
+    Token buckets in a Redis-protocol server, shared by every worker and replica.
+
+    Each charge is a single `EVALSHA` round trip: the script refills, checks and debits the bucket atomically
+    on the server. If Redis is unavailable the failure is logged and this worker falls back to its own
+    buckets, so limits are still enforced (per worker) rather than requests failing.
+    """
+
+    def __init__(self, client: Redis, prefix: str = "tts:ratelimit:") -> None:
+        self.client = client
+        self.prefix = prefix
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.fallback = MemoryRateLimiter()
+
+    @classmethod
+    def from_url(cls, url: str, max_connections: int = 64, **kwargs) -> RedisRateLimiter:
+        client = Redis.from_url(
+            url,
+            max_connections=max_connections,
+            decode_responses=False,
+        )
+
+        return cls(client, **kwargs)
+
+    async def charge(self, key: str, limit: RateLimitItem, cost: int) -> RateLimit:
+        capacity, period = limit.amount, limit.get_expiry() * 1000
+
+        try:
+            allowed, remaining, retry_after, reset_after = await self.script(
+                keys=[f"{self.prefix}{key}"],
+                args=[capacity, period, cost],
+            )
+        except RedisError:
+            logger.exception("Failed to charge the shared rate limit")
+            return await self.fallback.charge(key, limit, cost)
+
+        return RateLimit(bool(allowed), capacity, int(remaining), int(retry_after), int(reset_after))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+@lru_cache(maxsize=None)
+def parse_limit(value: str) -> RateLimitItem:
+    return parse(value)
+
 
+def limit_for(user: User) -> RateLimitItem:
+    # A user's own limit replaces the default entirely
+    return parse_limit(user.rate_limit or Configuration.get().maximum_characters_per_minute)
 
-def by_api_token(request: Request) -> str:
-    api_token = request.query_params.get("token")
-    api_token = api_token or request.headers.get("Authorization")
 
-    if api_token and api_token.startswith('Bearer '):
-        api_token = api_token.split('Bearer ')[1].strip()
+def character_cost(characters: int, cached: bool = False) -> int:
+    # Cached audio needs no synthesis, so it only costs a fraction of its characters
+    if cached:
+        return math.ceil(characters * Configuration.get().rate_limit_cache_hit_ratio)
 
-    if not api_token:
-        return request.client.host if request.client and request.client.host else "127.0.0.1"
+    return characters
 
-    return api_token
 
+async def charge_characters(
+    request: Request,
+    user: User,
+    characters: int,
+    cached: int = 0,
+    bucket: str | None = None,
+) -> dict[str, str]:
+    """
+    Charge `characters` against the user's rate limit, of which `cached` are served from the cache at the
+    cheaper rate, returning the rate limit headers for the response. Raises a 429, carrying `Retry-After`,
+    when the user has run out.
 
-def get_character_cost(text: str | None = None) -> int:
-    return len(text if text else '')
+    `bucket` names a separate bucket of the same limit, so that work charged in bulk (e.g. a long-text job)
+    does not drain the one that interactive requests draw on.
 
+    Call this once the cache has been checked, so cache hits are charged as such.
+    """
+    limiter: RateLimiter = request.app.state.rate_limiter
+    cost = character_cost(characters - cached) + character_cost(cached, cached=True)
+    key = str(user.id) if bucket is None else f"{user.id}:{bucket}"
 
-def callable_rate_limit() -> str:
-    return (
-        Configuration
-            .get()
-            .maximum_characters_per_minute
-    )
+    with timed("ratelimit"):
+        result = await limiter.charge(key, limit_for(user), cost)
 
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers=result.headers,
+        )
 
-limiter = Limiter(key_func=by_api_token)
+    return result.headers
@@ -1,95 +1,673 @@
-from typing import TypeVar
+from __future__ import annotations
+from typing import Any, Callable, Iterator, Protocol, TypeVar
 
 import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
 from dataclasses import dataclass
+import hashlib
+import heapq
+import logging
+import math
+import os
+from pathlib import Path
+import sqlite3
+import sys
+import time
+import uuid
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
 
 T = TypeVar("T")
 
 
+logger = logging.getLogger(__name__)
+
+
+def sizeof(value: object) -> int:
+    """
+    Approximate the in-memory footprint of a cached value.
+
+    Bytes-like values (audio) are measured by their payload length; anything else falls back to
+    `sys.getsizeof`, which is shallow but good enough for accounting purposes.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+
+    return sys.getsizeof(value)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class Cache[T](Protocol):
+    """
+    Common interface implemented by every cache backend (in-memory, disk and Redis) and by `TieredCache`.
+    """
+
+    async def get(self, key: str) -> T | None:
+        ...
+
+    async def set(self, key: str, value: T) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+async def get_many[T](cache: Cache[T], keys: list[str]) -> list[T | None]:
+    """
+    Look up several keys at once: in a single round trip for backends that support it (Redis), otherwise
+    concurrently.
+    """
+    if hasattr(cache, "get_many"):
+        return await cache.get_many(keys)
+
+    return list(await asyncio.gather(*[cache.get(key) for key in keys]))
+
+
 @dataclass
 class CacheEntry[T]:
     value: T
     timestamp: float
+    size: int = 0
+    expires_at: float = math.inf
 
 
 class LRUCache[T]:
+    """
+    Least-recently-used cache with O(1) lookups, insertions and evictions.
+
+    Entries are kept in an `OrderedDict` in recency order; the least recently used entry is always at the
+    front. The cache can be bounded by entry count (`max_size`), by total bytes (`max_bytes`) or both, and
+    values larger than `max_entry_bytes` are never cached.
+
+    No lock is taken: the cache is only used from the event loop and no operation awaits part way through,
+    so every `get` and `set` already runs atomically.
+    """
+
     def __init__(
         self,
-        max_size: int = 128,
+        max_size: int | None = 128,
+        max_bytes: int | None = None,
+        max_entry_bytes: int | None = None,
+        sizeof: Callable[[T], int] = sizeof,
     ) -> None:
         self.max_size = max_size
-        self.cache: dict[str, CacheEntry[T]] = {}
-        self.lock = asyncio.Lock()
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.sizeof = sizeof
 
-    async def get(self, key: str) -> T | None:
-        async with self.lock:
-            entry = self.cache.get(key)
+        self.cache: OrderedDict[str, CacheEntry[T]] = OrderedDict()
+        self.current_bytes: int = 0
 
-            if entry:
-                entry.timestamp = (
-                    asyncio
-                        .get_running_loop()
-                        .time()
-                )
+        # Plain counters, read when metrics are collected
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
 
-            return entry.value if entry else None
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    @property
+    def memory_usage(self) -> int:
+        """
+        Total size, in bytes, of all values currently held in the cache.
+        """
+        return self.current_bytes
+
+    async def get(self, key: str) -> T | None:
+        entry = self.cache.get(key)
 
-    def _find_oldest_key(self) -> str | None:
-        if not self.cache:
+        if entry is None:
+            self.misses += 1
             return None
 
-        oldest_key = min(
-            self.cache.keys(),
-            key=lambda k: self.cache[k].timestamp,
+        entry.timestamp = (
+            asyncio
+                .get_running_loop()
+                .time()
         )
 
-        return oldest_key
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def _remove(self, key: str) -> CacheEntry[T] | None:
+        entry = self.cache.pop(key, None)
+
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+        return entry
+
+    def _is_over_budget(self) -> bool:
+        if self.max_size is not None and len(self.cache) > self.max_size:
+            return True
+
+        if self.max_bytes is not None and self.current_bytes > self.max_bytes:
+            return True
+
+        return False
+
+    def _evict(self) -> None:
+        while self.cache and self._is_over_budget():
+            _, entry = self.cache.popitem(last=False)
+            self.current_bytes -= entry.size
+            self.evictions += 1
 
     async def set(self, key: str, value: T) -> None:
-        async with self.lock:
-            if len(self.cache) >= self.max_size:
-                oldest_key = self._find_oldest_key()
-
-                if oldest_key is not None:
-                    del self.cache[oldest_key]
-
-            self.cache[key] = CacheEntry(
-                value=value,
-                timestamp=(
-                    asyncio
-                        .get_running_loop()
-                        .time()
-                ),
-            )
+        size = self.sizeof(value)
+
+        # Values that could never fit are not cached at all; they would only flush useful entries.
+        if self.max_entry_bytes is not None and size > self.max_entry_bytes:
+            self._remove(key)
+            return
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            self._remove(key)
+            return
+
+        self._remove(key)
+        self.cache[key] = CacheEntry(
+            value=value,
+            timestamp=(
+                asyncio
+                    .get_running_loop()
+                    .time()
+            ),
+            size=size,
+        )
+
+        self.current_bytes += size
+        self._evict()
+
+    async def close(self) -> None:
+        pass
 
 
 class TTLCache(LRUCache[T]):
+    """
+    LRU cache whose entries also expire `ttl` seconds after they are written, or after a per-entry `ttl`.
+
+    Expiry times are kept in a min-heap, so expired entries are found in time order without scanning: they
+    are removed on every write (before anything live is evicted to make room) and, with `sweep_interval`, by
+    a background sweep that starts with the first write. Entries that are never read again therefore do not
+    linger until capacity pressure pushes them out. Heap items left behind by overwritten or evicted keys are
+    skipped when popped, and the heap is rebuilt whenever they outnumber live entries, so its size stays
+    proportional to `maxsize` however many distinct keys pass through.
+    """
+
     def __init__(
         self,
         maxsize: int = 128,
         ttl: float = 300.0,
+        sweep_interval: float | None = None,
     ) -> None:
         self.ttl = ttl
+        self.sweep_interval = sweep_interval
+
+        self.expirations: int = 0
+
+        self._expiry: list[tuple[float, str]] = []
+        self._sweeper: asyncio.Task[None] | None = None
 
         super().__init__(max_size=maxsize)
 
-    async def get(self, key: str) -> T | None:
-        async with self.lock:
+    def _expire(self, now: float) -> int:
+        expired = 0
+
+        while self._expiry and self._expiry[0][0] < now:
+            expires_at, key = heapq.heappop(self._expiry)
             entry = self.cache.get(key)
 
-            if entry:
-                current_time = (
-                    asyncio
-                        .get_running_loop()
-                        .time()
+            # Skip heap items whose key has since been rewritten or removed
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                expired += 1
+
+        self.expirations += expired
+        return expired
+
+    async def _sweep(self, interval: float) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await asyncio.sleep(interval)
+            self._expire(loop.time())
+
+    async def get(self, key: str) -> T | None:
+        entry = self.cache.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        current_time = (
+            asyncio
+                .get_running_loop()
+                .time()
+        )
+
+        if current_time > entry.expires_at:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    async def set(self, key: str, value: T, ttl: float | None = None) -> None:
+        loop = asyncio.get_running_loop()
+        self._expire(loop.time())
+
+        await super().set(key, value)
+        entry = self.cache.get(key)
+
+        if entry is None:
+            return
+
+        entry.expires_at = entry.timestamp + (self.ttl if ttl is None else ttl)
+        heapq.heappush(self._expiry, (entry.expires_at, key))
+
+        if len(self._expiry) > 2 * len(self.cache) + 64:
+            self._expiry = [(entry.expires_at, key) for key, entry in self.cache.items()]
+            heapq.heapify(self._expiry)
+
+        if self.sweep_interval is not None and self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep(self.sweep_interval))
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+
+            with suppress(asyncio.CancelledError):
+                await self._sweeper
+
+            self._sweeper = None
+
+
+class DiskCache:
+    """
+    Persistent, content-addressed audio cache stored on local disk.
+
+    Audio is written once per distinct payload under `objects/`, named by its SHA-256 digest, and an SQLite
+    index maps cache keys to digests. The cache is bounded by the total size of stored objects; the least
+    recently accessed keys are evicted first. All file and index I/O runs on a single dedicated thread, so
+    the SQLite connection is never shared between threads and the event loop never blocks on disk.
+
+    Several workers may share one `path`: writes and evictions run in an SQLite write transaction and size
+    the cache from the shared index, so `max_bytes` bounds the directory rather than each worker. Access
+    times are batched and written every `access_interval` seconds, so reads do not queue on the write lock.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = 2 * 1024 * 1024 * 1024,
+        access_interval: float = 5.0,
+        max_pending_accesses: int = 256,
+    ) -> None:
+        self.path = Path(path)
+        self.objects_path = self.path / "objects"
+        self.max_bytes = max_bytes
+        self.access_interval = access_interval
+        self.max_pending_accesses = max_pending_accesses
+
+        # Stored bytes as of this worker's last write; other workers sharing the index may have changed it since
+        self.current_bytes: int = 0
+
+        self._accessed: dict[str, float] = {}
+        self._accessed_flushed = time.monotonic()
+
+        self.objects_path.mkdir(parents=True, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk-cache")
+        self.connection = sqlite3.connect(
+            self.path / "index.sqlite3",
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30.0,
+        )
+
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_entries_digest ON entries (digest)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries (accessed_at)")
+
+        self.current_bytes = self._stored_bytes()
+
+    @property
+    def disk_usage(self) -> int:
+        """
+        Total size, in bytes, of all objects stored on disk as of this worker's last write.
+        """
+        return self.current_bytes
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_path / digest[:2] / digest
+
+    def _stored_bytes(self) -> int:
+        row = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)"
+        ).fetchone()
+
+        return int(row[0])
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        # IMMEDIATE takes the write lock up front, so workers sharing the index never interleave a
+        # read-modify-write of the same digests
+        self.connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        self.connection.execute("COMMIT")
+
+    def _touch(self, key: str) -> None:
+        self._accessed[key] = time.time()
+
+        if (
+            len(self._accessed) >= self.max_pending_accesses
+            or time.monotonic() - self._accessed_flushed >= self.access_interval
+        ):
+            self._flush_accesses()
+
+    def _flush_accesses(self) -> None:
+        self._accessed_flushed = time.monotonic()
+
+        if not self._accessed:
+            return
+
+        accessed, self._accessed = self._accessed, {}
+
+        with self._transaction():
+            self.connection.executemany(
+                "UPDATE entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in accessed.items()],
+            )
+
+    def _read(self, key: str) -> bytes | None:
+        row = self.connection.execute(
+            "SELECT digest FROM entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        try:
+            data = self._object_path(row[0]).read_bytes()
+        except FileNotFoundError:
+            # The object was removed behind our back; drop the dangling index entry.
+            with self._transaction():
+                self._delete(key)
+
+            return None
+
+        self._touch(key)
+        return data
+
+    def _delete(self, key: str) -> int:
+        row = self.connection.execute(
+            "DELETE FROM entries WHERE key = ? RETURNING digest, size",
+            (key,),
+        ).fetchone()
+
+        if row is None:
+            return 0
+
+        digest, size = row
+        return self._release(digest, size)
+
+    def _release(self, digest: str, size: int) -> int:
+        # Objects are shared between keys with identical audio; only remove the file once unreferenced.
+        referenced = self.connection.execute(
+            "SELECT 1 FROM entries WHERE digest = ? LIMIT 1",
+            (digest,),
+        ).fetchone()
+
+        if referenced is not None:
+            return 0
+
+        self._object_path(digest).unlink(missing_ok=True)
+        return size
+
+    def _write(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        digest = hashlib.sha256(value).hexdigest()
+        path = self._object_path(digest)
+        temporary_path: Path | None = None
+
+        # The payload is written outside the transaction so the write lock is only held for the index update
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            temporary_path = path.with_name(f".{digest}.{uuid.uuid4().hex}")
+            temporary_path.write_bytes(value)
+
+        try:
+            # Eviction orders by access time, so this worker's pending accesses are recorded first
+            self._flush_accesses()
+
+            with self._transaction():
+                exists = self.connection.execute(
+                    "SELECT 1 FROM entries WHERE digest = ? LIMIT 1",
+                    (digest,),
+                ).fetchone()
+
+                if exists is None and temporary_path is not None:
+                    os.replace(temporary_path, path)
+                    temporary_path = None
+                elif exists is None and not path.exists():
+                    # Released by another worker since the check above
+                    path.write_bytes(value)
+
+                previous = self.connection.execute(
+                    "SELECT digest, size FROM entries WHERE key = ?",
+                    (key,),
+                ).fetchone()
+
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO entries (key, digest, size, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, digest, len(value), time.time()),
                 )
 
-                if current_time - entry.timestamp > self.ttl:
-                    del self.cache[key]
-                    return None
+                if previous is not None and previous[0] != digest:
+                    self._release(*previous)
+
+                self._evict()
+        finally:
+            if temporary_path is not None:
+                temporary_path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        # Sized from the shared index inside the write transaction, so every worker sees the same total
+        self.current_bytes = self._stored_bytes()
+
+        while self.current_bytes > self.max_bytes:
+            row = self.connection.execute(
+                "SELECT key FROM entries ORDER BY accessed_at ASC LIMIT 1"
+            ).fetchone()
+
+            if row is None:
+                break
+
+            self.current_bytes -= self._delete(row[0])
+
+    async def get(self, key: str) -> bytes | None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._read, key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._write, key, value)
+
+    def _close(self) -> None:
+        try:
+            self._flush_accesses()
+        finally:
+            self.connection.close()
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
 
-                # entry.timestamp = current_time
-                return entry.value
+        await loop.run_in_executor(self.executor, self._close)
+        self.executor.shutdown(wait=True)
 
+
+class TieredCache[T]:
+    """
+    Chains several cache tiers, fastest first.
+
+    Reads fall through the tiers in order and a hit is copied into every faster tier that missed. Writes
+    go to every tier.
+    """
+
+    def __init__(self, *tiers: Cache[T]) -> None:
+        self.tiers: tuple[Cache[T], ...] = tiers
+
+    async def get(self, key: str) -> T | None:
+        for index, tier in enumerate(self.tiers):
+            value = await tier.get(key)
+
+            if value is None:
+                continue
+
+            for faster_tier in self.tiers[:index]:
+                await faster_tier.set(key, value)
+
+            return value
+
+        return None
+
+    async def get_many(self, keys: list[str]) -> list[T | None]:
+        values: list[T | None] = [None] * len(keys)
+        missing = list(range(len(keys)))
+
+        for index, tier in enumerate(self.tiers):
+            if not missing:
+                break
+
+            found = await get_many(tier, [keys[position] for position in missing])
+            still_missing: list[int] = []
+
+            for position, value in zip(missing, found):
+                if value is None:
+                    still_missing.append(position)
+                    continue
+
+                values[position] = value
+
+                for faster_tier in self.tiers[:index]:
+                    await faster_tier.set(keys[position], value)
+
+            missing = still_missing
+
+        return values
+
+    async def set(self, key: str, value: T) -> None:
+        for tier in self.tiers:
+            await tier.set(key, value)
+
+    async def close(self) -> None:
+        for tier in self.tiers:
+            await tier.close()
+
+
+class RedisCache[T]:
+    """
+    Cache backed by a Redis-protocol server, shared by every worker and replica.
+
+    Values are stored as binary strings; `encode` and `decode` convert to and from `T` (identity for audio).
+    Redis failures are logged and treated as misses so that an unavailable cache never fails a request.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        prefix: str = "tts:",
+        ttl: float | None = None,
+        encode: Callable[[T], bytes] | None = None,
+        decode: Callable[[bytes], T] | None = None,
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.encode: Callable[[T], bytes] = encode or _identity
+        self.decode: Callable[[bytes], T] = decode or _identity
+
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        max_connections: int = 64,
+        **kwargs,
+    ) -> RedisCache[T]:
+        client = Redis.from_url(
+            url,
+            max_connections=max_connections,
+            decode_responses=False,
+        )
+
+        return cls(client, **kwargs)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    @property
+    def _px(self) -> int | None:
+        return int(self.ttl * 1000) if self.ttl is not None else None
+
+    async def get(self, key: str) -> T | None:
+        try:
+            value = await self.client.get(self._key(key))
+        except RedisError:
+            logger.exception("Failed to read from Redis cache")
             return None
+
+        return self.decode(value) if value is not None else None
+
+    async def get_many(self, keys: list[str]) -> list[T | None]:
+        """
+        Fetch several keys in a single round trip.
+        """
+        if not keys:
+            return []
+
+        try:
+            values = await self.client.mget([self._key(key) for key in keys])
+        except RedisError:
+            logger.exception("Failed to read from Redis cache")
+            return [None] * len(keys)
+
+        return [self.decode(value) if value is not None else None for value in values]
+
+    async def set(self, key: str, value: T) -> None:
+        try:
+            await self.client.set(self._key(key), self.encode(value), px=self._px)
+        except RedisError:
+            logger.exception("Failed to write to Redis cache")
+
+    async def close(self) -> None:
+        await self.client.aclose()
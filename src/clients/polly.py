@@ -1,11 +1,20 @@
 import asyncio
-from contextlib import closing
 from enum import StrEnum
-from typing import get_args
+import json
+import random
+import socket
+from typing import AsyncIterator, get_args
 
 import boto3
-from botocore.config import Config
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import ReadOnlyCredentials, RefreshableCredentials
+import httpx
 
+from src.executor import ExecutorSaturated
+from src.metrics import instrument_synthesis
+from src.timing import timed, timed_iter
+from src.tts.formats import AudioFormat, wav_header
 from src.tts.provider import TTSProvider
 from src.types.aws import AWSStandardVoices
 
@@ -14,27 +23,95 @@ class SSMLException(Exception):
     pass
 
 
+class PollyException(Exception):
+    pass
+
+
 class TextTypeType(StrEnum):
     Text = 'text'
     Ssml = 'ssml'
 
 
+# Responses worth retrying, as botocore's standard retry mode does: throttling and transient server errors
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+THROTTLING_ERRORS = frozenset({'ThrottlingException', 'TooManyRequestsException', 'RequestLimitExceeded'})
+
+
+# Polly encodes every format itself except WAV, which is its 16kHz PCM output with a header prepended.
+PCM_SAMPLE_RATE = 16000
+
+OUTPUT_FORMATS: dict[AudioFormat, str] = {
+    AudioFormat.MP3: 'mp3',
+    AudioFormat.OPUS: 'ogg_opus',
+    AudioFormat.OGG: 'ogg_vorbis',
+    AudioFormat.WAV: 'pcm',
+    AudioFormat.PCM: 'pcm',
+}
+
+
 class PollyProvider(TTSProvider[AWSStandardVoices]):
-    def __init__(self, region_name: str = 'us-west-2') -> None:
+    """
+    Long-lived, asyncio-native Polly provider; a single instance is shared by every request.
+
+    Requests are SigV4-signed with botocore and sent over a pooled `httpx.AsyncClient`, so a Polly call
+    never occupies a thread and the audio is streamed to the caller as Polly sends it. boto3 is only used to
+    resolve credentials through the standard AWS chain.
+
+    Throttling and transient 5xx responses are retried up to `max_attempts` in total, with full-jitter
+    exponential backoff capped at `max_backoff` seconds, before any audio has been streamed.
+    """
+
+    def __init__(
+        self,
+        region_name: str = 'us-west-2',
+        max_pool_connections: int = 10,
+        tcp_keepalive: bool = True,
+        endpoint_url: str | None = None,
+        max_attempts: int = 3,
+        base_backoff: float = 0.1,
+        max_backoff: float = 2.0,
+    ) -> None:
         self.region_name = region_name
-        self.config = Config(
-            read_timeout=5,  # Force the socket to raise an exception if no data is received within 5 seconds.
-            connect_timeout=5,  # Fail fast if the initial handshake takes too long.
-            retries={
-                'max_attempts': 2,
-                'mode': 'standard'
-            },
-
-            # Ask the OS to send "Are you there?" packets to keep the NAT entry active.
-            # tcp_keepalive=True
-        )
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.endpoint_url = (endpoint_url or f'https://polly.{region_name}.amazonaws.com').rstrip('/')
 
         self.session = boto3.Session()
+        self.credentials = self.session.get_credentials()
+
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_pool_connections,
+                max_keepalive_connections=max_pool_connections,
+            ),
+
+            # Ask the OS to send "Are you there?" packets to keep the NAT entry of idle pooled connections active.
+            socket_options=[(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)] if tcp_keepalive else None,
+
+            # Retry once if a connection cannot be established.
+            retries=1,
+        )
+
+        self.client = httpx.AsyncClient(
+            transport=transport,
+
+            # Fail fast on the handshake, raise if no data is received within 5 seconds, and give up after
+            # waiting 5 seconds for a free pooled connection.
+            timeout=httpx.Timeout(5.0),
+        )
+
+    @property
+    def name(self) -> str:
+        return 'polly'
+
+    @property
+    def model_version(self) -> str:
+        return 'standard'
+
+    @property
+    def sample_rate(self) -> int:
+        return PCM_SAMPLE_RATE
 
     @property
     def can_cache(self) -> bool:
@@ -48,33 +125,124 @@ class PollyProvider(TTSProvider[AWSStandardVoices]):
     def has_financial_cost(self) -> bool:
         return True
 
-    def _synthesize(
+    async def _get_credentials(self) -> ReadOnlyCredentials:
+        if self.credentials is None:
+            raise PollyException("No AWS credentials are configured")
+
+        # Refreshing (e.g. instance role or SSO credentials) makes a blocking network call, so it is done off
+        # the event loop; otherwise the cached credentials are returned immediately.
+        if isinstance(self.credentials, RefreshableCredentials) and self.credentials.refresh_needed():
+            return await asyncio.to_thread(self.credentials.get_frozen_credentials)
+
+        return self.credentials.get_frozen_credentials()
+
+    def _sign(
+        self,
+        credentials: ReadOnlyCredentials,
+        url: str,
+        body: bytes,
+    ) -> dict[str, str]:
+        request = AWSRequest(
+            method='POST',
+            url=url,
+            data=body,
+            headers={'Content-Type': 'application/json'},
+        )
+
+        SigV4Auth(credentials, 'polly', self.region_name).add_auth(request)
+        return dict(request.headers.items())
+
+    @staticmethod
+    def _is_retryable(response: httpx.Response) -> bool:
+        error_type = response.headers.get('x-amzn-ErrorType', '').split(':')[0]
+        return response.status_code in RETRYABLE_STATUS_CODES or error_type in THROTTLING_ERRORS
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    async def _send(self, url: str, body: bytes) -> httpx.Response:
+        """
+        Send a signed request, retrying throttling and transient server errors. Returns the streaming
+        response of the last attempt, which may still be an error.
+        """
+        attempt = 0
+
+        while True:
+            # Signatures are timestamped, so every attempt is signed afresh
+            headers = self._sign(await self._get_credentials(), url, body)
+            response = await self.client.send(
+                self.client.build_request('POST', url, content=body, headers=headers),
+                stream=True,
+            )
+
+            attempt += 1
+
+            if attempt >= self.max_attempts or not self._is_retryable(response):
+                return response
+
+            await response.aclose()
+            await asyncio.sleep(self._backoff(attempt - 1))
+
+    @staticmethod
+    def _raise_for_error(response: httpx.Response) -> None:
+        # e.g. "InvalidSsmlException:http://internal.amazon.com/coral/com.amazonaws.parrot.service/"
+        error_type = response.headers.get('x-amzn-ErrorType', '').split(':')[0]
+
+        try:
+            payload = response.json()
+            message = payload.get('message') or payload.get('Message') or response.text
+        except ValueError:
+            message = response.text
+
+        if error_type == 'InvalidSsmlException':
+            raise SSMLException(message)
+
+        raise PollyException(f"{error_type or response.status_code}: {message}")
+
+    @instrument_synthesis
+    async def stream_speech(
         self,
         voice: AWSStandardVoices,
         text: str,
-        output_format: str = 'mp3',
-        text_type: TextTypeType = TextTypeType.Text,
-    ) -> bytes:
-        polly_client = self.session.client(
-            'polly',
-            region_name=self.region_name,
-            config=self.config,
-        )
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        output_format: AudioFormat = kwargs.get('output_format', AudioFormat.MP3)
+        text_type: TextTypeType = kwargs.get('text_type', TextTypeType.Text)
+
+        url = f'{self.endpoint_url}/v1/speech'
+        request = {
+            'Text': text,
+            'VoiceId': voice,
+            'OutputFormat': OUTPUT_FORMATS[output_format],
+            'TextType': str(text_type),
+        }
+
+        if request['OutputFormat'] == 'pcm':
+            request['SampleRate'] = str(PCM_SAMPLE_RATE)
+
+        body = json.dumps(request).encode()
 
         try:
-            response = polly_client.synthesize_speech(
-                Text=text,
-                VoiceId=voice,
-                OutputFormat=output_format,
-                TextType=text_type,
-            )
-        except polly_client.exceptions.InvalidSsmlException as e:
-            raise SSMLException(str(e)) from e
+            # Polly streams audio as it is synthesized, so waiting for the response and each chunk is inference
+            with timed("inference"):
+                response = await self._send(url, body)
+
+            try:
+                if response.is_error:
+                    await response.aread()
+                    self._raise_for_error(response)
+
+                if output_format == AudioFormat.WAV:
+                    yield wav_header(PCM_SAMPLE_RATE)
 
-        with closing(response['AudioStream']) as stream:
-            result = stream.read()
+                async for chunk in timed_iter("inference", response.aiter_bytes()):
+                    yield chunk
+            finally:
+                await response.aclose()
 
-        return result
+        except httpx.PoolTimeout as e:
+            # Every pooled connection is busy; shed load the same way a saturated executor does.
+            raise ExecutorSaturated("The polly connection pool is exhausted") from e
 
     async def synthesize_speech(
         self,
@@ -82,18 +250,10 @@ class PollyProvider(TTSProvider[AWSStandardVoices]):
         text: str,
         **kwargs,
     ) -> bytes:
-        output_format: str = kwargs.get('output_format', 'mp3')
-        text_type: TextTypeType = kwargs.get('text_type', TextTypeType.Text)
-        loop = asyncio.get_running_loop()
-
-        return await loop.run_in_executor(
-            None,
-            self._synthesize,
-            voice,
-            text,
-            output_format,
-            text_type,
-        )
+        return b"".join([chunk async for chunk in self.stream_speech(voice, text, **kwargs)])
+
+    async def close(self) -> None:
+        await self.client.aclose()
 
     @staticmethod
     def voices() -> list[str]:
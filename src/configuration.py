@@ -1,9 +1,12 @@
 from __future__ import annotations
 import re
+from typing import Literal
 
-from pydantic import SecretStr
+from pydantic import SecretStr, model_validator
 from pydantic_settings import BaseSettings
 
+from src.tts.formats import AudioFormat, EncoderSettings, Quality
+
 
 CONFIGURATION: Configuration | None = None
 
@@ -13,10 +16,103 @@ class Configuration(BaseSettings):
 
     # https://limits.readthedocs.io/en/stable/quickstart.html#rate-limit-string-notation1313
     maximum_characters_per_minute: str = "2048/minute"
+
+    # Audio served from the cache is charged this fraction of its characters against the rate limit
+    # (rounded up), since it costs almost nothing to serve.
+    rate_limit_cache_hit_ratio: float = 0.05
     ttl_cache_ttl: int = 60
     ttl_cache_size: int = 32
 
-    lru_cache_size: int = 256
+    # Expired user and rejected-token entries are also swept in the background, not only when read again.
+    ttl_cache_sweep_interval: float = 30.0
+
+    # Optionally keep every user in memory, updated through LISTEN/NOTIFY (falling back to polling the change
+    # log every `user_directory_poll_interval` seconds), so authenticating a known token never hits the database.
+    user_directory: bool = False
+    user_directory_poll_interval: float = 30.0
+
+    # Rejected API tokens are remembered briefly so repeated bad-token requests do not each query the database.
+    negative_cache_ttl: int = 10
+    negative_cache_size: int = 10_000
+
+    # The audio cache is bounded by total bytes rather than entry count, since MP3 sizes vary wildly
+    # between one-word and maximum-length requests.
+    lru_cache_max_bytes: int = 256 * 1024 * 1024
+    lru_cache_max_entry_bytes: int = 8 * 1024 * 1024
+
+    # Optional persistent cache tier that survives restarts; disabled unless a path is configured.
+    disk_cache_path: str | None = None
+    disk_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+
+    # "redis" shares the audio and user caches between every worker and replica.
+    cache_backend: Literal["memory", "redis"] = "memory"
+    redis_url: SecretStr | None = None
+    redis_max_connections: int = 64
+
+    # Batch requests synthesize their cache misses concurrently, at most `<provider>_batch_concurrency` at a
+    # time per provider, so a large batch cannot fill Kokoro's queue or Polly's connection pool on its own.
+    maximum_batch_items: int = 100
+    polly_batch_concurrency: int = 16
+    kokoro_batch_concurrency: int = 2
+
+    # Long texts are synthesized as background jobs, written to `jobs_path`; disabled unless a path is configured.
+    # With several replicas the path should be shared storage, since any replica may serve the finished audio.
+    jobs_path: str | None = None
+    job_max_characters: int = 500_000
+    job_max_concurrent: int = 2
+    job_chunk_concurrency: int = 4
+    job_poll_interval: float = 2.0
+    job_retention: float = 86400.0
+
+    # Providers served by this server, e.g. '["polly"]' on nodes without Kokoro. Only enabled providers are
+    # imported and loaded, in the background once the server has started.
+    providers: list[Literal["polly", "kokoro"]] = ["polly", "kokoro"]
+    kokoro_lang_code: str = "a"
+
+    # Cache-Control sent with each provider's audio. "private" lets only the requesting client cache it;
+    # "public" also lets CDNs and shared proxies store it and serve it to anyone without authenticating.
+    polly_cache_control: str = "private, max-age=86400"
+    kokoro_cache_control: str = "private, max-age=86400"
+
+    # Kokoro inference runs on its own pool so CPU-bound torch work never competes with Polly's network waits.
+    # Requests beyond the queue limit are rejected with a 503 instead of queueing without bound.
+    kokoro_workers: int = 1
+    kokoro_max_queue: int = 32
+    kokoro_intra_op_threads: int | None = None
+    kokoro_inter_op_threads: int | None = None
+
+    # Concurrent Kokoro segments are batched into one forward pass: up to `kokoro_max_batch_size` segments,
+    # waiting at most `kokoro_batch_window` seconds for a batch to fill.
+    kokoro_max_batch_size: int = 8
+    kokoro_batch_window: float = 0.005
+
+    # Optionally cache plain-text audio per sentence as well, so texts sharing most of their sentences only
+    # synthesize the ones that differ, up to `fragment_cache_concurrency` at a time per request.
+    fragment_cache: bool = False
+    fragment_cache_concurrency: int = 4
+
+    # Compressed output encoded by the service trades encoding CPU and size against quality ("low", "standard"
+    # or "high"). Polly encodes its own audio, so these only apply to it when stitching cached fragments.
+    mp3_quality: Quality = "standard"
+    opus_quality: Quality = "standard"
+    ogg_quality: Quality = "standard"
+
+    # Polly calls share one pooled async HTTP client; once every connection is busy, requests wait briefly
+    # for one to free up and are then rejected with a 503.
+    polly_region: str = "us-west-2"
+    polly_endpoint_url: str | None = None
+    polly_max_pool_connections: int = 64
+    polly_tcp_keepalive: bool = True
+
+    # Polly throttling and transient 5xx responses are retried with jittered exponential backoff, as botocore's
+    # standard retry mode does; attempts include the first request.
+    polly_max_attempts: int = 3
+
+    # Usage is recorded in the background and written in bulk: every `usage_flush_interval` seconds, or as soon
+    # as `usage_batch_size` events are waiting.
+    usage_batch_size: int = 500
+    usage_flush_interval: float = 1.0
+    usage_max_pending: int = 50_000
 
     # TODO: Let's find a better way to handle admin API keys
     admin_api_token: SecretStr
@@ -25,6 +121,17 @@ class Configuration(BaseSettings):
     logfire_token: SecretStr | None = None
     log_level: str = "INFO"
 
+    # Report per-phase timings (auth, rate limiting, cache, inference, encoding, ...) in a `Server-Timing`
+    # response header, and optionally log them once each response has been sent.
+    server_timing: bool = True
+    server_timing_log: bool = False
+
+    @model_validator(mode="after")
+    def validate_cache_backend(self) -> Configuration:
+        if self.cache_backend == "redis" and self.redis_url is None:
+            raise ValueError("redis_url is required when cache_backend is 'redis'")
+
+        return self
 
     @staticmethod
     def get() -> Configuration:
@@ -35,6 +142,32 @@ class Configuration(BaseSettings):
 
         return CONFIGURATION
 
+    def cache_control(self, provider: str) -> str:
+        match provider:
+            case "polly":
+                return self.polly_cache_control
+            case "kokoro":
+                return self.kokoro_cache_control
+            case _:
+                return "no-store"
+
+    def batch_concurrency(self, provider: str) -> int:
+        match provider:
+            case "polly":
+                return self.polly_batch_concurrency
+            case "kokoro":
+                return self.kokoro_batch_concurrency
+            case _:
+                return 1
+
+    @property
+    def encoders(self) -> dict[AudioFormat, EncoderSettings]:
+        return {
+            AudioFormat.MP3: EncoderSettings.preset(self.mp3_quality),
+            AudioFormat.OPUS: EncoderSettings.preset(self.opus_quality),
+            AudioFormat.OGG: EncoderSettings.preset(self.ogg_quality),
+        }
+
     @property
     def async_database_url(self) -> str:
         ret = self.database_url.get_secret_value()
@@ -1,12 +1,28 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
+import time
 from typing import AsyncGenerator
 
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession as SQLModelAsyncSession
 
+from src.metrics import POOL_CHECKOUT_SECONDS
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that records how long each checkout waits for a connection.
+    """
+
+    def _do_get(self):  # type: ignore[no-untyped-def]
+        started = time.perf_counter()
+
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
 
 
 class Database:
@@ -30,7 +46,7 @@ class Database:
             database_url,
             echo=debug,
             future=True,
-            poolclass=AsyncAdaptedQueuePool,
+            poolclass=TimedQueuePool,
             pool_size=5,
             max_overflow=10,
             pool_pre_ping=True,
@@ -0,0 +1,130 @@
+from typing import Any, Callable, TypeVar
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import logfire
+
+
+R = TypeVar("R")
+
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when an executor's queue is full and new work is rejected.
+    """
+
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool with a bounded queue and queue depth / wait time accounting.
+
+    Work that would push the number of queued (submitted but not yet started) calls past `max_queue` is
+    rejected with `ExecutorSaturated` rather than left to wait indefinitely.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        initializer: Callable[[], None] | None = None,
+    ) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=name,
+            initializer=initializer,
+        )
+
+        self._lock = threading.Lock()
+        self.queued: int = 0
+        self.active: int = 0
+        self.completed: int = 0
+        self.total_wait_time: float = 0.0
+
+        self._wait_time = logfire.metric_histogram(
+            f"{name}.queue_wait_time",
+            unit="s",
+            description=f"Time calls spend queued for the {name} executor",
+        )
+
+        self._queue_depth = logfire.metric_up_down_counter(
+            f"{name}.queue_depth",
+            description=f"Calls queued for the {name} executor",
+        )
+
+    @property
+    def saturated(self) -> bool:
+        return self.queued >= self.max_queue
+
+    @property
+    def average_wait_time(self) -> float:
+        with self._lock:
+            return self.total_wait_time / self.completed if self.completed else 0.0
+
+    async def run(
+        self,
+        fn: Callable[..., R],
+        *args: Any,
+        bounded: bool = True,
+    ) -> R:
+        """
+        Run `fn` on the pool. With `bounded=False` the call is queued even when the queue is full, which
+        lets work already admitted (e.g. later segments of a running stream) finish.
+        """
+        with self._lock:
+            if bounded and self.queued >= self.max_queue:
+                raise ExecutorSaturated(f"The {self.name} executor queue is full")
+
+            self.queued += 1
+
+        self._queue_depth.add(1)
+        submitted_at = time.perf_counter()
+        dequeued = False
+
+        def dequeue() -> bool:
+            nonlocal dequeued
+
+            with self._lock:
+                if dequeued:
+                    return False
+
+                dequeued = True
+                self.queued -= 1
+
+            self._queue_depth.add(-1)
+            return True
+
+        def call() -> R:
+            wait_time = time.perf_counter() - submitted_at
+            dequeue()
+
+            with self._lock:
+                self.active += 1
+                self.total_wait_time += wait_time
+
+            self._wait_time.record(wait_time)
+
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        loop = asyncio.get_running_loop()
+
+        try:
+            return await loop.run_in_executor(self.executor, call)
+        except asyncio.CancelledError:
+            # A call cancelled before a worker picked it up never runs, so it has to leave the queue here.
+            dequeue()
+            raise
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
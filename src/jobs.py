@@ -0,0 +1,349 @@
+import asyncio
+from collections import deque
+from contextlib import suppress
+import datetime
+import logging
+import os
+from pathlib import Path
+from typing import BinaryIO
+import uuid
+
+import numpy as np
+from sqlalchemy import update
+from sqlmodel import col, or_, select
+
+from src.database import Database
+from src.executor import ExecutorSaturated
+from src.models.job import JobStatus, SynthesisJob, utcnow
+from src.providers import ProviderRegistry, ProviderUnavailable
+from src.tts.encoder import StreamEncoder
+from src.tts.formats import FORMATS, AudioFormat, EncoderSettings
+from src.tts.fragments import chunk_text
+from src.tts.provider import TTSProvider
+
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimLost(Exception):
+    """
+    Raised when a worker finds that a job it was running has been claimed by another worker.
+    """
+
+
+class JobRunner:
+    """
+    Runs long-text synthesis jobs in the background, outside of any HTTP request.
+
+    Jobs are queued in the `synthesis_job` table, so every worker and replica shares one queue: a worker
+    claims the oldest queued job (with `SKIP LOCKED` on Postgres, so two workers never claim the same one)
+    and runs up to `max_jobs` at once. A job's text is split into chunks of at most `chunk_characters`, which
+    are synthesized as PCM up to `chunk_concurrency` at a time and encoded, in order, into a single file in
+    `path`. Only `chunk_concurrency` chunks of audio are held in memory whatever the length of the text.
+
+    A running job's worker bumps `updated_at` every `heartbeat_interval` seconds, whether or not chunks are
+    completing; one not updated for `stale_after` seconds was abandoned by a worker that died and is claimed
+    again from the start. Each claim stores a new `claim_token`, and every update, the final rename and the
+    failure path require it, so a worker that was presumed dead stops as soon as it notices rather than
+    overwriting the new owner's progress; each claim also writes its own partial file. Finished jobs and
+    their audio are removed `retention` seconds after completing.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        providers: ProviderRegistry,
+        path: str | Path,
+        encoders: dict[AudioFormat, EncoderSettings] | None = None,
+        chunk_characters: int = 1024,
+        chunk_concurrency: int = 4,
+        max_jobs: int = 2,
+        poll_interval: float = 2.0,
+        stale_after: float = 300.0,
+        heartbeat_interval: float = 30.0,
+        retention: float = 86400.0,
+    ) -> None:
+        self.database = database
+        self.providers = providers
+        self.path = Path(path)
+        self.encoders = encoders or {}
+        self.chunk_characters = chunk_characters
+        self.chunk_concurrency = chunk_concurrency
+        self.max_jobs = max_jobs
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval
+        self.retention = retention
+
+        self.running: dict[str, asyncio.Task[None]] = {}
+
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    async def provider_for(self, voice: str) -> TTSProvider | None:
+        return await self.providers.for_voice(voice)
+
+    def audio_path(self, job: SynthesisJob) -> Path:
+        return self.path / f"{job.id}.{FORMATS[AudioFormat(job.format)].extension}"
+
+    async def submit(self, user_id: int, voice: str, text: str, format: AudioFormat) -> SynthesisJob:
+        job = SynthesisJob(
+            user_id=user_id,
+            voice=voice,
+            text=text,
+            format=format,
+            chunks_total=len(chunk_text(text, self.chunk_characters)),
+        )
+
+        async with self.database.get_session() as session:
+            session.add(job)
+            await session.commit()
+            await session.refresh(job)
+
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> SynthesisJob | None:
+        async with self.database.get_session() as session:
+            return await session.get(SynthesisJob, job_id)
+
+    async def _claim(self) -> SynthesisJob | None:
+        stale = utcnow() - datetime.timedelta(seconds=self.stale_after)
+
+        async with self.database.get_session() as session:
+            job = (await session.exec(
+                select(SynthesisJob)
+                    .where(or_(
+                        col(SynthesisJob.status) == JobStatus.QUEUED,
+                        (col(SynthesisJob.status) == JobStatus.RUNNING) & (col(SynthesisJob.updated_at) < stale),
+                    ))
+                    .where(col(SynthesisJob.id).not_in(list(self.running)))
+                    .order_by(col(SynthesisJob.created_at))
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+            )).first()
+
+            if job is None:
+                return None
+
+            job.status = JobStatus.RUNNING
+            job.chunks_done = 0
+            job.claim_token = uuid.uuid4().hex
+            job.updated_at = utcnow()
+
+            session.add(job)
+            await session.commit()
+            await session.refresh(job)
+
+            return job
+
+    async def _update(self, job: SynthesisJob, **values) -> None:
+        """
+        Update a job this worker has claimed, raising `ClaimLost` if another worker has claimed it since.
+        """
+        async with self.database.engine.begin() as connection:
+            result = await connection.execute(
+                update(SynthesisJob)
+                    .where(col(SynthesisJob.id) == job.id)
+                    .where(col(SynthesisJob.claim_token) == job.claim_token)
+                    .values(**values, updated_at=utcnow())
+            )
+
+        if result.rowcount != 1:
+            raise ClaimLost(f"Synthesis job {job.id} was claimed by another worker")
+
+    async def _heartbeat(self, job: SynthesisJob, processing: asyncio.Task[None]) -> None:
+        # Chunks can take arbitrarily long (e.g. waiting on a saturated provider), so liveness is reported
+        # on a timer rather than as chunks complete
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+
+            try:
+                await self._update(job)
+            except ClaimLost:
+                logger.warning("Synthesis job %s was claimed by another worker, abandoning it", job.id)
+                processing.cancel()
+                return
+            except Exception:
+                logger.exception("Failed to record progress of synthesis job %s", job.id)
+
+    async def _complete(self, job: SynthesisJob, partial: Path, destination: Path) -> None:
+        async with self.database.get_session() as session:
+            # The row stays locked until the job is marked completed, so it cannot be claimed in between
+            owned = (await session.exec(
+                select(SynthesisJob)
+                    .where(col(SynthesisJob.id) == job.id)
+                    .where(col(SynthesisJob.claim_token) == job.claim_token)
+                    .with_for_update()
+            )).first()
+
+            if owned is None:
+                raise ClaimLost(f"Synthesis job {job.id} was claimed by another worker")
+
+            partial.replace(destination)
+
+            owned.status = JobStatus.COMPLETED
+            owned.completed_at = owned.updated_at = utcnow()
+            session.add(owned)
+            await session.commit()
+
+    async def _synthesize(self, provider: TTSProvider, voice: str, chunk: str) -> bytes:
+        # Jobs give way to interactive requests: when the provider is saturated, wait and try again
+        while True:
+            try:
+                return await provider.synthesize_speech(voice, chunk, output_format=AudioFormat.PCM)
+            except ExecutorSaturated:
+                await asyncio.sleep(self.poll_interval)
+
+    def _write(self, file: BinaryIO, encoder: StreamEncoder, pcm: bytes) -> None:
+        file.write(encoder.encode(np.frombuffer(pcm, dtype='<i2')))
+
+    def _finish(self, file: BinaryIO, encoder: StreamEncoder) -> None:
+        file.write(encoder.finish())
+        file.flush()
+        os.fsync(file.fileno())
+
+    async def _fail(self, job: SynthesisJob, error: str) -> None:
+        try:
+            await self._update(job, status=JobStatus.FAILED, error=error, completed_at=utcnow())
+        except ClaimLost:
+            logger.warning("Synthesis job %s was claimed by another worker, not marking it failed", job.id)
+
+    async def _process(self, job: SynthesisJob) -> None:
+        processing = asyncio.current_task()
+        assert processing is not None
+
+        heartbeat = asyncio.create_task(self._heartbeat(job, processing))
+
+        try:
+            await self._run_job(job)
+        finally:
+            heartbeat.cancel()
+
+    async def _run_job(self, job: SynthesisJob) -> None:
+        try:
+            provider = await self.provider_for(job.voice)
+        except ProviderUnavailable as e:
+            await self._fail(job, str(e))
+            return
+
+        if provider is None:
+            await self._fail(job, f"Voice '{job.voice}' is not supported")
+            return
+
+        format = AudioFormat(job.format)
+        chunks = chunk_text(job.text, self.chunk_characters)
+        encoder = StreamEncoder(samplerate=provider.sample_rate, format=format, settings=self.encoders.get(format))
+
+        destination = self.audio_path(job)
+        partial = destination.with_suffix(f"{destination.suffix}.{job.claim_token}.partial")
+
+        # Chunks are started in order, at most `chunk_concurrency` ahead of the one being written
+        pending: deque[asyncio.Task[bytes]] = deque()
+        remaining = iter(chunks)
+
+        def start_next() -> None:
+            chunk = next(remaining, None)
+
+            if chunk is not None:
+                task = asyncio.create_task(self._synthesize(provider, job.voice, chunk))
+
+                # A failure is reported by the chunk awaited first; later ones may never be
+                task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+                pending.append(task)
+
+        try:
+            with partial.open("wb") as file:
+                for _ in range(self.chunk_concurrency):
+                    start_next()
+
+                done = 0
+
+                while pending:
+                    pcm = await pending.popleft()
+                    start_next()
+
+                    await asyncio.to_thread(self._write, file, encoder, pcm)
+
+                    done += 1
+                    await self._update(job, chunks_done=done)
+
+                await asyncio.to_thread(self._finish, file, encoder)
+
+            await self._complete(job, partial, destination)
+        except asyncio.CancelledError:
+            # Shutting down (or abandoned); the job is left running and another worker picks it up once stale
+            raise
+        except ClaimLost:
+            logger.warning("Synthesis job %s was claimed by another worker, abandoning it", job.id)
+        except Exception as e:
+            logger.exception("Synthesis job %s failed", job.id)
+            await self._fail(job, str(e))
+        finally:
+            for task in pending:
+                task.cancel()
+
+            partial.unlink(missing_ok=True)
+
+    async def _expire(self) -> None:
+        cutoff = utcnow() - datetime.timedelta(seconds=self.retention)
+
+        async with self.database.get_session() as session:
+            jobs = (await session.exec(
+                select(SynthesisJob)
+                    .where(col(SynthesisJob.status).in_([JobStatus.COMPLETED, JobStatus.FAILED]))
+                    .where(col(SynthesisJob.completed_at) < cutoff)
+            )).all()
+
+            for job in jobs:
+                self.audio_path(job).unlink(missing_ok=True)
+                await session.delete(job)
+
+            await session.commit()
+
+    def _finished(self, job_id: str) -> None:
+        self.running.pop(job_id, None)
+
+        # A slot is free, so claim the next job straight away
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        last_expired = 0.0
+
+        while True:
+            try:
+                while len(self.running) < self.max_jobs and (job := await self._claim()) is not None:
+                    task = asyncio.create_task(self._process(job))
+                    task.add_done_callback(lambda _, job_id=job.id: self._finished(job_id))
+                    self.running[job.id] = task
+
+                loop_time = asyncio.get_running_loop().time()
+
+                if loop_time - last_expired > min(self.retention, 60.0):
+                    await self._expire()
+                    last_expired = loop_time
+            except Exception:
+                logger.exception("Failed to schedule synthesis jobs")
+
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        tasks = [*self.running.values(), *([self._task] if self._task is not None else [])]
+
+        for task in tasks:
+            task.cancel()
+
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+
+        self._task = None
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from collections.abc import AsyncGenerator
 import importlib
@@ -10,22 +11,33 @@ import logfire
 from opentelemetry.instrumentation.botocore import BotocoreInstrumentor
 from sqlmodel import select
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi.errors import RateLimitExceeded
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.exc import IntegrityError
 
 from src.configuration import Configuration
 from src.database import Database
+from src.executor import ExecutorSaturated
+from src.jobs import JobRunner
+from src.providers import ProviderRegistry, ProviderUnavailable, configured_providers
+from src.metrics import StateCollector
+from src.timing import ServerTimingMiddleware
 import src.models
-from src.cache import LRUCache, TTLCache
-from src.api.limiter import limiter
+from src.models.user import User, encode_cached_user
+from src.cache import Cache, DiskCache, LRUCache, RedisCache, TieredCache, TTLCache
+from src.api.limiter import MemoryRateLimiter, RateLimiter, RedisRateLimiter
+from src.singleflight import SingleFlight, StreamingSingleFlight
+from src.usage_writer import UsageWriter
+from src.user_directory import UserDirectory
 from src.routers import (
+    jobs_router,
     legacy_router,
     speech_router,
     users_router,
 )
 
-from src.tts.kokoro import KokoroProvider
+from src.tts.fragments import FragmentStitcher
 
 
 # Dynamically import all models in src.models
@@ -39,6 +51,9 @@ for _, module_name, is_pkg in pkgutil.iter_modules(package.__path__, package.__n
 
 CONFIGURATION: Configuration = Configuration.get()
 
+# Seconds the readiness probe waits for the database before reporting it unavailable
+READINESS_TIMEOUT = 2.0
+
 
 logger = logging.getLogger()
 
@@ -65,18 +80,151 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     database = await Database.initialize(configuration.async_database_url)
     logfire.instrument_sqlalchemy(database.engine, enable_commenter=True)
 
-    # Setup LRU cache
-    app.state.ttl_cache = TTLCache(maxsize=configuration.ttl_cache_size, ttl=configuration.ttl_cache_ttl)
-    app.state.cache = LRUCache(max_size=configuration.lru_cache_size)
+    # Setup caches; users are looked up in the TTL cache first
+    user_memory = TTLCache[User](
+        maxsize=configuration.ttl_cache_size,
+        ttl=configuration.ttl_cache_ttl,
+        sweep_interval=configuration.ttl_cache_sweep_interval,
+    )
+    user_tiers: list[Cache[User]] = [user_memory]
+
+    # Audio is looked up in memory first, then (optionally) on local disk
+    audio_memory = LRUCache[bytes](
+        max_size=None,
+        max_bytes=configuration.lru_cache_max_bytes,
+        max_entry_bytes=configuration.lru_cache_max_entry_bytes,
+    )
+    audio_tiers: list[Cache[bytes]] = [audio_memory]
+
+    if configuration.disk_cache_path:
+        audio_tiers.append(
+            DiskCache(
+                configuration.disk_cache_path,
+                max_bytes=configuration.disk_cache_max_bytes,
+            )
+        )
+
+    rate_limiter: RateLimiter = MemoryRateLimiter()
+
+    # The shared backend sits behind the local tiers so that every worker benefits from each synthesis
+    if configuration.cache_backend == "redis" and configuration.redis_url:
+        redis_url = configuration.redis_url.get_secret_value()
+
+        user_tiers.append(
+            RedisCache[User].from_url(
+                redis_url,
+                max_connections=configuration.redis_max_connections,
+                prefix="tts:user:",
+                ttl=configuration.ttl_cache_ttl,
+                encode=encode_cached_user,
+                decode=User.model_validate_json,
+            )
+        )
+
+        audio_tiers.append(
+            RedisCache[bytes].from_url(
+                redis_url,
+                max_connections=configuration.redis_max_connections,
+                prefix="tts:audio:",
+            )
+        )
+
+        # Rate limits are enforced across every worker rather than per worker
+        rate_limiter = RedisRateLimiter.from_url(
+            redis_url,
+            max_connections=configuration.redis_max_connections,
+        )
+
+    app.state.ttl_cache = TieredCache(*user_tiers)
+    app.state.rejected_tokens = TTLCache[bool](
+        maxsize=configuration.negative_cache_size,
+        ttl=configuration.negative_cache_ttl,
+        sweep_interval=configuration.ttl_cache_sweep_interval,
+    )
+    app.state.cache = TieredCache(*audio_tiers)
+    app.state.synthesis_flights = StreamingSingleFlight()
+    app.state.fragment_stitcher = None
+
+    if configuration.fragment_cache:
+        app.state.fragment_stitcher = FragmentStitcher(
+            app.state.cache,
+            concurrency=configuration.fragment_cache_concurrency,
+            encoders=configuration.encoders,
+        )
+
+    app.state.user_flights = SingleFlight[User | None]()
     app.state.database = database
-    app.state.limiter = limiter  # TODO: Is this needed?
+    app.state.usage_writer = UsageWriter(
+        database,
+        max_batch_size=configuration.usage_batch_size,
+        flush_interval=configuration.usage_flush_interval,
+        max_pending=configuration.usage_max_pending,
+    )
+    app.state.usage_writer.start()
+
+    app.state.user_directory = None
+
+    if configuration.user_directory:
+        app.state.user_directory = UserDirectory(
+            database,
+            poll_interval=configuration.user_directory_poll_interval,
+        )
+
+        await app.state.user_directory.start()
+
+    app.state.rate_limiter = rate_limiter
 
-    # TODO: These providers should be initialized based on configuration
-    # not hardcoded here.
-    app.state.kokoro_provider = KokoroProvider(lang_code='a')
+    # Only the configured providers are built, in the background, so startup never waits for a model to load
+    app.state.providers = ProviderRegistry(configured_providers(configuration))
+    app.state.providers.preload()
+
+    app.state.metrics = StateCollector(
+        caches={
+            "audio": audio_memory,
+            "users": user_memory,
+            "rejected_tokens": app.state.rejected_tokens,
+        },
+        executors=app.state.providers.executors,
+        pool=database.engine.pool if isinstance(database.engine.pool, QueuePool) else None,
+    )
+    REGISTRY.register(app.state.metrics)
+
+    app.state.job_runner = None
+
+    if configuration.jobs_path is not None:
+        app.state.job_runner = JobRunner(
+            database,
+            app.state.providers,
+            configuration.jobs_path,
+            encoders=configuration.encoders,
+            chunk_characters=configuration.maximum_characters_per_request,
+            chunk_concurrency=configuration.job_chunk_concurrency,
+            max_jobs=configuration.job_max_concurrent,
+            poll_interval=configuration.job_poll_interval,
+            retention=configuration.job_retention,
+        )
+
+        app.state.job_runner.start()
 
     yield
 
+    # Jobs interrupted here are left running and picked up again once they go stale
+    if app.state.job_runner is not None:
+        await app.state.job_runner.close()
+
+    REGISTRY.unregister(app.state.metrics)
+    await app.state.providers.close()
+
+    # Drain buffered usage before the database goes away
+    await app.state.usage_writer.close()
+
+    if app.state.user_directory is not None:
+        await app.state.user_directory.close()
+
+    await app.state.cache.close()
+    await app.state.ttl_cache.close()
+    await app.state.rejected_tokens.close()
+    await app.state.rate_limiter.close()
     await database.close()
 
 
@@ -91,16 +239,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if CONFIGURATION.server_timing:
+    app.add_middleware(ServerTimingMiddleware, log=CONFIGURATION.server_timing_log)
+
+app.include_router(jobs_router)
 app.include_router(legacy_router)
 app.include_router(speech_router)
 app.include_router(users_router)
 
 
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Speech synthesis is at capacity, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(ProviderUnavailable)
+async def provider_unavailable_handler(request: Request, exc: ProviderUnavailable) -> JSONResponse:
     return JSONResponse(
-        status_code=429,
-        content={"detail": "Rate limit exceeded"},
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "5"},
     )
 
 
@@ -120,3 +282,44 @@ async def health(request: Request) -> dict[str, str]:
         await session.exec(select(1))
 
     return {"status": "ok"}
+
+
+@app.get("/health/live")
+async def liveness() -> dict[str, str]:
+    # No I/O: a slow database or a model still loading must not get a healthy process restarted
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def readiness(request: Request) -> JSONResponse:
+    database: Database = request.app.state.database
+    providers: ProviderRegistry = request.app.state.providers
+    pool = database.engine.pool
+
+    try:
+        async with asyncio.timeout(READINESS_TIMEOUT):
+            async with database.get_session() as session:
+                await session.exec(select(1))
+
+        database_status = "ok"
+    except Exception:
+        logger.warning("Readiness check could not reach the database", exc_info=True)
+        database_status = "unavailable"
+
+    ready = database_status == "ok" and providers.ready
+    content = {
+        "status": "ok" if ready else "unavailable",
+        "database": database_status,
+        "providers": providers.status(),
+    }
+
+    if isinstance(pool, QueuePool):
+        content["pool"] = {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()}
+
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    # Everything collected here is already in memory, so scraping does no I/O
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
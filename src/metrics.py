@@ -0,0 +1,131 @@
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping
+from contextlib import aclosing
+import functools
+import time
+from typing import Any
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy.pool import QueuePool
+
+from src.cache import LRUCache, TTLCache
+from src.executor import BoundedExecutor
+
+
+SYNTHESIS_SECONDS = Histogram(
+    "tts_synthesis_duration_seconds",
+    "Time to synthesize a request, from the provider call until its last chunk",
+    ["provider"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+FIRST_CHUNK_SECONDS = Histogram(
+    "tts_synthesis_first_chunk_seconds",
+    "Time from the provider call until the first chunk of audio",
+    ["provider"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+SYNTHESIZED_CHARACTERS = Counter(
+    "tts_synthesized_characters",
+    "Characters synthesized by a provider (cache hits excluded)",
+    ["provider", "voice"],
+)
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "tts_db_pool_checkout_seconds",
+    "Time spent waiting for a database connection from the pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+def instrument_synthesis(
+    stream_speech: Callable[..., AsyncIterator[bytes]],
+) -> Callable[..., AsyncIterator[bytes]]:
+    """
+    Record latency and characters for a provider's `stream_speech`. Only streams that complete are
+    recorded, so failures and abandoned responses do not skew the latency histograms.
+    """
+    @functools.wraps(stream_speech)
+    async def wrapper(self: Any, voice: str, text: str, **kwargs: Any) -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        first = True
+
+        async with aclosing(stream_speech(self, voice, text, **kwargs)) as stream:
+            async for chunk in stream:
+                if first:
+                    FIRST_CHUNK_SECONDS.labels(self.name).observe(time.perf_counter() - started)
+                    first = False
+
+                yield chunk
+
+        SYNTHESIS_SECONDS.labels(self.name).observe(time.perf_counter() - started)
+        SYNTHESIZED_CHARACTERS.labels(self.name, voice).inc(len(text))
+
+    return wrapper
+
+
+class StateCollector(Collector):
+    """
+    Exports the counters and sizes the caches, executors and connection pool already keep. Nothing is
+    recorded per request; the values are read only when metrics are scraped.
+
+    `executors` is called on every scrape, since executors appear as the providers that own them load.
+    """
+
+    def __init__(
+        self,
+        caches: Mapping[str, LRUCache[Any]],
+        executors: Callable[[], Iterable[BoundedExecutor]] = list,
+        pool: QueuePool | None = None,
+    ) -> None:
+        self.caches = caches
+        self.executors = executors
+        self.pool = pool
+
+    def describe(self) -> Iterable[Any]:
+        # Nothing to check for duplicates up front; avoids collecting while registering
+        return []
+
+    def collect(self) -> Iterable[Any]:
+        hits = CounterMetricFamily("tts_cache_hits", "Cache lookups that found an entry", labels=["cache"])
+        misses = CounterMetricFamily("tts_cache_misses", "Cache lookups that found nothing", labels=["cache"])
+        evictions = CounterMetricFamily(
+            "tts_cache_evictions",
+            "Entries evicted to stay within the cache's bounds",
+            labels=["cache"],
+        )
+        expirations = CounterMetricFamily("tts_cache_expirations", "Entries removed once expired", labels=["cache"])
+        size = GaugeMetricFamily("tts_cache_bytes", "Approximate size of the values held", labels=["cache"])
+        entries = GaugeMetricFamily("tts_cache_entries", "Entries held", labels=["cache"])
+
+        for name, cache in self.caches.items():
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            evictions.add_metric([name], cache.evictions)
+            size.add_metric([name], cache.memory_usage)
+            entries.add_metric([name], len(cache))
+
+            if isinstance(cache, TTLCache):
+                expirations.add_metric([name], cache.expirations)
+
+        yield from (hits, misses, evictions, expirations, size, entries)
+
+        queued = GaugeMetricFamily("tts_executor_queue_depth", "Calls waiting for a worker", labels=["executor"])
+        active = GaugeMetricFamily("tts_executor_active", "Calls running on a worker", labels=["executor"])
+
+        for executor in self.executors():
+            queued.add_metric([executor.name], executor.queued)
+            active.add_metric([executor.name], executor.active)
+
+        yield from (queued, active)
+
+        if self.pool is not None:
+            yield GaugeMetricFamily(
+                "tts_db_pool_checked_out",
+                "Database connections currently checked out",
+                value=self.pool.checkedout(),
+            )
+
+            yield GaugeMetricFamily("tts_db_pool_size", "Database connections in the pool", value=self.pool.size())
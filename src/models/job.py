@@ -0,0 +1,69 @@
+import datetime
+from enum import StrEnum
+import uuid
+
+from sqlmodel import AutoString, Field, SQLModel
+
+from src.models.speech import SupportedVoices
+from src.tts.formats import AudioFormat
+
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class SynthesisJobBase(SQLModel):
+    voice: str
+
+    # Stored as plain strings rather than database enum types
+    format: AudioFormat = Field(default=AudioFormat.MP3, sa_type=AutoString)
+
+
+class SynthesisJob(SynthesisJobBase, table=True):
+    """
+    Long-text synthesis run in the background. The assembled audio is written to the jobs directory and
+    removed, along with the row, once the job has been finished for longer than the retention period.
+    """
+    __tablename__ = "synthesis_job"  # type: ignore[assignment]
+
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    text: str
+
+    status: JobStatus = Field(default=JobStatus.QUEUED, sa_type=AutoString, index=True)
+    chunks_total: int = 0
+    chunks_done: int = 0
+    error: str | None = None
+
+    created_at: datetime.datetime = Field(default_factory=utcnow)
+
+    # Set anew each time a worker claims the job; only the worker holding it may update the job
+    claim_token: str | None = None
+
+    # Bumped periodically while the job runs; a running job that stops being updated was abandoned and is
+    # picked up again
+    updated_at: datetime.datetime = Field(default_factory=utcnow, index=True)
+    completed_at: datetime.datetime | None = None
+
+
+class CreateSynthesisJob(SynthesisJobBase):
+    voice: SupportedVoices  # type: ignore[assignment]
+    text: str
+
+
+class SynthesisJobStatus(SynthesisJobBase):
+    id: str
+    status: JobStatus
+    characters: int
+    chunks_total: int
+    chunks_done: int
+    error: str | None
+    created_at: datetime.datetime
+    completed_at: datetime.datetime | None
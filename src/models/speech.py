@@ -0,0 +1,23 @@
+from typing import Literal
+
+from sqlmodel import Field, SQLModel
+
+from src.clients.polly import TextTypeType
+from src.tts.formats import AudioFormat
+from src.types.aws import AWSStandardVoices
+from src.types.kokoro import KokoroVoices
+
+
+# Combined type for OpenAPI schema generation
+SupportedVoices = Literal[AWSStandardVoices, KokoroVoices]
+
+
+class BatchItem(SQLModel):
+    voice: SupportedVoices
+    text: str
+    text_type: TextTypeType = TextTypeType.Text
+    format: AudioFormat = AudioFormat.MP3
+
+
+class BatchRequest(SQLModel):
+    items: list[BatchItem] = Field(min_length=1)
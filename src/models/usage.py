@@ -11,3 +11,46 @@ class Usage(SQLModel, table=True):
         default_factory=lambda: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
         index=True,
     )
+
+
+class UsageHourly(SQLModel, table=True):
+    """
+    Per-user usage totals for each UTC hour, maintained incrementally alongside the raw `Usage` table.
+    """
+    __tablename__ = "usage_hourly"  # type: ignore[assignment]
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    bucket: datetime.datetime = Field(primary_key=True)
+
+    characters_used: int = 0
+    requests: int = 0
+
+
+class UsageDaily(SQLModel, table=True):
+    """
+    Per-user usage totals for each UTC day, maintained incrementally alongside the raw `Usage` table.
+    """
+    __tablename__ = "usage_daily"  # type: ignore[assignment]
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    bucket: datetime.date = Field(primary_key=True)
+
+    characters_used: int = 0
+    requests: int = 0
+
+
+class UsageBucket(SQLModel):
+    bucket: datetime.datetime
+    characters_used: int
+    requests: int
+
+
+class UsageSummary(SQLModel):
+    user_id: int
+    granularity: str
+    start: datetime.datetime
+    end: datetime.datetime
+
+    characters_used: int
+    requests: int
+    buckets: list[UsageBucket]
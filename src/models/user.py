@@ -1,14 +1,62 @@
+import datetime
+import hashlib
+
+from limits import parse
+from pydantic import field_validator
 from sqlmodel import Field, SQLModel
 
 
+def token_key(token: str) -> str:
+    """
+    Key for an API token in caches and the user directory, so raw secrets are never held as keys in memory
+    or Redis.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 class UserBase(SQLModel):
     username: str = Field(index=True, unique=True)
 
+    # Characters this user may synthesize, in rate limit notation (e.g. "10000/minute"); the configured
+    # `maximum_characters_per_minute` applies when unset
+    rate_limit: str | None = Field(default=None)
+
+    @field_validator("rate_limit")
+    @classmethod
+    def validate_rate_limit(cls, value: str | None) -> str | None:
+        if value is not None:
+            parse(value)
+
+        return value
+
 
 class User(UserBase, table=True):
     id: int = Field(default=None, primary_key=True)
     api_token: str = Field(index=True, unique=True)
 
 
+def encode_cached_user(user: User) -> bytes:
+    """
+    Serialize a user for shared caches such as Redis. The API token is left out: entries are already keyed
+    by its hash, and authentication only needs the user's identity and limits.
+    """
+    return user.model_dump_json(exclude={"api_token"}).encode()
+
+
 class CreateUser(UserBase):
     pass
+
+
+class UserChange(SQLModel, table=True):
+    """
+    Append-only log of user inserts, updates and deletes, written by a database trigger. The user directory
+    polls it incrementally and is woken by a `user_changes` notification for each new entry.
+    """
+    __tablename__ = "user_change"  # type: ignore[assignment]
+
+    id: int = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    operation: str
+    created_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
+    )
@@ -0,0 +1,199 @@
+import asyncio
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from functools import partial
+import logging
+import time
+from typing import get_args
+
+from src.configuration import Configuration
+from src.executor import BoundedExecutor
+from src.tts.provider import TTSProvider
+from src.types.aws import AWSStandardVoices
+from src.types.kokoro import KokoroVoices
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailable(Exception):
+    """
+    Raised when a provider is not enabled on this server, or could not be loaded.
+    """
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    name: str
+    voices: list[str]
+
+    # Builds the provider; blocking (it may import and load a model), so it runs on a worker thread
+    load: Callable[[], TTSProvider]
+
+
+def _load_polly(configuration: Configuration) -> TTSProvider:
+    from src.clients.polly import PollyProvider
+
+    return PollyProvider(
+        region_name=configuration.polly_region,
+        max_pool_connections=configuration.polly_max_pool_connections,
+        tcp_keepalive=configuration.polly_tcp_keepalive,
+        endpoint_url=configuration.polly_endpoint_url,
+        max_attempts=configuration.polly_max_attempts,
+    )
+
+
+def _load_kokoro(configuration: Configuration) -> TTSProvider:
+    # torch and kokoro are only imported on servers that serve Kokoro voices
+    from src.tts.kokoro import KokoroProvider, configure_torch_threads
+
+    # CPU-bound inference gets its own pool; Polly calls are asyncio-native and need no threads
+    executor = BoundedExecutor(
+        "kokoro",
+        max_workers=configuration.kokoro_workers,
+        max_queue=configuration.kokoro_max_queue,
+        initializer=partial(
+            configure_torch_threads,
+            configuration.kokoro_intra_op_threads,
+            configuration.kokoro_inter_op_threads,
+        ),
+    )
+
+    return KokoroProvider(
+        lang_code=configuration.kokoro_lang_code,
+        executor=executor,
+        max_batch_size=configuration.kokoro_max_batch_size,
+        batch_window=configuration.kokoro_batch_window,
+        encoders=configuration.encoders,
+    )
+
+
+def configured_providers(configuration: Configuration) -> list[ProviderSpec]:
+    specs = {
+        "polly": ProviderSpec("polly", list(get_args(AWSStandardVoices)), partial(_load_polly, configuration)),
+        "kokoro": ProviderSpec("kokoro", list(get_args(KokoroVoices)), partial(_load_kokoro, configuration)),
+    }
+
+    return [specs[name] for name in configuration.providers]
+
+
+class ProviderRegistry:
+    """
+    The providers enabled on this server, each built the first time it is needed.
+
+    `preload` starts building every provider in the background, so the server starts (and reports itself
+    live) straight away while models load; a request for a provider still loading waits for it. A provider
+    that fails to load is reported by `status` and tried again on the next request for it.
+    """
+
+    def __init__(self, specs: Iterable[ProviderSpec]) -> None:
+        self.specs = {spec.name: spec for spec in specs}
+        self.providers: dict[str, TTSProvider] = {}
+        self.errors: dict[str, str] = {}
+
+        self._voices = {voice: spec.name for spec in self.specs.values() for voice in spec.voices}
+        self._loading: dict[str, asyncio.Task[TTSProvider]] = {}
+
+    @classmethod
+    def of(cls, *providers: TTSProvider) -> "ProviderRegistry":
+        """
+        Registry of providers that are already built.
+        """
+        registry = cls(
+            ProviderSpec(provider.name, provider.voices(), lambda provider=provider: provider)
+            for provider in providers
+        )
+
+        registry.providers = {provider.name: provider for provider in providers}
+        return registry
+
+    def voices(self) -> list[str]:
+        return list(self._voices)
+
+    def name_for(self, voice: str) -> str | None:
+        return self._voices.get(voice)
+
+    def status(self) -> dict[str, str]:
+        def state(name: str) -> str:
+            if name in self.providers:
+                return "loaded"
+
+            if name in self._loading:
+                return "loading"
+
+            return "failed" if name in self.errors else "not_loaded"
+
+        return {name: state(name) for name in self.specs}
+
+    @property
+    def ready(self) -> bool:
+        return len(self.providers) == len(self.specs)
+
+    def executors(self) -> list[BoundedExecutor]:
+        return [
+            executor
+            for provider in self.providers.values()
+            if isinstance(executor := getattr(provider, "executor", None), BoundedExecutor)
+        ]
+
+    async def _load(self, spec: ProviderSpec) -> TTSProvider:
+        started = time.perf_counter()
+
+        try:
+            provider = await asyncio.to_thread(spec.load)
+        except Exception as e:
+            logger.exception("Failed to load the %s provider", spec.name)
+            self.errors[spec.name] = str(e)
+            raise
+        finally:
+            self._loading.pop(spec.name, None)
+
+        self.providers[spec.name] = provider
+        self.errors.pop(spec.name, None)
+
+        logger.info("Loaded the %s provider in %.1fs", spec.name, time.perf_counter() - started)
+        return provider
+
+    def _start(self, name: str) -> asyncio.Task[TTSProvider]:
+        task = self._loading.get(name)
+
+        if task is None:
+            task = asyncio.create_task(self._load(self.specs[name]))
+
+            # A failure is logged by `_load` and reported to whoever is waiting, if anyone
+            task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+            self._loading[name] = task
+
+        return task
+
+    def preload(self) -> None:
+        for name in self.specs:
+            if name not in self.providers:
+                self._start(name)
+
+    async def get(self, name: str) -> TTSProvider:
+        if (provider := self.providers.get(name)) is not None:
+            return provider
+
+        if name not in self.specs:
+            raise ProviderUnavailable(f"The {name} provider is not enabled on this server")
+
+        try:
+            # Shielded, so a request that goes away does not abandon a load others are waiting for
+            return await asyncio.shield(self._start(name))
+        except Exception as e:
+            raise ProviderUnavailable(f"The {name} provider could not be loaded") from e
+
+    async def for_voice(self, voice: str) -> TTSProvider | None:
+        name = self.name_for(voice)
+        return await self.get(name) if name is not None else None
+
+    async def close(self) -> None:
+        # A load already running on its thread cannot be interrupted; it is simply never used
+        for task in self._loading.values():
+            task.cancel()
+
+        for provider in self.providers.values():
+            await provider.close()
+
+        self.providers.clear()
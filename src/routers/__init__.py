@@ -1,9 +1,11 @@
+from src.routers.jobs import router as jobs_router
 from src.routers.legacy import router as legacy_router
 from src.routers.speech import router as speech_router
 from src.routers.users import router as users_router
 
 
 __all__ = [
+    "jobs_router",
     "legacy_router",
     "speech_router",
     "users_router",
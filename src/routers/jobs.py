@@ -0,0 +1,135 @@
+from fastapi import APIRouter, HTTPException, Request, Response, Depends, status
+from fastapi.responses import FileResponse
+
+from src.api.auth import get_current_user
+from src.api.limiter import charge_characters
+from src.configuration import Configuration
+from src.jobs import JobRunner
+from src.models.job import CreateSynthesisJob, JobStatus, SynthesisJob, SynthesisJobStatus
+from src.models.user import User
+from src.tts.formats import FORMATS, AudioFormat
+from src.usage_writer import UsageWriter
+
+
+router = APIRouter(prefix="/v1/jobs")
+
+
+def get_job_runner(request: Request) -> JobRunner:
+    runner: JobRunner | None = request.app.state.job_runner
+
+    if runner is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Synthesis jobs are not enabled on this server.",
+        )
+
+    return runner
+
+
+def job_status(job: SynthesisJob) -> SynthesisJobStatus:
+    return SynthesisJobStatus(
+        id=job.id,
+        voice=job.voice,
+        format=job.format,
+        status=job.status,
+        characters=len(job.text),
+        chunks_total=job.chunks_total,
+        chunks_done=job.chunks_done,
+        error=job.error,
+        created_at=job.created_at,
+        completed_at=job.completed_at,
+    )
+
+
+async def get_user_job(job_id: str, runner: JobRunner, user: User) -> SynthesisJob:
+    job = await runner.get(job_id)
+
+    # Other users' jobs are indistinguishable from ones that do not exist
+    if job is None or job.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+
+    return job
+
+
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    request: Request,
+    response: Response,
+    job: CreateSynthesisJob,
+    configuration: Configuration = Depends(Configuration.get),
+    user: User = Depends(get_current_user),
+) -> SynthesisJobStatus:
+    """
+    Queue text of up to `job_max_characters` for synthesis in the background. Poll the returned job until it
+    has completed, then download its audio.
+    """
+    runner = get_job_runner(request)
+    usage_writer: UsageWriter = request.app.state.usage_writer
+
+    if len(job.text) > configuration.job_max_characters:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Text length exceeds maximum of {configuration.job_max_characters} characters.",
+        )
+
+    if not job.text.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Text must not be empty.",
+        )
+
+    provider = await runner.provider_for(job.voice)
+
+    if provider is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Voice '{job.voice}' is not supported by any available TTS provider.",
+        )
+
+    # A job is charged up front and may leave its bucket in debt for a long time, so jobs have a bucket of
+    # their own rather than locking the user out of /v1/speech until it refills
+    response.headers.update(await charge_characters(request, user, len(job.text), bucket="jobs"))
+    created = await runner.submit(user.id, job.voice, job.text, job.format)
+
+    if provider.has_financial_cost:
+        await usage_writer.record(user.id, len(job.text))
+
+    response.headers["Location"] = f"{router.prefix}/{created.id}"
+    return job_status(created)
+
+
+@router.get("/{job_id}")
+async def get_job(
+    request: Request,
+    job_id: str,
+    user: User = Depends(get_current_user),
+) -> SynthesisJobStatus:
+    return job_status(await get_user_job(job_id, get_job_runner(request), user))
+
+
+@router.get("/{job_id}/audio")
+async def get_job_audio(
+    request: Request,
+    job_id: str,
+    user: User = Depends(get_current_user),
+) -> FileResponse:
+    runner = get_job_runner(request)
+    job = await get_user_job(job_id, runner, user)
+
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is {job.status}; audio is only available once it has completed.",
+        )
+
+    spec = FORMATS[AudioFormat(job.format)]
+
+    # Served from disk, with Range support, without holding the audio in memory
+    return FileResponse(
+        runner.audio_path(job),
+        media_type=spec.media_type,
+        filename=f"{job.id}.{spec.extension}",
+    )
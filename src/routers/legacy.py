@@ -1,23 +1,26 @@
+from typing import AsyncIterator
 import xml.etree.ElementTree as ET
 
 from fastapi import APIRouter, HTTPException, Request, Response, Depends, status
 
-from src.api.limiter import callable_rate_limit, limiter, get_character_cost
+from src.api.limiter import charge_characters
 from src.api.auth import get_current_user
-from src.cache import LRUCache
+from src.cache import Cache
 from src.clients.polly import PollyProvider, SSMLException, TextTypeType
 from src.configuration import Configuration
-from src.database import Database
-from src.models.usage import Usage
+from src.executor import ExecutorSaturated
 from src.models.user import User
+from src.singleflight import StreamingSingleFlight
+from src.timing import timed
+from src.tts.formats import AudioFormat
 from src.types.aws import AWSStandardVoices
+from src.usage_writer import UsageWriter
 
 
 router = APIRouter(prefix="/legacy")
 
 
 @router.get("/speech")
-@limiter.limit(callable_rate_limit, cost=get_character_cost)
 async def get_legacy_speech(
     request: Request,
     voice: AWSStandardVoices,
@@ -26,9 +29,10 @@ async def get_legacy_speech(
     configuration: Configuration = Depends(Configuration.get),
     user: User = Depends(get_current_user),
 ) -> Response:
-    database: Database = request.app.state.database
-    cache: LRUCache[bytes] = request.app.state.cache
-    provider = PollyProvider()
+    usage_writer: UsageWriter = request.app.state.usage_writer
+    cache: Cache[bytes] = request.app.state.cache
+    flights: StreamingSingleFlight = request.app.state.synthesis_flights
+    provider: PollyProvider = await request.app.state.providers.get("polly")  # type: ignore[assignment]
 
     if len(text) > configuration.maximum_characters_per_request:
         raise HTTPException(
@@ -36,55 +40,64 @@ async def get_legacy_speech(
             detail=f"Text length exceeds maximum of {configuration.maximum_characters_per_request} characters.",
         )
 
-    key = provider.generate_cache(voice, text)
-    cached_audio = await cache.get(key)
+    key = provider.generate_cache(voice, text, output_format=AudioFormat.MP3, text_type=text_type)
+
+    with timed("cache"):
+        cached_audio = await cache.get(key)
 
     if cached_audio is not None:
         return Response(
             content=cached_audio,
             media_type="audio/mpeg",
+            headers=await charge_characters(request, user, len(text), cached=len(text)),
         )
 
     if text_type == TextTypeType.Ssml:
         try:
-            ET.fromstring(text)
+            with timed("ssml"):
+                ET.fromstring(text)
         except ET.ParseError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid SSML format: {str(e)}. Ensure your SSML is well-formed XML and includes required tags like <speak>.",
             )
 
-    try:
-        audio_bytes = await provider.synthesize_speech(
+    rate_limit_headers = await charge_characters(request, user, len(text))
+
+    async def synthesize() -> AsyncIterator[bytes]:
+        # The legacy endpoint responds with the complete file, so there is nothing to gain from streaming
+        yield await provider.synthesize_speech(
             voice,
             text,
-            output_format='mp3',
+            output_format=AudioFormat.MP3,
             text_type=text_type,
         )
 
+    async def store(audio_bytes: bytes) -> None:
+        await cache.set(key, audio_bytes)
+
+    try:
+        # Identical concurrent requests share a single Polly call
+        audio_bytes = await flights.join(key, synthesize, on_complete=store).result()
+
     except SSMLException as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"SSML synthesis error: {str(e)}. Please check your SSML content.",
         )
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred during speech synthesis: {str(e)}",
         )
 
-    async with database.get_session() as session:
-        session.add(
-            Usage(
-                user_id=user.id,
-                characters_used=len(text),
-            )
-        )
-
-        await session.commit()
+    with timed("usage"):
+        await usage_writer.record(user.id, len(text))
 
-    await cache.set(key, audio_bytes)
     return Response(
         content=audio_bytes,
         media_type="audio/mpeg",
+        headers=rate_limit_headers,
     )
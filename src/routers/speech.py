@@ -1,47 +1,114 @@
-import io
-from typing import Literal, cast, get_args
+import asyncio
+import logging
+from typing import AsyncIterator, cast
 import xml.etree.ElementTree as ET
 
 from fastapi import APIRouter, HTTPException, Query, Request, Response, Depends, status
 from fastapi.responses import StreamingResponse
 
 from src.api.auth import get_current_user
-from src.api.limiter import callable_rate_limit, limiter, get_character_cost
-from src.cache import LRUCache
-from src.clients.polly import PollyProvider, SSMLException, TextTypeType
+from src.api.batch import BatchResult, multipart_boundary, multipart_stream, zip_stream
+from src.api.http_cache import audio_response, etag_for, matches_etag, not_modified
+from src.api.limiter import charge_characters
+from src.cache import Cache, get_many
+from src.clients.polly import SSMLException, TextTypeType
 from src.configuration import Configuration
-from src.database import Database
-from src.models.usage import Usage
+from src.executor import ExecutorSaturated
+from src.models.speech import BatchRequest, SupportedVoices
 from src.models.user import User
-from src.tts.kokoro import KokoroProvider
-from src.types.aws import AWSStandardVoices
-from src.types.kokoro import KokoroVoices
+from src.providers import ProviderRegistry
+from src.singleflight import Broadcast, StreamingSingleFlight
+from src.timing import timed
+from src.tts.fragments import FragmentStitcher
+from src.tts.formats import FORMATS, AudioFormat, negotiate_format
+from src.tts.provider import TTSProvider
+from src.usage_writer import UsageWriter
 
-# Combined type for OpenAPI schema generation
-SupportedVoices = Literal[AWSStandardVoices, KokoroVoices]
+
+logger = logging.getLogger(__name__)
 
 # Extend this as we add more providers
 router = APIRouter(prefix="/v1")
 
 
 @router.get("/voices")
-async def get_voices() -> list[str]:
-    return list(get_args(AWSStandardVoices)) + list(get_args(KokoroVoices))
+async def get_voices(request: Request) -> list[str]:
+    providers: ProviderRegistry = request.app.state.providers
+    return providers.voices()
+
+
+async def get_provider(request: Request, voice: str) -> TTSProvider:
+    providers: ProviderRegistry = request.app.state.providers
+
+    # Raises ProviderUnavailable (503) if the provider is enabled but failed to load
+    if (name := providers.name_for(voice)) is not None:
+        return await providers.get(name)
+
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Voice '{voice}' is not supported by any available TTS provider.",
+    )
+
+
+def validate_ssml(text: str, prefix: str = "") -> None:
+    try:
+        with timed("ssml"):
+            ET.fromstring(text)
+    except ET.ParseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{prefix}Invalid SSML format: {str(e)}. Ensure your SSML is well-formed XML and includes required tags like <speak>.",
+        )
+
+
+def synthesis(
+    request: Request,
+    provider: TTSProvider,
+    voice: str,
+    text: str,
+    text_type: TextTypeType,
+    output_format: AudioFormat,
+    cache_key: str | None,
+) -> Broadcast:
+    """
+    Start (or join) the synthesis of a request, caching the audio once it completes.
+    """
+    cache: Cache[bytes] = request.app.state.cache
+    flights: StreamingSingleFlight = request.app.state.synthesis_flights
+    stitcher: FragmentStitcher | None = request.app.state.fragment_stitcher
+
+    def synthesize() -> AsyncIterator[bytes]:
+        # Plain text can be synthesized and cached sentence by sentence; SSML cannot be split safely
+        if stitcher is not None and provider.can_cache and text_type == TextTypeType.Text:
+            return stitcher.stream(provider, voice, text, output_format=output_format)
+
+        # TODO: Correct the typing nightmare here
+        return provider.stream_speech(voice, text, output_format=output_format, text_type=text_type)  # type: ignore
+
+    async def store(content: bytes) -> None:
+        if cache_key is not None:
+            await cache.set(cache_key, content)
+
+    # Identical concurrent requests share a single synthesis rather than each running the provider
+    if cache_key is not None:
+        return flights.join(cache_key, synthesize, on_complete=store)
+
+    return Broadcast(synthesize())
 
 
 # Maybe we want to call specific vendors? I.E>., /v1/speech/polly, /v1/speech/kokoro, etc.
 @router.get("/speech")
-@limiter.limit(callable_rate_limit, cost=get_character_cost)
 async def get_speech(
     request: Request,
     voice: SupportedVoices = Query(...),
     text: str = Query(...),
     text_type: TextTypeType = Query(default=TextTypeType.Text),
+    format: AudioFormat | None = Query(default=None),
     configuration: Configuration = Depends(Configuration.get),
     user: User = Depends(get_current_user),
 ) -> Response:
-    database: Database = request.app.state.database
-    cache: LRUCache[bytes] = request.app.state.cache
+    usage_writer: UsageWriter = request.app.state.usage_writer
+    cache: Cache[bytes] = request.app.state.cache
 
     if len(text) > configuration.maximum_characters_per_request:
         raise HTTPException(
@@ -49,68 +116,195 @@ async def get_speech(
             detail=f"Text length exceeds maximum of {configuration.maximum_characters_per_request} characters.",
         )
 
-
-    # We need to route requests based on the speaker
-    # TODO: I sort of hate this.
-    provider: PollyProvider | KokoroProvider | None = None
+    provider = await get_provider(request, voice)
     cache_key: str | None = None
 
-    match voice:
-        case v if v in PollyProvider.voices():
-            provider = PollyProvider()
-        case v if v in KokoroProvider.voices():
-            provider = request.app.state.kokoro_provider
-        case _:
-            provider = None
-
-    if provider is None:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Voice '{voice}' is not supported by any available TTS provider.",
-        )
+    # An explicit `format` wins over the Accept header; anything we cannot match is served as MP3
+    output_format = negotiate_format(format, request.headers.get("accept"))
+    spec = FORMATS[output_format]
+    headers = {
+        "Content-Disposition": f'inline; filename="{voice}.{spec.extension}"',
+        "Cache-Control": configuration.cache_control(provider.name) if provider.can_cache else "no-store",
+        "Vary": "Accept",
+    }
 
     if provider.can_cache:
-        cache_key = provider.generate_cache(voice, text)
-
-        if cached_audio := await cache.get(cache_key):
-            return StreamingResponse(
-                content=io.BytesIO(cached_audio),
-                media_type="audio/mpeg",
-                headers={
-                    "Content-Disposition": f'inline; filename="{voice}.mp3"',
-                }
-            )
+        cache_key = provider.generate_cache(voice, text, output_format=output_format, text_type=text_type)
+        headers["ETag"] = etag_for(cache_key)
 
-    if provider.has_financial_cost:
-        async with database.get_session() as session:
-            session.add(
-                Usage(
-                    user_id=user.id,
-                    characters_used=len(text),
-                )
-            )
+        # The ETag is derived from the request alone, so revalidation never needs the audio itself
+        if matches_etag(request.headers.get("if-none-match"), headers["ETag"]):
+            headers.update(await charge_characters(request, user, len(text), cached=len(text)))
+            return not_modified(headers)
 
-            await session.commit()
+        with timed("cache"):
+            cached_audio = await cache.get(cache_key)
+
+        if cached_audio:
+            headers.update(await charge_characters(request, user, len(text), cached=len(text)))
+            return audio_response(request, cached_audio, spec.media_type, headers)
 
     # TODO: Support SSML input where applicable
     if text_type == TextTypeType.Ssml:
-        try:
-            ET.fromstring(text)
-        except ET.ParseError as e:
+        validate_ssml(text)
+
+    # Only now is the request known to need synthesis, and charged for it in full
+    headers.update(await charge_characters(request, user, len(text)))
+
+    if provider.has_financial_cost:
+        with timed("usage"):
+            await usage_writer.record(user.id, len(text))
+
+    stream = synthesis(request, provider, voice, text, text_type, output_format, cache_key).subscribe()
+
+    # Wait for the first chunk so that a failed synthesis is still reported as an error, rather than as
+    # a truncated 200 response; everything after it is streamed as the provider produces it.
+    first_chunk = await anext(stream, b"")
+
+    async def content() -> AsyncIterator[bytes]:
+        yield first_chunk
+
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(
+        content=content(),
+        media_type=spec.media_type,
+        headers=headers,
+    )
+
+
+@router.post("/speech/batch")
+async def post_speech_batch(
+    request: Request,
+    batch: BatchRequest,
+    configuration: Configuration = Depends(Configuration.get),
+    user: User = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    Synthesize many items in one request. The cache is checked for every item in a single pass and the
+    misses are synthesized concurrently, at most `<provider>_batch_concurrency` at a time per provider.
+    Results are streamed as `multipart/mixed` parts (or entries of a zip, with `Accept: application/zip`)
+    in the order they complete, each named after its item's index.
+    """
+    usage_writer: UsageWriter = request.app.state.usage_writer
+    cache: Cache[bytes] = request.app.state.cache
+    items = batch.items
+
+    if len(items) > configuration.maximum_batch_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Batch exceeds maximum of {configuration.maximum_batch_items} items.",
+        )
+
+    # The whole batch is validated up front, so it is rejected before anything is synthesized or billed
+    for index, item in enumerate(items):
+        if len(item.text) > configuration.maximum_characters_per_request:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid SSML format: {str(e)}. Ensure your SSML is well-formed XML and includes required tags like <speak>.",
+                status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                detail=f"Item {index}: Text length exceeds maximum of {configuration.maximum_characters_per_request} characters.",
             )
 
-    # TODO: Correct the typing nightmare here
-    content = await provider.synthesize_speech(voice, text)  # type: ignore
-    if provider.can_cache and cache_key is not None:
-        await cache.set(cache_key, content)
+        if item.text_type == TextTypeType.Ssml:
+            validate_ssml(item.text, prefix=f"Item {index}: ")
+
+    providers = [await get_provider(request, item.voice) for item in items]
+    cache_keys = [
+        provider.generate_cache(item.voice, item.text, output_format=item.format, text_type=item.text_type)
+        if provider.can_cache else None
+        for item, provider in zip(items, providers)
+    ]
+
+    cacheable = [index for index, key in enumerate(cache_keys) if key is not None]
+
+    with timed("cache"):
+        found = await get_many(cache, [cast(str, cache_keys[index]) for index in cacheable])
+
+    hits = {index: audio for index, audio in zip(cacheable, found) if audio is not None}
+    misses = [index for index in range(len(items)) if index not in hits]
+
+    rate_limit_headers = await charge_characters(
+        request,
+        user,
+        sum(len(item.text) for item in items),
+        cached=sum(len(items[index].text) for index in hits),
+    )
+
+    # Usage is recorded once for the whole batch
+    characters = sum(len(items[index].text) for index in misses if providers[index].has_financial_cost)
+
+    if characters:
+        with timed("usage"):
+            await usage_writer.record(user.id, characters)
+
+    semaphores = {
+        provider.name: asyncio.Semaphore(configuration.batch_concurrency(provider.name))
+        for provider in providers
+    }
+
+    def result_for(index: int) -> BatchResult:
+        spec = FORMATS[items[index].format]
+
+        return BatchResult(
+            index=index,
+            filename=f"{index}-{items[index].voice}.{spec.extension}",
+            media_type=spec.media_type,
+        )
+
+    async def synthesize(index: int) -> BatchResult:
+        item, provider, result = items[index], providers[index], result_for(index)
+
+        try:
+            async with semaphores[provider.name]:
+                result.audio = await synthesis(
+                    request,
+                    provider,
+                    item.voice,
+                    item.text,
+                    item.text_type,
+                    item.format,
+                    cache_keys[index],
+                ).result()
+        except SSMLException as e:
+            result.status_code = status.HTTP_400_BAD_REQUEST
+            result.detail = f"SSML synthesis error: {str(e)}. Please check your SSML content."
+        except ExecutorSaturated as e:
+            result.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            result.detail = str(e)
+        except Exception as e:
+            logger.exception("Batch item %d failed", index)
+            result.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+            result.detail = f"An error occurred during speech synthesis: {str(e)}"
+
+        return result
+
+    async def results() -> AsyncIterator[BatchResult]:
+        for index, audio in hits.items():
+            result = result_for(index)
+            result.audio = audio
+            yield result
+
+        tasks = [asyncio.create_task(synthesize(index)) for index in misses]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # The client went away; shared syntheses carry on and are still cached
+            for task in tasks:
+                task.cancel()
+
+    if "application/zip" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            content=zip_stream(results()),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="speech.zip"', **rate_limit_headers},
+        )
+
+    boundary = multipart_boundary()
 
     return StreamingResponse(
-        content=io.BytesIO(content),
-        media_type="audio/mpeg",
-        headers={
-            "Content-Disposition": f'inline; filename="{voice}.mp3"',
-        }
+        content=multipart_stream(results(), boundary),
+        media_type=f"multipart/mixed; boundary={boundary}",
+        headers=rate_limit_headers,
     )
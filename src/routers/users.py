@@ -1,8 +1,12 @@
+import datetime
 import secrets
-from fastapi import APIRouter, Request, Depends
-from sqlmodel import select
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query, Request, Depends, status
+from sqlmodel import col, select
 
 from src.database import Database
+from src.models.usage import UsageBucket, UsageDaily, UsageHourly, UsageSummary
 from src.models.user import CreateUser, User
 from src.api.auth import get_authorization_token
 
@@ -47,4 +51,89 @@ async def create_user(
         await session.commit()
         await session.refresh(nuser)
 
+    # Other workers pick the new user up from the change log
+    if request.app.state.user_directory is not None:
+        request.app.state.user_directory.put(nuser)
+
     return nuser
+
+
+def _naive_utc(value: datetime.datetime) -> datetime.datetime:
+    # Usage timestamps are stored as naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    return value
+
+
+@router.get("/{user_id}/usage")
+async def get_user_usage(
+    request: Request,
+    user_id: int,
+    start: datetime.datetime | None = Query(default=None),
+    end: datetime.datetime | None = Query(default=None),
+    granularity: Literal["hour", "day"] = Query(default="day"),
+) -> UsageSummary:
+    """
+    Usage totals for a user over `[start, end)`, read from the hourly or daily rollups rather than the raw
+    usage table. Buckets are included when they start within the range, so `start` is effectively rounded
+    down to the bucket boundary. Defaults to the last 30 days.
+    """
+    database: Database = request.app.state.database
+
+    end = _naive_utc(end) if end else datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    start = _naive_utc(start) if start else end - datetime.timedelta(days=30)
+
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end",
+        )
+
+    async with database.get_session() as session:
+        if await session.get(User, user_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found",
+            )
+
+        if granularity == "hour":
+            query = select(UsageHourly).where(
+                UsageHourly.user_id == user_id,
+                col(UsageHourly.bucket) >= start.replace(minute=0, second=0, microsecond=0),
+                col(UsageHourly.bucket) < end,
+            ).order_by(col(UsageHourly.bucket))
+        else:
+            # A day that begins exactly at `end` is outside the range; any later time includes that day
+            last_day = end.date() if end.time() != datetime.time.min else end.date() - datetime.timedelta(days=1)
+
+            query = select(UsageDaily).where(
+                UsageDaily.user_id == user_id,
+                col(UsageDaily.bucket) >= start.date(),
+                col(UsageDaily.bucket) <= last_day,
+            ).order_by(col(UsageDaily.bucket))
+
+        rows = (await session.exec(query)).all()
+
+    buckets = [
+        UsageBucket(
+            bucket=(
+                row.bucket
+                if isinstance(row.bucket, datetime.datetime)
+                else datetime.datetime.combine(row.bucket, datetime.time.min)
+            ),
+            characters_used=row.characters_used,
+            requests=row.requests,
+        )
+        for row in rows
+    ]
+
+    return UsageSummary(
+        user_id=user_id,
+        granularity=granularity,
+        start=start,
+        end=end,
+        characters_used=sum(bucket.characters_used for bucket in buckets),
+        requests=sum(bucket.requests for bucket in buckets),
+        buckets=buckets,
+    )
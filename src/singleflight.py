@@ -0,0 +1,143 @@
+from typing import AsyncIterator, Awaitable, Callable
+
+import asyncio
+
+
+class SingleFlight[T]:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key starts the work as a task; every caller that arrives while it is still
+    running awaits the same task instead of starting its own. The task is shielded from the callers, so a
+    disconnecting client never cancels work that other requests are waiting on.
+    """
+
+    def __init__(self) -> None:
+        self.calls: dict[str, asyncio.Task[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    def _finish(self, key: str, task: asyncio.Task[T]) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+
+        # Mark the exception as retrieved; it has already been delivered to any waiting callers.
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self.calls.get(key)
+
+        if task is None:
+            async def run() -> T:
+                return await fn()
+
+            task = asyncio.create_task(run())
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+            self.calls[key] = task
+
+        return await asyncio.shield(task)
+
+
+class Broadcast:
+    """
+    Consumes a single stream of audio chunks in the background and replays it to any number of subscribers.
+
+    Subscribers may join at any point; each one receives every chunk from the beginning. When the source
+    finishes successfully `on_complete` receives the full payload, e.g. to populate a cache.
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterator[bytes],
+        on_complete: Callable[[bytes], Awaitable[None]] | None = None,
+    ) -> None:
+        self.chunks: list[bytes] = []
+        self.done: bool = False
+        self.error: BaseException | None = None
+
+        self._changed = asyncio.Event()
+        self._on_complete = on_complete
+        self.task: asyncio.Task[None] = asyncio.create_task(self._pump(source))
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, source: AsyncIterator[bytes]) -> None:
+        try:
+            async for chunk in source:
+                if chunk:
+                    self.chunks.append(chunk)
+                    self._notify()
+
+            if self._on_complete is not None:
+                await self._on_complete(b"".join(self.chunks))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        index = 0
+
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+
+                return
+
+            await self._changed.wait()
+
+    async def result(self) -> bytes:
+        """
+        Wait for the stream to finish and return the full payload.
+        """
+        await asyncio.shield(self.task)
+
+        if self.error is not None:
+            raise self.error
+
+        return b"".join(self.chunks)
+
+
+class StreamingSingleFlight:
+    """
+    Coalesces concurrent streams that share a key into a single `Broadcast`.
+
+    A key stays registered until its source finishes, so requests arriving mid-stream join the running
+    broadcast and receive the audio produced so far immediately.
+    """
+
+    def __init__(self) -> None:
+        self.streams: dict[str, Broadcast] = {}
+
+    def __len__(self) -> int:
+        return len(self.streams)
+
+    def join(
+        self,
+        key: str,
+        fn: Callable[[], AsyncIterator[bytes]],
+        on_complete: Callable[[bytes], Awaitable[None]] | None = None,
+    ) -> Broadcast:
+        broadcast = self.streams.get(key)
+
+        if broadcast is None:
+            broadcast = Broadcast(fn(), on_complete=on_complete)
+            self.streams[key] = broadcast
+
+            def finish(_: asyncio.Task[None]) -> None:
+                if self.streams.get(key) is broadcast:
+                    del self.streams[key]
+
+            broadcast.task.add_done_callback(finish)
+
+        return broadcast
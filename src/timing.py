@@ -0,0 +1,129 @@
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseTimer:
+    """
+    Accumulates the time a request spends in each phase (authentication, cache lookup, inference, ...).
+    A phase entered several times, such as inference for each segment, is summed; phases run concurrently
+    may therefore add up to more than the request took.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self) -> str:
+        """
+        `Server-Timing` header value, in milliseconds, with the time so far as `total`.
+        """
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.1f}"
+            for name, seconds in [*self.phases.items(), ("total", self.elapsed)]
+        )
+
+
+current_timer: ContextVar[PhaseTimer | None] = ContextVar("current_timer", default=None)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    Time the enclosed block as phase `name` of the current request. Outside of a request (background jobs,
+    tests) this does nothing.
+    """
+    timer = current_timer.get()
+
+    if timer is None:
+        yield
+        return
+
+    started = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+async def timed_iter[T](name: str, iterator: AsyncIterator[T]) -> AsyncIterator[T]:
+    """
+    Time waiting for each item of `iterator` as phase `name`, excluding the time the consumer spends on it.
+    """
+    while True:
+        with timed(name):
+            try:
+                item = await anext(iterator)
+            except StopAsyncIteration:
+                return
+
+        yield item
+
+
+class ServerTimingMiddleware:
+    """
+    Gives every HTTP request a `PhaseTimer` and reports it in a `Server-Timing` response header, so slow
+    phases can be found from client-side captures without tracing.
+
+    The header is sent with the response headers, so a streamed response only reports the phases up to its
+    first chunk. With `log` a line with every phase is also logged once the response has been sent.
+    """
+
+    def __init__(self, app: ASGIApp, log: bool = False) -> None:
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = PhaseTimer()
+        token = current_timer.set(timer)
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timer.header())
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timer.reset(token)
+
+            if self.log:
+                logger.info(
+                    "%s %s %d: %s",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    timer.header(),
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status_code": status_code,
+                        "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in timer.phases.items()},
+                        "total_ms": round(timer.elapsed * 1000, 1),
+                    },
+                )
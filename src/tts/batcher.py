@@ -0,0 +1,83 @@
+from typing import Callable, TypeVar
+
+import asyncio
+
+from src.executor import BoundedExecutor, ExecutorSaturated
+
+
+I = TypeVar("I")
+O = TypeVar("O")
+
+
+class InferenceBatcher[I, O]:
+    """
+    Groups concurrent inference requests into batches.
+
+    Items are collected until either `max_batch_size` items are waiting or `max_wait` seconds have passed
+    since the first item of the batch arrived; the batch is then handed to `run_batch` on the executor as a
+    single call, and each caller receives its own output. `run_batch` must return one output per item, in
+    order.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[I]], list[O]],
+        executor: BoundedExecutor,
+        max_batch_size: int = 8,
+        max_wait: float = 0.005,
+    ) -> None:
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.pending: list[tuple[I, asyncio.Future[O]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, item: I, bounded: bool = True) -> O:
+        if bounded and self.executor.saturated:
+            raise ExecutorSaturated(f"The {self.executor.name} executor queue is full")
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[O] = loop.create_future()
+        self.pending.append((item, future))
+
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # Callers that gave up while waiting do not need their item computed.
+        batch = [(item, future) for item, future in self.pending if not future.done()]
+        self.pending = []
+
+        for start in range(0, len(batch), self.max_batch_size):
+            task = asyncio.create_task(self._run(batch[start:start + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[I, asyncio.Future[O]]]) -> None:
+        try:
+            outputs = await self.executor.run(
+                self.run_batch,
+                [item for item, _ in batch],
+                bounded=False,
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+            return
+
+        for (_, future), output in zip(batch, outputs):
+            if not future.done():
+                future.set_result(output)
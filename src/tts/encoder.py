@@ -0,0 +1,129 @@
+import numpy as np
+import soundfile as sf
+
+from src.tts.formats import FORMATS, QUALITY_PRESETS, AudioFormat, EncoderSettings, wav_header
+
+
+class _StreamBuffer:
+    """
+    Seekable, in-memory file handed to libsndfile while encoding.
+
+    libsndfile writes sequentially while encoding but may seek back to patch headers when the file is
+    closed; those late rewrites land in the buffer but cannot be re-sent to a client that has already
+    received the bytes, so `drain` only ever returns data past what was previously drained.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.position: int = 0
+        self.drained: int = 0
+
+    def write(self, data: bytes) -> int:
+        end = self.position + len(data)
+
+        if end > len(self.buffer):
+            self.buffer.extend(b"\0" * (end - len(self.buffer)))
+
+        self.buffer[self.position:end] = data
+        self.position = end
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self.buffer) if size < 0 else self.position + size
+        data = bytes(self.buffer[self.position:end])
+        self.position += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        match whence:
+            case 0:
+                self.position = offset
+            case 1:
+                self.position += offset
+            case 2:
+                self.position = len(self.buffer) + offset
+
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        chunk = bytes(self.buffer[self.drained:])
+        self.drained = len(self.buffer)
+        return chunk
+
+
+class StreamEncoder:
+    """
+    Incrementally encodes PCM segments, returning the newly encoded bytes after every segment.
+
+    Compressed formats are encoded with libsndfile using the given `settings`. WAV and raw PCM are written
+    directly as 16-bit little-endian samples, which costs next to nothing; WAV is prefixed with a streaming
+    header since the final length is not known up front.
+
+    MP3 is always encoded at a constant bitrate. A variable bitrate stream is only decodable in full with the
+    frame count libsndfile writes into its first (Xing) frame on close, by which time that frame has already
+    been sent; constant bitrate frames decode without it, the placeholder decoding as one silent frame.
+    """
+
+    def __init__(
+        self,
+        samplerate: int = 24000,
+        format: AudioFormat = AudioFormat.MP3,
+        settings: EncoderSettings | None = None,
+    ) -> None:
+        spec = FORMATS[format]
+        settings = settings or EncoderSettings()
+
+        self._buffer = _StreamBuffer()
+        self._file: sf.SoundFile | None = None
+        self._header = wav_header(samplerate) if format == AudioFormat.WAV else b""
+
+        compression_level = settings.compression_level
+        bitrate_mode: str | None = None
+
+        if format == AudioFormat.MP3:
+            # soundfile only applies a bitrate mode together with a compression level
+            if compression_level is None:
+                compression_level = QUALITY_PRESETS["standard"]
+
+            bitrate_mode = "CONSTANT"
+
+        if spec.container is not None:
+            self._file = sf.SoundFile(
+                self._buffer,
+                mode='w',
+                samplerate=samplerate,
+                channels=1,
+                format=spec.container,
+                subtype=spec.subtype,
+                compression_level=compression_level,
+                bitrate_mode=bitrate_mode,
+            )
+
+    def _take_header(self) -> bytes:
+        header, self._header = self._header, b""
+        return header
+
+    def encode(self, audio: np.ndarray) -> bytes:
+        """
+        Encode float samples in [-1, 1], or 16-bit samples which are passed through unscaled.
+        """
+        if self._file is None:
+            if audio.dtype == np.int16:
+                samples = audio.astype('<i2', copy=False)
+            else:
+                samples = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+
+            return self._take_header() + samples.tobytes()
+
+        self._file.write(audio)
+        return self._buffer.drain()
+
+    def finish(self) -> bytes:
+        if self._file is None:
+            return self._take_header()
+
+        self._file.close()
+        return self._buffer.drain()
@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from enum import StrEnum
+import struct
+from typing import Literal
+
+
+Quality = Literal["low", "standard", "high"]
+
+
+# libsndfile compression levels, from 0 (highest bitrate) to 1 (smallest output)
+QUALITY_PRESETS: dict[Quality, float] = {
+    "low": 0.8,
+    "standard": 0.5,
+    "high": 0.1,
+}
+
+
+class AudioFormat(StrEnum):
+    MP3 = 'mp3'
+    OPUS = 'opus'
+    OGG = 'ogg'
+    WAV = 'wav'
+    PCM = 'pcm'
+
+
+@dataclass(frozen=True)
+class FormatSpec:
+    media_type: str
+    extension: str
+
+    # libsndfile container and codec; None for formats written directly as 16-bit PCM
+    container: str | None = None
+    subtype: str | None = None
+
+
+FORMATS: dict[AudioFormat, FormatSpec] = {
+    AudioFormat.MP3: FormatSpec("audio/mpeg", "mp3", "MP3", "MPEG_LAYER_III"),
+    AudioFormat.OPUS: FormatSpec("audio/ogg; codecs=opus", "opus", "OGG", "OPUS"),
+    AudioFormat.OGG: FormatSpec("audio/ogg", "ogg", "OGG", "VORBIS"),
+    AudioFormat.WAV: FormatSpec("audio/wav", "wav"),
+    AudioFormat.PCM: FormatSpec("audio/pcm", "pcm"),
+}
+
+
+# Media types accepted in an `Accept` header, most specific first
+MEDIA_TYPES: dict[str, AudioFormat] = {
+    "audio/mpeg": AudioFormat.MP3,
+    "audio/mp3": AudioFormat.MP3,
+    "audio/opus": AudioFormat.OPUS,
+    "audio/ogg; codecs=opus": AudioFormat.OPUS,
+    "audio/ogg": AudioFormat.OGG,
+    "audio/vorbis": AudioFormat.OGG,
+    "audio/wav": AudioFormat.WAV,
+    "audio/wave": AudioFormat.WAV,
+    "audio/x-wav": AudioFormat.WAV,
+    "audio/pcm": AudioFormat.PCM,
+    "audio/l16": AudioFormat.PCM,
+}
+
+
+@dataclass(frozen=True)
+class EncoderSettings:
+    """
+    Trades encoding CPU and output size against quality for the compressed formats.
+    """
+    compression_level: float | None = None
+
+    @classmethod
+    def preset(cls, quality: Quality) -> 'EncoderSettings':
+        return cls(compression_level=QUALITY_PRESETS[quality])
+
+
+def negotiate_format(
+    requested: AudioFormat | None,
+    accept: str | None,
+    default: AudioFormat = AudioFormat.MP3,
+) -> AudioFormat:
+    """
+    Pick the output format: an explicit `format` parameter wins, then the most preferred supported media
+    type in the `Accept` header. Clients whose `Accept` header names nothing we produce get `default`
+    rather than a 406, which keeps clients written before negotiation existed working.
+    """
+    if requested is not None:
+        return requested
+
+    if not accept:
+        return default
+
+    candidates: list[tuple[float, int, AudioFormat]] = []
+
+    for index, part in enumerate(accept.split(",")):
+        media_type, *parameters = [piece.strip() for piece in part.split(";")]
+        media_type = media_type.lower()
+        quality = 1.0
+        codecs: str | None = None
+
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+
+            match name.strip().lower():
+                case "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+                case "codecs":
+                    codecs = value.strip().strip('"').lower()
+
+        if quality <= 0:
+            continue
+
+        if codecs:
+            media_type = f"{media_type}; codecs={codecs}"
+
+        if media_type in MEDIA_TYPES:
+            format = MEDIA_TYPES[media_type]
+        elif media_type in ("*/*", "audio/*"):
+            format = default
+        else:
+            continue
+
+        # Highest quality first; ties keep the order the client listed them in
+        candidates.append((-quality, index, format))
+
+    return min(candidates)[2] if candidates else default
+
+
+def wav_header(samplerate: int, channels: int = 1) -> bytes:
+    """
+    Header for a 16-bit PCM WAV stream of unknown length. The RIFF and data sizes are set to the maximum,
+    the usual convention for streamed WAV; decoders read until the end of the stream.
+    """
+    byte_rate = samplerate * channels * 2
+
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, samplerate, byte_rate, channels * 2, 16)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
@@ -0,0 +1,231 @@
+import asyncio
+import re
+from typing import Any, AsyncIterator, Callable, TypeVar
+
+import numpy as np
+
+from src.cache import Cache, get_many
+from src.executor import BoundedExecutor
+from src.singleflight import SingleFlight
+from src.tts.encoder import StreamEncoder
+from src.tts.formats import FORMATS, AudioFormat, EncoderSettings
+from src.timing import timed
+from src.tts.provider import TTSProvider
+
+
+R = TypeVar("R")
+
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Split text into sentences. Pieces without any letters or digits (e.g. a trailing "...") are attached to
+    the previous sentence, since on their own they would produce no audio.
+    """
+    sentences: list[str] = []
+
+    for piece in SENTENCE_BOUNDARY.split(text.strip()):
+        piece = piece.strip()
+
+        if not piece:
+            continue
+
+        if sentences and not any(character.isalnum() for character in piece):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+
+    return sentences
+
+
+def chunk_text(text: str, max_characters: int) -> list[str]:
+    """
+    Pack whole sentences into chunks of at most `max_characters`. A sentence longer than that on its own is
+    broken between words (or, failing that, anywhere).
+    """
+    chunks: list[str] = []
+    current = ""
+
+    def pieces(sentence: str) -> list[str]:
+        if len(sentence) <= max_characters:
+            return [sentence]
+
+        parts: list[str] = []
+        part = ""
+
+        for word in sentence.split():
+            while len(word) > max_characters:
+                if part:
+                    parts.append(part)
+                    part = ""
+
+                parts.append(word[:max_characters])
+                word = word[max_characters:]
+
+            if part and len(part) + 1 + len(word) > max_characters:
+                parts.append(part)
+                part = word
+            else:
+                part = f"{part} {word}" if part else word
+
+        if part:
+            parts.append(part)
+
+        return parts
+
+    for sentence in split_sentences(text):
+        for piece in pieces(sentence):
+            if current and len(current) + 1 + len(piece) > max_characters:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+class FragmentStitcher:
+    """
+    Synthesizes text sentence by sentence, caching the audio of each sentence on its own so that texts which
+    share most of their sentences (e.g. templated notifications) only synthesize the ones that differ.
+
+    Fragments are cached as 16-bit PCM at the provider's sample rate and stitched together before encoding,
+    so the output is a single continuous stream with no codec frame boundaries or encoder padding between
+    sentences. Cached fragments are looked up together; the missing ones are synthesized in parallel, at most
+    `concurrency` at a time per request, while the audio is streamed in sentence order.
+
+    Like a provider's own stream, a stitched stream is admitted by its first synthesis: nothing is sent until
+    the first missing fragment has been synthesized, subject to the provider's queue limit, and the remaining
+    fragments are then queued unconditionally, so a started response is never cut short by a full queue.
+    """
+
+    PREFIX = "fragment"
+
+    def __init__(
+        self,
+        cache: Cache[bytes],
+        concurrency: int = 4,
+        encoders: dict[AudioFormat, EncoderSettings] | None = None,
+    ) -> None:
+        self.cache = cache
+        self.concurrency = concurrency
+        self.encoders = encoders or {}
+
+        # Concurrent requests that need the same missing fragment share one synthesis
+        self.flights = SingleFlight[bytes]()
+
+    def cache_key(self, provider: TTSProvider, voice: str, sentence: str) -> str:
+        return f"{self.PREFIX}:{provider.generate_cache(voice, sentence, output_format=AudioFormat.PCM)}"
+
+    async def _synthesize(
+        self,
+        provider: TTSProvider,
+        voice: str,
+        sentence: str,
+        key: str,
+        semaphore: asyncio.Semaphore,
+        bounded: bool,
+    ) -> bytes:
+        async def synthesize() -> bytes:
+            async with semaphore:
+                pcm = await provider.synthesize_speech(
+                    voice,
+                    sentence,
+                    output_format=AudioFormat.PCM,
+                    bounded=bounded,
+                )
+
+            await self.cache.set(key, pcm)
+            return pcm
+
+        return await self.flights.do(key, synthesize)
+
+    @staticmethod
+    async def _encode(provider: TTSProvider, fn: Callable[..., R], *args: Any) -> R:
+        # Encoding shares the provider's CPU pool when it has one; it belongs to an admitted stream
+        executor = getattr(provider, "executor", None)
+
+        if isinstance(executor, BoundedExecutor):
+            return await executor.run(fn, *args, bounded=False)
+
+        return await asyncio.to_thread(fn, *args)
+
+    async def stream(
+        self,
+        provider: TTSProvider,
+        voice: str,
+        text: str,
+        output_format: AudioFormat = AudioFormat.MP3,
+    ) -> AsyncIterator[bytes]:
+        sentences = split_sentences(text)
+
+        if not sentences:
+            raise ValueError("No sentences to synthesize")
+
+        keys = [self.cache_key(provider, voice, sentence) for sentence in sentences]
+
+        with timed("cache"):
+            cached = await get_many(self.cache, keys)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        missing = [index for index, pcm in enumerate(cached) if pcm is None]
+        tasks: list[asyncio.Task[bytes] | None] = [None] * len(sentences)
+
+        def start(index: int, bounded: bool) -> asyncio.Task[bytes]:
+            task = asyncio.create_task(
+                self._synthesize(provider, voice, sentences[index], keys[index], semaphore, bounded)
+            )
+
+            # A failure is reported by the first fragment awaited; later ones may never be
+            task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+            tasks[index] = task
+            return task
+
+        encoder = StreamEncoder(
+            samplerate=provider.sample_rate,
+            format=output_format,
+            settings=self.encoders.get(output_format),
+        )
+
+        compressed = FORMATS[output_format].container is not None
+
+        try:
+            if missing:
+                # Admission: a saturated provider rejects the first missing fragment before anything is sent
+                await start(missing[0], bounded=True)
+
+                for index in missing[1:]:
+                    start(index, bounded=False)
+
+            for pcm, task in zip(cached, tasks):
+                if task is not None:
+                    pcm = await task
+
+                audio = np.frombuffer(pcm, dtype='<i2')
+
+                with timed("encode"):
+                    if compressed:
+                        chunk = await self._encode(provider, encoder.encode, audio)
+                    else:
+                        chunk = encoder.encode(audio)
+
+                yield chunk
+
+            with timed("encode"):
+                if compressed:
+                    chunk = await self._encode(provider, encoder.finish)
+                else:
+                    chunk = encoder.finish()
+
+            yield chunk
+
+        finally:
+            # Shared syntheses are shielded, so this only stops this request waiting; they still get cached
+            for task in tasks:
+                if task is not None:
+                    task.cancel()
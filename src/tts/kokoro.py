@@ -1,52 +1,209 @@
-import asyncio
-import io
-from typing import get_args
+from dataclasses import dataclass
+from typing import AsyncIterator, get_args
 
-from kokoro import KPipeline
+from kokoro import KModel, KPipeline
 import numpy as np
-import soundfile as sf
 import torch
 
+from src.executor import BoundedExecutor
+from src.metrics import instrument_synthesis
+from src.tts.batcher import InferenceBatcher
+from src.tts.encoder import StreamEncoder
+from src.tts.formats import FORMATS, AudioFormat, EncoderSettings
+from src.timing import timed
 from src.tts.provider import TTSProvider
 from src.types.kokoro import KokoroVoices
 
 
+REPO_ID = 'hexgrad/Kokoro-82M'
+
+
+def configure_torch_threads(
+    intra_op_threads: int | None = None,
+    inter_op_threads: int | None = None,
+) -> None:
+    """
+    Initializer for inference worker threads.
+    """
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Inter-op threads are process-wide and can only be set once, before any inter-op work starts.
+            pass
+
+
+@dataclass
+class KokoroSegment:
+    phonemes: str
+    ref_s: torch.FloatTensor
+    speed: float = 1.0
+
+
 class KokoroProvider(TTSProvider[KokoroVoices]):
     def __init__(
         self,
         lang_code: str = 'a',
+        executor: BoundedExecutor | None = None,
+        max_batch_size: int = 8,
+        batch_window: float = 0.005,
+        encoders: dict[AudioFormat, EncoderSettings] | None = None,
     ) -> None:
+        self.encoders = encoders or {}
+        self.executor = executor or BoundedExecutor(
+            "kokoro",
+            max_workers=1,
+            max_queue=32,
+            initializer=configure_torch_threads,
+        )
+
+        # G2P and inference are split so that inference for concurrent requests can be batched.
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.model = KModel(repo_id=REPO_ID).to(device).eval()
         self.pipeline = KPipeline(
-            repo_id='hexgrad/Kokoro-82M',
+            repo_id=REPO_ID,
             lang_code=lang_code,
+            model=False,
         )
 
-    def _synthesize_speech(
+        self.batcher = InferenceBatcher(
+            self._infer_batch,
+            self.executor,
+            max_batch_size=max_batch_size,
+            max_wait=batch_window,
+        )
+
+    def _prepare(
         self,
         voice: KokoroVoices,
         text: str,
-    ) -> bytes:
-        generator = self.pipeline(text, voice=voice)
-        audio: torch.FloatTensor
-        result: np.ndarray | None = None
+    ) -> list[KokoroSegment]:
+        """
+        Split the text into segments and convert each one to phonemes along with its voice style vector.
+        """
+        pack = self.pipeline.load_voice(voice).to(self.model.device)
+
+        return [
+            KokoroSegment(phonemes=result.phonemes, ref_s=pack[len(result.phonemes) - 1])
+            for result in self.pipeline(text)
+            if result.phonemes
+        ]
+
+    @torch.no_grad()
+    def _infer_batch(self, segments: list[KokoroSegment]) -> list[np.ndarray]:
+        """
+        Run inference for several segments at once.
+
+        The text and duration encoders run as one padded forward pass over the batch. Alignment and the
+        decoder run per segment: the model's duration alignment assumes a batch of one, and the decoder's
+        instance normalization would be skewed by padding frames.
+        """
+        model = self.model
+
+        if len(segments) == 1:
+            segment = segments[0]
+            audio = model(segment.phonemes, segment.ref_s, segment.speed)
+            return [audio.numpy()]
+
+        input_ids = [
+            [0, *(model.vocab[p] for p in segment.phonemes if p in model.vocab), 0]
+            for segment in segments
+        ]
+
+        input_lengths = torch.tensor([len(ids) for ids in input_ids], dtype=torch.long)
+        padded_ids = torch.zeros((len(segments), int(input_lengths.max())), dtype=torch.long)
+
+        for index, ids in enumerate(input_ids):
+            padded_ids[index, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+
+        padded_ids = padded_ids.to(model.device)
+        text_mask = torch.arange(padded_ids.shape[1]).unsqueeze(0).expand(len(segments), -1)
+        text_mask = torch.gt(text_mask + 1, input_lengths.unsqueeze(1)).to(model.device)
+        ref_s = torch.cat([segment.ref_s for segment in segments]).to(model.device)
+        s = ref_s[:, 128:]
+
+        bert_dur = model.bert(padded_ids, attention_mask=(~text_mask).int())
+        d_en = model.bert_encoder(bert_dur).transpose(-1, -2)
+        d = model.predictor.text_encoder(d_en, s, input_lengths, text_mask)
+        t_en = model.text_encoder(padded_ids, input_lengths, text_mask)
+
+        outputs: list[np.ndarray] = []
+
+        for index, segment in enumerate(segments):
+            length = int(input_lengths[index])
+            d_i = d[index:index + 1, :length]
+
+            x, _ = model.predictor.lstm(d_i)
+            duration = torch.sigmoid(model.predictor.duration_proj(x)).sum(axis=-1) / segment.speed
+            pred_dur = torch.round(duration).clamp(min=1).long().squeeze()
 
-        for _, _, audio in generator:  # type: ignore
-            result = audio.numpy()
+            indices = torch.repeat_interleave(torch.arange(length, device=model.device), pred_dur)
+            pred_aln_trg = torch.zeros((length, indices.shape[0]), device=model.device)
+            pred_aln_trg[indices, torch.arange(indices.shape[0])] = 1
+            pred_aln_trg = pred_aln_trg.unsqueeze(0)
 
-        if result is None:
+            en = d_i.transpose(-1, -2) @ pred_aln_trg
+            f0_pred, n_pred = model.predictor.F0Ntrain(en, s[index:index + 1])
+            asr = t_en[index:index + 1, :, :length] @ pred_aln_trg
+            audio = model.decoder(asr, f0_pred, n_pred, ref_s[index:index + 1, :128]).squeeze()
+
+            outputs.append(audio.cpu().numpy())
+
+        return outputs
+
+    @instrument_synthesis
+    async def stream_speech(
+        self,
+        voice: KokoroVoices,
+        text: str,
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        output_format: AudioFormat = kwargs.get('output_format', AudioFormat.MP3)
+
+        # False for work that belongs to a stream admitted elsewhere (e.g. a later fragment of a stitched
+        # response), which must not be rejected once its response has started
+        bounded: bool = kwargs.get('bounded', True)
+
+        with timed("phonemize"):
+            segments = await self.executor.run(self._prepare, voice, text, bounded=bounded)
+
+        if not segments:
             raise RuntimeError("No audio generated by Kokoro pipeline.")
 
-        # Audio is 24kHz, mono pcm. We need to convert to mp3 bytes.
-        with io.BytesIO() as buffer:
-            sf.write(
-                buffer,
-                result,
-                samplerate=24000,
-                format='MP3',
-                # subtype='PCM_16',
-            )
+        encoder = StreamEncoder(
+            samplerate=self.sample_rate,
+            format=output_format,
+            settings=self.encoders.get(output_format),
+        )
+
+        # Uncompressed formats are cheap enough to write on the event loop
+        compressed = FORMATS[output_format].container is not None
 
-            return buffer.getvalue()
+        # Only the first segment is subject to the executor's queue limit; once a stream has been admitted
+        # its remaining segments are always queued so the response is never cut short.
+        for index, segment in enumerate(segments):
+            # Audio is 24kHz, mono pcm.
+            with timed("inference"):
+                audio = await self.batcher.submit(segment, bounded=bounded and index == 0)
+
+            with timed("encode"):
+                if compressed:
+                    chunk = await self.executor.run(encoder.encode, audio, bounded=False)
+                else:
+                    chunk = encoder.encode(audio)
+
+            yield chunk
+
+        with timed("encode"):
+            if compressed:
+                chunk = await self.executor.run(encoder.finish, bounded=False)
+            else:
+                chunk = encoder.finish()
+
+        yield chunk
 
     async def synthesize_speech(
         self,
@@ -54,14 +211,22 @@ class KokoroProvider(TTSProvider[KokoroVoices]):
         text: str,
         **kwargs,
     ) -> bytes:
-        event_loop = asyncio.get_running_loop()
+        return b"".join([chunk async for chunk in self.stream_speech(voice, text, **kwargs)])
 
-        return await event_loop.run_in_executor(
-            None,
-            self._synthesize_speech,
-            voice,
-            text,
-        )
+    async def close(self) -> None:
+        self.executor.shutdown()
+
+    @property
+    def name(self) -> str:
+        return 'kokoro'
+
+    @property
+    def model_version(self) -> str:
+        return REPO_ID
+
+    @property
+    def sample_rate(self) -> int:
+        return 24000
 
     @property
     def can_cache(self) -> bool:
@@ -1,4 +1,6 @@
-from typing import Protocol, TypeVar
+import hashlib
+import json
+from typing import AsyncIterator, Protocol, TypeVar
 
 
 V = TypeVar('V', bound=str, contravariant=True)
@@ -13,22 +15,77 @@ class TTSProvider(Protocol[V]):
     ) -> bytes:
         ...
 
+    def stream_speech(
+        self,
+        voice: V,
+        text: str,
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        """
+        Synthesize speech, yielding encoded audio as soon as each part of it is available.
+        """
+        ...
+
     def generate_cache(
         self,
         voice: str,
         text: str,
         **kwargs,
     ) -> str:
-        nvoice: str = voice.lower()
-        ntext: str = text.strip().lower()
+        """
+        Fixed-size cache key for a synthesis request; every cache tier and single-flight uses the same key.
+
+        The key is a digest of a canonical descriptor of everything that determines the audio: the provider
+        and model version, the voice, the text, its type and the output format. Plain text is normalized
+        (case and runs of whitespace are ignored); SSML is only stripped, since its markup is significant.
+        """
+        text_type = str(kwargs.get('text_type', 'text'))
+
+        if text_type == 'ssml':
+            ntext = text.strip()
+        else:
+            ntext = " ".join(text.split()).lower()
 
-        return f"{nvoice}:{ntext}"
+        descriptor = json.dumps(
+            [self.name, self.model_version, voice.lower(), text_type, str(kwargs.get('output_format', 'mp3')), ntext],
+            ensure_ascii=False,
+            separators=(',', ':'),
+        )
 
+        return hashlib.blake2b(descriptor.encode(), digest_size=16).hexdigest()
+
+
+    async def close(self) -> None:
+        """
+        Release the provider's connections and threads.
+        """
+        ...
 
     @staticmethod
     def voices() -> list[str]:
         ...
 
+    @property
+    def name(self) -> str:
+        """
+        Short, stable identifier of the provider.
+        """
+        ...
+
+    @property
+    def model_version(self) -> str:
+        """
+        Version of the model producing the audio; changing it invalidates previously cached audio.
+        """
+        ...
+
+    @property
+    def sample_rate(self) -> int:
+        """
+        Sample rate, in Hz, of the provider's WAV and PCM output.
+        """
+        ...
+
     @property
     def can_cache(self) -> bool:
         """
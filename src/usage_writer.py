@@ -0,0 +1,215 @@
+import asyncio
+from collections import defaultdict
+from contextlib import suppress
+import datetime
+import logging
+from typing import Any, Callable
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
+from sqlmodel import SQLModel
+
+from src.database import Database
+from src.models.usage import Usage, UsageDaily, UsageHourly
+
+
+logger = logging.getLogger(__name__)
+
+
+ROLLUPS: list[tuple[type[SQLModel], Callable[[datetime.datetime], Any]]] = [
+    (UsageHourly, lambda at: at.replace(minute=0, second=0, microsecond=0)),
+    (UsageDaily, lambda at: at.date()),
+]
+
+
+def rollup(rows: list[dict], truncate: Callable[[datetime.datetime], Any]) -> list[dict]:
+    """
+    Sum usage events into per-user buckets. Buckets are sorted so that concurrent writers always lock rollup
+    rows in the same order.
+    """
+    totals: dict[tuple[int, Any], list[int]] = defaultdict(lambda: [0, 0])
+
+    for row in rows:
+        total = totals[(row["user_id"], truncate(row["created_at"]))]
+        total[0] += row["characters_used"]
+        total[1] += 1
+
+    return [
+        {"user_id": user_id, "bucket": bucket, "characters_used": characters_used, "requests": requests}
+        for (user_id, bucket), (characters_used, requests) in sorted(totals.items())
+    ]
+
+
+# Rollups are upserted with `ON CONFLICT DO UPDATE`, which needs each dialect's own insert construct
+UPSERT_INSERTS: dict[str, Callable[[type[SQLModel]], Insert]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_rollup(dialect: str, model: type[SQLModel], buckets: list[dict]) -> Insert:
+    """
+    Insert rollup buckets, adding to the totals of buckets that already exist. `dialect` must be one of
+    `UPSERT_INSERTS`.
+    """
+    statement = UPSERT_INSERTS[dialect](model).values(buckets)
+    table = model.__table__  # type: ignore[attr-defined]
+
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.bucket],
+        set_={
+            "characters_used": table.c.characters_used + statement.excluded.characters_used,
+            "requests": table.c.requests + statement.excluded.requests,
+        },
+    )
+
+
+class UsageWriter:
+    """
+    Buffers `Usage` events in memory and writes them to the database in bulk, off the request path.
+
+    A batch is written once `max_batch_size` events are pending or `flush_interval` seconds have passed, in a
+    single multi-row insert; the hourly and daily rollups are updated in the same transaction with one upsert
+    per user and bucket. Delivery is at-least-once:
+
+    - Events leave the buffer only after the insert containing them has committed; a failed insert keeps
+      them pending and it is retried every `retry_interval` seconds.
+    - A batch that committed but whose acknowledgement was lost (e.g. the connection dropped mid-commit) is
+      written again, so rare duplicates are possible; events are never silently dropped.
+    - `close` drains the buffer on shutdown. Only events still buffered when the process is killed outright
+      (at most roughly one `flush_interval` worth) are lost.
+
+    `record` never touches the database and never raises, so a database outage cannot fail a request (which
+    may already have been paid for). If the database falls so far behind that `max_pending` events are
+    buffered, further events are dropped, counted in `dropped` and logged, rather than memory growing
+    without bound.
+
+    Only PostgreSQL (and SQLite, for tests) are supported; any other database raises a `ValueError` here
+    rather than on the first flush.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        max_batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 50_000,
+        retry_interval: float = 1.0,
+        shutdown_attempts: int = 3,
+    ) -> None:
+        dialect = database.engine.dialect.name
+
+        if dialect not in UPSERT_INSERTS:
+            raise ValueError(f"Usage rollups require PostgreSQL or SQLite, not {dialect}")
+
+        self.database = database
+        self.dialect = dialect
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retry_interval = retry_interval
+        self.shutdown_attempts = shutdown_attempts
+
+        self.pending: list[dict] = []
+        self.written: int = 0
+        self.dropped: int = 0
+
+        self._overflowing = False
+
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def record(self, user_id: int, characters_used: int) -> None:
+        if len(self.pending) >= self.max_pending:
+            # Logged once each time the backlog fills rather than once per request
+            if not self._overflowing:
+                logger.error("Usage backlog is full (%d events), dropping new usage events", len(self.pending))
+                self._overflowing = True
+
+            self.dropped += 1
+            self._wakeup.set()
+            return
+
+        self.pending.append({
+            "user_id": user_id,
+            "characters_used": characters_used,
+
+            # Timestamp the event when it happens, not when it is eventually written
+            "created_at": datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
+        })
+
+        if len(self.pending) >= self.max_batch_size:
+            self._wakeup.set()
+
+    async def _write(self, rows: list[dict]) -> None:
+        async with self.database.engine.begin() as connection:
+            await connection.execute(insert(Usage), rows)
+
+            # The rollups are updated in the same transaction, so they always agree with the raw table
+            for model, truncate in ROLLUPS:
+                await connection.execute(upsert_rollup(self.dialect, model, rollup(rows, truncate)))
+
+    async def flush(self) -> int:
+        """
+        Write every pending event, returning the number written. Raises if an insert fails, leaving the
+        events that were not written pending.
+        """
+        async with self._flush_lock:
+            written = 0
+
+            while self.pending:
+                # New events are only ever appended, so the head of the buffer is still this batch afterwards
+                batch = self.pending[:self.max_batch_size]
+                await self._write(batch)
+
+                del self.pending[:len(batch)]
+                written += len(batch)
+                self.written += len(batch)
+
+            self._overflowing = False
+            return written
+
+    async def _run(self) -> None:
+        while True:
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to write %d usage events, retrying", len(self.pending))
+                await asyncio.sleep(self.retry_interval)
+
+    async def close(self) -> None:
+        """
+        Stop the background writer and drain the buffer.
+        """
+        if self._task is not None:
+            self._task.cancel()
+
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+            self._task = None
+
+        for attempt in range(self.shutdown_attempts):
+            try:
+                await self.flush()
+                return
+            except Exception:
+                logger.exception("Failed to drain usage events (attempt %d)", attempt + 1)
+                await asyncio.sleep(self.retry_interval)
+
+        if self.pending:
+            logger.error("Dropping %d usage events that could not be written on shutdown", len(self.pending))
@@ -0,0 +1,173 @@
+import asyncio
+from contextlib import suppress
+import logging
+
+import asyncpg
+from sqlmodel import col, func, select
+
+from src.database import Database
+from src.models.user import User, UserChange, token_key
+
+
+logger = logging.getLogger(__name__)
+
+
+class UserDirectory:
+    """
+    Every user held in memory and indexed by token hash, so authentication is a dictionary lookup.
+
+    The whole `user` table is loaded at startup. Changes are then applied from the `user_change` log, which a
+    database trigger appends to on every insert, update and delete: the directory remembers the last change
+    it applied and, when synced, reloads just the users changed since then. A sync runs every
+    `poll_interval` seconds and, on Postgres, immediately whenever a `user_changes` notification arrives.
+    Notifications only wake the directory up, so one missed while the listener was disconnected is picked
+    up by the next poll rather than lost.
+    """
+
+    CHANNEL = "user_changes"
+    RESCAN = 100
+
+    def __init__(
+        self,
+        database: Database,
+        poll_interval: float = 30.0,
+    ) -> None:
+        self.database = database
+        self.poll_interval = poll_interval
+
+        self.users: dict[str, User] = {}
+        self.keys: dict[int, str] = {}
+        self.last_change_id: int = 0
+        self.applied: set[int] = set()
+
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._listener: asyncpg.Connection | None = None
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def get(self, key: str) -> User | None:
+        return self.users.get(key)
+
+    def put(self, user: User) -> None:
+        previous_key = self.keys.get(user.id)
+
+        if previous_key is not None:
+            self.users.pop(previous_key, None)
+
+        key = token_key(user.api_token)
+        self.users[key] = user
+        self.keys[user.id] = key
+
+    def remove(self, user_id: int) -> None:
+        key = self.keys.pop(user_id, None)
+
+        if key is not None:
+            self.users.pop(key, None)
+
+    async def load(self) -> None:
+        async with self.database.get_session() as session:
+            # Read the change position first; anything changed during the load is re-applied by the next sync
+            last_change_id = (await session.exec(select(func.max(UserChange.id)))).one()
+            users = (await session.exec(select(User))).all()
+
+        self.users.clear()
+        self.keys.clear()
+
+        for user in users:
+            self.put(user)
+
+        self.last_change_id = last_change_id or 0
+        self.applied = set()
+
+    async def sync(self) -> int:
+        """
+        Apply every change logged since the last sync, returning the number of users reloaded.
+        """
+        # Change ids are allocated before their transaction commits, so a lower id can become visible after a
+        # higher one; the most recent ids are rescanned so that a late commit is still picked up.
+        since = max(self.last_change_id - self.RESCAN, 0)
+
+        async with self.database.get_session() as session:
+            changes = [
+                change
+                for change in (await session.exec(
+                    select(UserChange)
+                        .where(col(UserChange.id) > since)
+                        .order_by(col(UserChange.id))
+                )).all()
+                if change.id not in self.applied
+            ]
+
+            if not changes:
+                return 0
+
+            user_ids = {change.user_id for change in changes}
+            users = (await session.exec(select(User).where(col(User.id).in_(user_ids)))).all()
+
+        # The current row is authoritative, whatever sequence of changes led to it; users that no longer
+        # exist were deleted.
+        found = {user.id: user for user in users}
+
+        for user_id in user_ids:
+            if user_id in found:
+                self.put(found[user_id])
+            else:
+                self.remove(user_id)
+
+        self.last_change_id = max(self.last_change_id, changes[-1].id)
+        self.applied.update(change.id for change in changes)
+        self.applied = {change_id for change_id in self.applied if change_id > self.last_change_id - self.RESCAN}
+
+        return len(user_ids)
+
+    async def _listen(self) -> None:
+        url = self.database.engine.url
+
+        if url.get_backend_name() != "postgresql":
+            return
+
+        try:
+            self._listener = await asyncpg.connect(
+                url.set(drivername="postgresql").render_as_string(hide_password=False),
+            )
+
+            await self._listener.add_listener(self.CHANNEL, lambda *_: self._wakeup.set())
+        except (OSError, asyncpg.PostgresError):
+            logger.exception("Unable to listen for user changes, falling back to polling")
+            self._listener = None
+
+    async def _run(self) -> None:
+        while True:
+            # Reconnect a dropped listener; until then the directory keeps up by polling
+            if self._listener is None or self._listener.is_closed():
+                await self._listen()
+
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+
+            self._wakeup.clear()
+
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Failed to sync the user directory")
+
+    async def start(self) -> None:
+        await self.load()
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+            self._task = None
+
+        if self._listener is not None and not self._listener.is_closed():
+            await self._listener.close()
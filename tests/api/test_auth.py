@@ -0,0 +1,80 @@
+import uuid
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+
+from src.api.auth import token_key
+from src.cache import RedisCache
+from src.configuration import Configuration
+from src.models.user import User, encode_cached_user
+from tests.redis_server import InMemoryRedisServer
+
+
+class TestGetCurrentUser:
+    @pytest.fixture
+    def user_token(self, client: TestClient) -> str:
+        config = Configuration.get()
+        response = client.post(
+            "/users/",
+            headers={"Authorization": f"Bearer {config.admin_api_token.get_secret_value()}"},
+            json={"username": f"test-auth-{uuid.uuid4()}"},
+        )
+
+        assert response.status_code == 200
+        return response.json()["api_token"]
+
+    def test_rejected_token_is_negatively_cached(self, client: TestClient, mocker):
+        """Test that repeated requests with the same bad token query the database only once."""
+        get_session = mocker.spy(client.app.state.database, "get_session")  # type: ignore[attr-defined]
+        headers = {"Authorization": f"Bearer invalid-{uuid.uuid4()}"}
+
+        for _ in range(3):
+            response = client.get("/v1/speech", headers=headers, params={"voice": "Amy", "text": "Hi"})
+            assert response.status_code == 401
+
+        assert get_session.call_count == 1
+
+    def test_users_are_cached_by_token_hash(self, client: TestClient, user_token: str):
+        """Test that the user cache is keyed by a hash of the token rather than the raw secret."""
+        response = client.get(
+            "/v1/speech",
+            headers={"Authorization": f"Bearer {user_token}"},
+            params={"voice": "Amy", "text": "<speak>unclosed", "text_type": "ssml"},
+        )
+        assert response.status_code == 400
+
+        memory_tier = client.app.state.ttl_cache.tiers[0]  # type: ignore[attr-defined]
+
+        assert token_key(user_token) in memory_tier.cache
+        assert user_token not in memory_tier.cache
+
+
+class TestSharedUserCache:
+    @pytest_asyncio.fixture
+    async def redis_server(self):
+        server = InMemoryRedisServer()
+        await server.start()
+        yield server
+        await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_api_token_is_not_stored(self, redis_server: InMemoryRedisServer):
+        """Test that users are cached in Redis without their API token."""
+        token = f"secret-{uuid.uuid4()}"
+        cache: RedisCache[User] = RedisCache.from_url(
+            redis_server.url,
+            prefix="tts:user:",
+            encode=encode_cached_user,
+            decode=User.model_validate_json,
+        )
+
+        assert token.encode() not in encode_cached_user(User(id=7, username="alice", api_token=token))
+
+        await cache.set(token_key(token), User(id=7, username="alice", rate_limit="100/minute", api_token=token))
+        raw = await cache.client.get(f"tts:user:{token_key(token)}")
+        user = await cache.get(token_key(token))
+
+        assert token.encode() not in raw
+        assert (user.id, user.username, user.rate_limit) == (7, "alice", "100/minute")
+        await cache.close()
@@ -0,0 +1,50 @@
+import io
+import json
+from typing import AsyncIterator
+import zipfile
+
+import pytest
+
+from src.api.batch import BatchResult, multipart_stream, zip_stream
+
+
+async def results() -> AsyncIterator[BatchResult]:
+    yield BatchResult(index=1, filename="1-Amy.mp3", media_type="audio/mpeg", audio=b"second")
+    yield BatchResult(index=0, filename="0-Amy.wav", media_type="audio/wav", status_code=500, detail="failed")
+    yield BatchResult(index=2, filename="2-Amy.mp3", media_type="audio/mpeg", audio=b"third")
+
+
+class TestMultipartStream:
+    @pytest.mark.asyncio
+    async def test_parts(self):
+        """Test that every result becomes a part named after its index, with failures as JSON."""
+        body = b"".join([chunk async for chunk in multipart_stream(results(), "boundary")])
+        parts = body.split(b"--boundary")
+
+        assert parts[0] == b""
+        assert parts[-1] == b"--\r\n"
+        assert len(parts) == 5
+
+        headers, content = parts[1].split(b"\r\n\r\n", 1)
+        assert b'name="1"; filename="1-Amy.mp3"' in headers
+        assert b"Content-Type: audio/mpeg" in headers
+        assert content == b"second\r\n"
+
+        headers, content = parts[2].split(b"\r\n\r\n", 1)
+        assert b"X-Status-Code: 500" in headers
+        assert json.loads(content) == {"index": 0, "status_code": 500, "detail": "failed"}
+
+
+class TestZipStream:
+    @pytest.mark.asyncio
+    async def test_archive(self):
+        """Test that the streamed archive holds each result and lists failures in errors.json."""
+        chunks = [chunk async for chunk in zip_stream(results())]
+
+        # Entries are sent as they are written, not only once the archive is complete
+        assert chunks[0].startswith(b"PK")
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+            assert archive.namelist() == ["1-Amy.mp3", "2-Amy.mp3", "errors.json"]
+            assert archive.read("2-Amy.mp3") == b"third"
+            assert json.loads(archive.read("errors.json")) == [{"index": 0, "status_code": 500, "detail": "failed"}]
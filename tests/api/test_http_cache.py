@@ -0,0 +1,42 @@
+import pytest
+
+from src.api.http_cache import RangeNotSatisfiable, matches_etag, parse_range
+
+
+class TestMatchesEtag:
+    def test_matches(self):
+        """Test that listed, weak and wildcard validators match."""
+        assert matches_etag('"abc"', '"abc"')
+        assert matches_etag('"xyz", "abc"', '"abc"')
+        assert matches_etag('W/"abc"', '"abc"')
+        assert matches_etag('*', '"abc"')
+
+    def test_does_not_match(self):
+        """Test that a missing or different validator does not match."""
+        assert not matches_etag(None, '"abc"')
+        assert not matches_etag('"xyz"', '"abc"')
+
+
+class TestParseRange:
+    def test_ranges(self):
+        """Test that bounded, open-ended and suffix ranges resolve to inclusive offsets."""
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=900-5000", 1000) == (900, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=-5000", 1000) == (0, 999)
+
+    def test_unhandled_ranges_send_everything(self):
+        """Test that absent, malformed and multi-part ranges fall back to the full response."""
+        assert parse_range(None, 1000) is None
+        assert parse_range("items=0-1", 1000) is None
+        assert parse_range("bytes=0-1,5-6", 1000) is None
+        assert parse_range("bytes=10-5", 1000) is None
+
+    def test_unsatisfiable(self):
+        """Test that a range starting past the end cannot be satisfied."""
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=1000-", 1000)
+
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=-0", 1000)
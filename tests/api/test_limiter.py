@@ -0,0 +1,101 @@
+from limits import parse
+import pytest
+import pytest_asyncio
+
+from src.api.limiter import MemoryRateLimiter, RateLimit, RedisRateLimiter, character_cost, take
+from tests.redis_server import InMemoryRedisServer
+
+
+class TestTake:
+    def test_burst_then_refill(self):
+        """Test that a full bucket allows a burst and then refills evenly over the period."""
+        allowed, tokens, retry_after, reset_after = take(100, 0, 100, 60_000, 60)
+        assert allowed and tokens == 40
+        assert retry_after == 0 and reset_after == 36_000
+
+        allowed, tokens, retry_after, _ = take(tokens, 0, 100, 60_000, 60)
+        assert not allowed and tokens == 40
+        assert retry_after == 12_000
+
+        allowed, tokens, _, _ = take(tokens, 12_000, 100, 60_000, 60)
+        assert allowed and tokens == 0
+
+    def test_cost_above_capacity(self):
+        """Test that a request larger than the bucket is allowed only when full and leaves it in debt."""
+        allowed, tokens, retry_after, _ = take(99, 0, 100, 60_000, 250)
+        assert not allowed and retry_after == 600
+
+        allowed, tokens, _, reset_after = take(100, 0, 100, 60_000, 250)
+        assert allowed and tokens == -150
+        assert reset_after == 150_000
+
+
+class TestRateLimit:
+    def test_headers(self):
+        """Test that only a rejected charge carries Retry-After, rounded up to whole seconds."""
+        assert RateLimit(True, 100, 40, 0, 36_000).headers == {
+            "X-RateLimit-Limit": "100",
+            "X-RateLimit-Remaining": "40",
+            "X-RateLimit-Reset": "36",
+        }
+
+        headers = RateLimit(False, 100, -150, 1_001, 150_000).headers
+        assert headers["X-RateLimit-Remaining"] == "0"
+        assert headers["Retry-After"] == "2"
+
+
+class TestCharacterCost:
+    def test_cache_hits_are_cheaper(self):
+        """Test that cached characters cost a fraction of synthesized ones, rounded up."""
+        assert character_cost(1000) == 1000
+        assert character_cost(1000, cached=True) == 50
+        assert character_cost(1, cached=True) == 1
+        assert character_cost(0, cached=True) == 0
+
+
+class TestMemoryRateLimiter:
+    @pytest.mark.asyncio
+    async def test_charge(self):
+        """Test that buckets are charged per key."""
+        limiter = MemoryRateLimiter()
+        limit = parse("10/minute")
+
+        assert (await limiter.charge("a", limit, 8)).remaining == 2
+        assert not (await limiter.charge("a", limit, 8)).allowed
+        assert (await limiter.charge("b", limit, 8)).allowed
+
+
+class TestRedisRateLimiter:
+    @pytest_asyncio.fixture
+    async def redis_server(self):
+        server = InMemoryRedisServer()
+        await server.start()
+        yield server
+        await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_buckets_are_shared_between_workers(self, redis_server: InMemoryRedisServer):
+        """Test that every client charges the same bucket, loading the script on first use."""
+        first = RedisRateLimiter.from_url(redis_server.url)
+        second = RedisRateLimiter.from_url(redis_server.url)
+        limit = parse("10/minute")
+
+        result = await first.charge("user", limit, 8)
+        assert result.allowed and result.remaining == 2
+
+        result = await second.charge("user", limit, 8)
+        assert not result.allowed
+        assert 0 < result.retry_after <= 36_000
+
+        await first.close()
+        await second.close()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_buckets(self):
+        """Test that an unreachable Redis still limits requests, per worker."""
+        limiter = RedisRateLimiter.from_url("redis://127.0.0.1:1/0")
+        limit = parse("10/minute")
+
+        assert (await limiter.charge("user", limit, 8)).allowed
+        assert not (await limiter.charge("user", limit, 8)).allowed
+        await limiter.close()
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from src.clients.polly import PollyException, PollyProvider, SSMLException, TextTypeType
+from src.tts.formats import AudioFormat, wav_header
+from tests.polly_server import StubPollyServer
+
+
+@pytest.fixture
+def polly_server(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+    server = StubPollyServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest_asyncio.fixture
+async def provider(polly_server: StubPollyServer):
+    provider = PollyProvider(endpoint_url=polly_server.url, max_pool_connections=4)
+    yield provider
+    await provider.close()
+
+
+class TestPollyProvider:
+    @pytest.mark.asyncio
+    async def test_synthesize_speech(self, provider: PollyProvider, polly_server: StubPollyServer):
+        """Test that speech is synthesized through the Polly endpoint."""
+        audio = await provider.synthesize_speech("Joanna", "Hello world")
+
+        assert audio == polly_server.audio
+        assert polly_server.requests == [
+            {"Text": "Hello world", "VoiceId": "Joanna", "OutputFormat": "mp3", "TextType": "text"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_requests_are_signed(self, provider: PollyProvider, polly_server: StubPollyServer):
+        """Test that requests carry a SigV4 signature scoped to Polly."""
+        await provider.synthesize_speech("Joanna", "Hello world")
+
+        authorization = polly_server.headers[0]["Authorization"]
+
+        assert authorization.startswith("AWS4-HMAC-SHA256 Credential=testing/")
+        assert "/us-west-2/polly/aws4_request" in authorization
+        assert "X-Amz-Date" in polly_server.headers[0]
+
+    @pytest.mark.asyncio
+    async def test_streams_audio_in_chunks(self, provider: PollyProvider, polly_server: StubPollyServer):
+        """Test that the audio stream is yielded as it arrives rather than buffered."""
+        polly_server.audio = b"x" * 64 * 1024
+        polly_server.chunk_size = 16 * 1024
+
+        chunks = [chunk async for chunk in provider.stream_speech("Joanna", "Hello world")]
+
+        assert len(chunks) > 1
+        assert b"".join(chunks) == polly_server.audio
+
+    @pytest.mark.asyncio
+    async def test_reuses_pooled_connections(self, provider: PollyProvider, polly_server: StubPollyServer):
+        """Test that sequential calls reuse one pooled connection."""
+        for _ in range(3):
+            await provider.synthesize_speech("Joanna", "Hello world")
+
+        assert len(polly_server.requests) == 3
+        assert len(polly_server.client_ports) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_the_pool(self, provider: PollyProvider, polly_server: StubPollyServer):
+        """Test that concurrent calls succeed without opening more connections than the pool allows."""
+        results = await asyncio.gather(*[
+            provider.synthesize_speech("Joanna", f"Hello {i}")
+            for i in range(16)
+        ])
+
+        assert results == [polly_server.audio] * 16
+        assert len(polly_server.client_ports) <= 4
+
+    @pytest.mark.asyncio
+    async def test_output_formats(self, provider: PollyProvider, polly_server: StubPollyServer):
+        """Test that each output format maps onto Polly's, with WAV wrapping its 16kHz PCM."""
+        await provider.synthesize_speech("Joanna", "Hello world", output_format=AudioFormat.OPUS)
+        audio = await provider.synthesize_speech("Joanna", "Hello world", output_format=AudioFormat.WAV)
+
+        assert polly_server.requests[0]["OutputFormat"] == "ogg_opus"
+        assert polly_server.requests[1]["OutputFormat"] == "pcm"
+        assert polly_server.requests[1]["SampleRate"] == "16000"
+        assert audio == wav_header(16000) + polly_server.audio
+
+    @pytest.mark.asyncio
+    async def test_invalid_ssml(self, provider: PollyProvider):
+        """Test that Polly's InvalidSsmlException is surfaced as an SSMLException."""
+        with pytest.raises(SSMLException, match="Invalid SSML request"):
+            await provider.synthesize_speech("Joanna", "<bad/>", text_type=TextTypeType.Ssml)
+
+    @pytest.mark.asyncio
+    async def test_retries_throttling_and_server_errors(self, provider: PollyProvider, polly_server: StubPollyServer):
+        """Test that throttling and transient server errors are retried before audio is returned."""
+        provider.base_backoff = 0.001
+        polly_server.failures = [(400, "ThrottlingException"), (503, "ServiceUnavailableException")]
+
+        assert await provider.synthesize_speech("Joanna", "Hello world") == polly_server.audio
+        assert len(polly_server.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, provider: PollyProvider, polly_server: StubPollyServer):
+        """Test that retries are bounded and client errors are not retried."""
+        provider.base_backoff = 0.001
+        polly_server.failures = [(500, "ServiceFailureException")] * 3 + [(400, "ValidationException")]
+
+        with pytest.raises(PollyException, match="ServiceFailureException"):
+            await provider.synthesize_speech("Joanna", "Hello world")
+
+        with pytest.raises(PollyException, match="ValidationException"):
+            await provider.synthesize_speech("Joanna", "Hello world")
+
+        assert len(polly_server.requests) == 4
+
+    @pytest.mark.asyncio
+    async def test_missing_credentials(self, provider: PollyProvider):
+        """Test that a request without resolvable credentials fails before reaching Polly."""
+        provider.credentials = None
+
+        with pytest.raises(PollyException):
+            await provider.synthesize_speech("Joanna", "Hello world")
@@ -0,0 +1,91 @@
+"""
+A minimal stand-in for the Polly `SynthesizeSpeech` endpoint for tests.
+
+It runs on a background thread and listens on an ephemeral localhost port, so tests can point the provider
+at it via `endpoint_url`. Every request is recorded (body, headers and the client port it arrived on, which
+lets tests observe connection reuse), and audio is written in `chunk_size` pieces so streaming is observable.
+Errors queued in `failures`, as (status, error type), are returned one per request before any audio.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+
+
+class StubPollyServer:
+    def __init__(self, audio: bytes = b"ID3stub-audio", chunk_size: int = 4) -> None:
+        self.audio = audio
+        self.chunk_size = chunk_size
+        self.requests: list[dict] = []
+        self.headers: list[dict[str, str]] = []
+        self.client_ports: set[int] = set()
+        self.failures: list[tuple[int, str]] = []
+        self.server: ThreadingHTTPServer | None = None
+        self.thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        assert self.server is not None
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> None:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+
+                stub.requests.append(body)
+                stub.headers.append(dict(self.headers.items()))
+                stub.client_ports.add(self.client_address[1])
+
+                if stub.failures:
+                    status, error_type = stub.failures.pop(0)
+                    self._send(
+                        status,
+                        json.dumps({"message": "Injected failure"}).encode(),
+                        {"Content-Type": "application/json", "x-amzn-ErrorType": error_type},
+                    )
+                    return
+
+                if body.get("TextType") == "ssml" and not body.get("Text", "").startswith("<speak>"):
+                    self._send(
+                        400,
+                        json.dumps({"message": "Invalid SSML request"}).encode(),
+                        {"Content-Type": "application/json", "x-amzn-ErrorType": "InvalidSsmlException"},
+                    )
+                    return
+
+                self._send(
+                    200,
+                    stub.audio,
+                    {"Content-Type": "audio/mpeg", "x-amzn-RequestCharacters": str(len(body.get("Text", "")))},
+                )
+
+            def _send(self, status: int, payload: bytes, headers: dict[str, str]) -> None:
+                self.send_response(status)
+
+                for name, value in headers.items():
+                    self.send_header(name, value)
+
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+
+                for start in range(0, len(payload), stub.chunk_size):
+                    self.wfile.write(payload[start:start + stub.chunk_size])
+                    self.wfile.flush()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,174 @@
+"""
+A minimal, in-memory Redis-protocol (RESP2/RESP3) server for tests.
+
+Only the handful of commands used by the application are implemented. It runs on the test's event loop and
+listens on an ephemeral localhost port, so tests can exercise the real client without a Redis install.
+
+There is no Lua interpreter: each script the application loads is stood in for by a Python equivalent,
+registered under the script's SHA1 just as `SCRIPT LOAD` would.
+"""
+import asyncio
+from collections.abc import Callable
+import hashlib
+import math
+import time
+
+from src.api.limiter import TOKEN_BUCKET_SCRIPT, take
+
+
+class NoScript(Exception):
+    pass
+
+
+def script_sha(script: str) -> bytes:
+    return hashlib.sha1(script.encode()).hexdigest().encode()
+
+
+class InMemoryRedisServer:
+    def __init__(self) -> None:
+        self.data: dict[bytes, tuple[bytes, float | None]] = {}
+        self.scripts: dict[bytes, Callable[[list[bytes], list[bytes]], object]] = {
+            script_sha(TOKEN_BUCKET_SCRIPT): self._token_bucket,
+        }
+        self.loaded: set[bytes] = set()
+        self.server: asyncio.Server | None = None
+        self.port: int = 0
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def _lookup(self, key: bytes) -> bytes | None:
+        item = self.data.get(key)
+
+        if item is None:
+            return None
+
+        value, expires_at = item
+
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+
+        return value
+
+    def _token_bucket(self, keys: list[bytes], arguments: list[bytes]) -> list[int]:
+        capacity, period, cost = (int(argument) for argument in arguments)
+        now = time.time() * 1000
+
+        bucket = self._lookup(keys[0])
+        tokens, updated = (float(value) for value in bucket.split()) if bucket else (capacity, now)
+        allowed, tokens, retry_after, reset_after = take(tokens, now - updated, capacity, period, cost)
+
+        self.data[keys[0]] = (b"%r %r" % (tokens, now), time.monotonic() + max(reset_after, 1) / 1000)
+        return [int(allowed), math.floor(tokens), retry_after, reset_after]
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> list[bytes] | None:
+        line = await reader.readline()
+
+        if not line:
+            return None
+
+        if not line.startswith(b"*"):
+            return line.strip().split()
+
+        arguments: list[bytes] = []
+
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            arguments.append((await reader.readexactly(length + 2))[:-2])
+
+        return arguments
+
+    def _encode(self, value: object, protocol: int = 2) -> bytes:
+        match value:
+            case None:
+                return b"_\r\n" if protocol == 3 else b"$-1\r\n"
+            case True:
+                return b"+OK\r\n"
+            case int():
+                return b":%d\r\n" % value
+            case bytes():
+                return b"$%d\r\n%s\r\n" % (len(value), value)
+            case list():
+                return b"*%d\r\n" % len(value) + b"".join(self._encode(item, protocol) for item in value)
+            case dict():
+                return b"%%%d\r\n" % len(value) + b"".join(
+                    self._encode(key, protocol) + self._encode(item, protocol) for key, item in value.items()
+                )
+            case NoScript():
+                return b"-NOSCRIPT No matching script. Please use EVAL.\r\n"
+            case Exception():
+                return b"-ERR %s\r\n" % str(value).encode()
+
+        raise TypeError(f"Cannot encode {value!r}")
+
+    def _execute(self, command: bytes, arguments: list[bytes]) -> object:
+        match command.upper():
+            case b"PING":
+                return b"PONG"
+            case b"HELLO":
+                return {b"server": b"redis", b"version": b"7.4.0", b"proto": int(arguments[0]) if arguments else 2}
+            case b"CLIENT" | b"SELECT":
+                return True
+            case b"GET":
+                return self._lookup(arguments[0])
+            case b"MGET":
+                return [self._lookup(key) for key in arguments]
+            case b"SET":
+                key, value, *options = arguments
+                expires_at: float | None = None
+
+                for option, argument in zip(options[::2], options[1::2]):
+                    if option.upper() == b"PX":
+                        expires_at = time.monotonic() + int(argument) / 1000
+                    elif option.upper() == b"EX":
+                        expires_at = time.monotonic() + int(argument)
+
+                self.data[key] = (value, expires_at)
+                return True
+            case b"DEL":
+                return sum(1 for key in arguments if self.data.pop(key, None) is not None)
+            case b"FLUSHALL" | b"FLUSHDB":
+                self.data.clear()
+                return True
+            case b"SCRIPT" if arguments[0].upper() == b"LOAD":
+                sha = script_sha(arguments[1].decode())
+                self.loaded.add(sha)
+                return sha
+            case b"EVALSHA":
+                sha, count, *rest = arguments
+
+                if sha not in self.loaded or sha not in self.scripts:
+                    return NoScript()
+
+                return self.scripts[sha](rest[:int(count)], rest[int(count):])
+
+        return Exception(f"unknown command '{command.decode()}'")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        protocol = 2
+
+        try:
+            while (arguments := await self._read_command(reader)) is not None:
+                if not arguments:
+                    continue
+
+                if arguments[0].upper() == b"HELLO" and len(arguments) > 1:
+                    protocol = int(arguments[1])
+
+                writer.write(self._encode(self._execute(arguments[0], arguments[1:]), protocol))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,130 @@
+import time
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.configuration import Configuration
+from src.jobs import JobRunner
+
+
+class TestJobsEndpoint:
+    @pytest.fixture
+    def user_headers(self, client: TestClient):
+        """Create a user and return a factory for their authorization headers."""
+        def create(rate_limit: str | None = None) -> dict[str, str]:
+            response = client.post(
+                "/users/",
+                headers={"Authorization": f"Bearer {Configuration.get().admin_api_token.get_secret_value()}"},
+                json={"username": f"test-jobs-{uuid.uuid4()}", "rate_limit": rate_limit},
+            )
+
+            assert response.status_code == 200
+            return {"Authorization": f"Bearer {response.json()['api_token']}"}
+
+        return create
+
+    @pytest.fixture
+    def runner(self, client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path):
+        state = client.app.state  # type: ignore[attr-defined]
+        runner = JobRunner(state.database, state.providers, tmp_path, chunk_characters=32, poll_interval=0.05)
+
+        monkeypatch.setattr(state, "job_runner", runner)
+        client.portal.call(runner.start)  # type: ignore[union-attr]
+        yield runner
+        client.portal.call(runner.close)  # type: ignore[union-attr]
+
+    def test_jobs_disabled(self, client: TestClient, user_headers):
+        """Test that the job API reports it is unavailable when no jobs path is configured."""
+        response = client.post("/v1/jobs/", headers=user_headers(), json={"voice": "Amy", "text": "Hello"})
+        assert response.status_code == 503
+
+    def test_job_lifecycle(self, client: TestClient, user_headers, runner: JobRunner, mocker):
+        """Test that text over the per-request limit is synthesized as a job and downloaded once complete."""
+        async def synthesize(voice, text, **kwargs):
+            return np.zeros(160, dtype='<i2').tobytes()
+
+        mock_synthesize = mocker.patch("src.clients.polly.PollyProvider.synthesize_speech", side_effect=synthesize)
+
+        headers = user_headers()
+        text = "This sentence is long enough. " * 50
+        assert len(text) > Configuration.get().maximum_characters_per_request
+
+        response = client.post("/v1/jobs/", headers=headers, json={"voice": "Amy", "text": text, "format": "pcm"})
+
+        assert response.status_code == 202
+        assert response.headers["location"] == f"/v1/jobs/{response.json()['id']}"
+        assert response.json()["characters"] == len(text)
+
+        job_url = response.headers["location"]
+
+        for _ in range(100):
+            job = client.get(job_url, headers=headers).json()
+
+            if job["status"] != "queued" and job["status"] != "running":
+                break
+
+            time.sleep(0.02)
+
+        assert job["status"] == "completed"
+        assert job["chunks_done"] == job["chunks_total"] == mock_synthesize.call_count == 50
+
+        response = client.get(f"{job_url}/audio", headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/pcm"
+        assert response.content == b"\0" * 320 * 50
+
+        # Jobs are private to the user that created them
+        assert client.get(job_url, headers=user_headers()).status_code == 404
+
+    def test_audio_is_unavailable_until_complete(self, client: TestClient, user_headers, runner: JobRunner, mocker):
+        """Test that downloading a job's audio before it has completed is a conflict."""
+        async def synthesize(voice, text, **kwargs):
+            raise RuntimeError("synthesis failed")
+
+        mocker.patch("src.clients.polly.PollyProvider.synthesize_speech", side_effect=synthesize)
+
+        headers = user_headers()
+        job_url = client.post("/v1/jobs/", headers=headers, json={"voice": "Amy", "text": "Hi."}).headers["location"]
+
+        for _ in range(100):
+            if client.get(job_url, headers=headers).json()["status"] == "failed":
+                break
+
+            time.sleep(0.02)
+
+        response = client.get(f"{job_url}/audio", headers=headers)
+
+        assert response.status_code == 409
+        assert client.get(job_url, headers=headers).json()["error"] == "synthesis failed"
+
+    def test_jobs_have_their_own_rate_limit(self, client: TestClient, user_headers, runner: JobRunner, mocker):
+        """Test that a job larger than the user's limit throttles further jobs but not /v1/speech."""
+        async def synthesize(voice, text, **kwargs):
+            return np.zeros(160, dtype='<i2').tobytes()
+
+        async def stream_audio(*args, **kwargs):
+            yield b"audio"
+
+        mocker.patch("src.clients.polly.PollyProvider.synthesize_speech", side_effect=synthesize)
+        mocker.patch("src.clients.polly.PollyProvider.stream_speech", side_effect=stream_audio)
+
+        headers = user_headers("100/hour")
+        text = "This sentence is long enough. " * 50
+
+        response = client.post("/v1/jobs/", headers=headers, json={"voice": "Amy", "text": text})
+
+        assert response.status_code == 202
+        assert response.headers["x-ratelimit-remaining"] == "0"
+
+        response = client.get("/v1/speech", headers=headers, params={"voice": "Amy", "text": f"Hi {uuid.uuid4()}"})
+
+        assert response.status_code == 200
+        assert int(response.headers["x-ratelimit-remaining"]) > 50
+
+        response = client.post("/v1/jobs/", headers=headers, json={"voice": "Amy", "text": "Hi."})
+
+        assert response.status_code == 429
+        assert "retry-after" in response.headers
@@ -4,7 +4,9 @@ import uuid
 import pytest
 from fastapi.testclient import TestClient
 
+from src.clients.polly import TextTypeType
 from src.configuration import Configuration
+from src.tts.formats import AudioFormat
 
 
 class TestLegacySpeechEndpoint:
@@ -297,3 +299,58 @@ class TestLegacySpeechEndpoint:
         assert response2.status_code == 200
         # Should call Polly twice since different voices
         assert mock_synthesize.call_count == 2
+
+    def test_speech_shares_ssml_cache_with_v1(
+        self,
+        client: TestClient,
+        user_token: str,
+        mocker,
+    ):
+        """Test that SSML synthesized by either endpoint is synthesized as SSML and served from cache by the other."""
+        async def stream_audio(*args, **kwargs):
+            yield f"v1:{kwargs['text_type']}".encode()
+
+        mock_stream = mocker.patch(
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
+        )
+
+        mock_synthesize = mocker.patch(
+            "src.routers.legacy.PollyProvider.synthesize_speech",
+            new_callable=AsyncMock,
+            return_value=b"legacy:ssml",
+        )
+
+        headers = {"Authorization": f"Bearer {user_token}"}
+        v1_first, legacy_first = (f"<speak>shared {uuid.uuid4()}</speak>" for _ in range(2))
+
+        # A cache miss on /v1/speech is synthesized as SSML and then served by /legacy/speech
+        response = client.get(
+            "/v1/speech",
+            headers=headers,
+            params={"voice": "Amy", "text": v1_first, "text_type": "ssml"},
+        )
+        assert response.content == b"v1:ssml"
+
+        response = client.get(
+            "/legacy/speech",
+            params={"voice": "Amy", "text": v1_first, "text_type": "ssml", "token": user_token},
+        )
+        assert response.content == b"v1:ssml"
+
+        # And the other way around
+        response = client.get(
+            "/legacy/speech",
+            params={"voice": "Amy", "text": legacy_first, "text_type": "ssml", "token": user_token},
+        )
+        assert response.content == b"legacy:ssml"
+
+        response = client.get(
+            "/v1/speech",
+            headers=headers,
+            params={"voice": "Amy", "text": legacy_first, "text_type": "ssml"},
+        )
+        assert response.content == b"legacy:ssml"
+
+        mock_stream.assert_called_once_with("Amy", v1_first, output_format=AudioFormat.MP3, text_type=TextTypeType.Ssml)
+        mock_synthesize.assert_called_once_with("Amy", legacy_first, output_format="mp3", text_type="ssml")
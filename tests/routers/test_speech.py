@@ -1,10 +1,16 @@
-from unittest.mock import AsyncMock, MagicMock
+import io
+from unittest.mock import MagicMock
 import uuid
+import zipfile
 
 import pytest
 from fastapi.testclient import TestClient
 
+from src.cache import LRUCache
+from src.clients.polly import SSMLException, TextTypeType
 from src.configuration import Configuration
+from src.tts.formats import AudioFormat
+from src.tts.fragments import FragmentStitcher
 
 
 class TestSpeechEndpoint:
@@ -74,10 +80,12 @@ class TestSpeechEndpoint:
         """Test successful speech synthesis with Polly voice."""
         mock_audio_content = b"fake-audio-content"
 
-        mock_synthesize = mocker.patch(
-            "src.routers.speech.PollyProvider.synthesize_speech",
-            new_callable=AsyncMock,
-            return_value=mock_audio_content,
+        async def stream_audio(*args, **kwargs):
+            yield mock_audio_content
+
+        mock_stream = mocker.patch(
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
         )
 
         response = client.get(
@@ -90,7 +98,15 @@ class TestSpeechEndpoint:
         assert response.content == mock_audio_content
         assert response.headers["content-type"] == "audio/mpeg"
 
-        mock_synthesize.assert_called_once_with("Amy", "Hello world")
+        phases = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        assert {"auth", "ratelimit", "cache", "usage", "total"} <= set(phases)
+
+        mock_stream.assert_called_once_with(
+            "Amy",
+            "Hello world",
+            output_format=AudioFormat.MP3,
+            text_type=TextTypeType.Text,
+        )
 
     def test_speech_success_kokoro_voice(
         self,
@@ -99,12 +115,15 @@ class TestSpeechEndpoint:
         mocker,
     ):
         """Test successful speech synthesis with Kokoro voice."""
-        mock_audio_content = b"fake-kokoro-audio"
+        mock_audio_chunks = [b"fake-kokoro-", b"audio"]
 
-        mock_synthesize = mocker.patch(
-            "src.tts.kokoro.KokoroProvider.synthesize_speech",
-            new_callable=AsyncMock,
-            return_value=mock_audio_content,
+        async def stream_audio():
+            for chunk in mock_audio_chunks:
+                yield chunk
+
+        mock_stream = mocker.patch(
+            "src.tts.kokoro.KokoroProvider.stream_speech",
+            return_value=stream_audio(),
         )
 
         response = client.get(
@@ -114,10 +133,47 @@ class TestSpeechEndpoint:
         )
 
         assert response.status_code == 200
-        assert response.content == mock_audio_content
+        assert response.content == b"".join(mock_audio_chunks)
         assert response.headers["content-type"] == "audio/mpeg"
 
-        mock_synthesize.assert_called_once_with("af_heart", "Hello from Kokoro")
+        mock_stream.assert_called_once_with(
+            "af_heart",
+            "Hello from Kokoro",
+            output_format=AudioFormat.MP3,
+            text_type=TextTypeType.Text,
+        )
+
+    def test_speech_with_ssml(
+        self,
+        client: TestClient,
+        user_auth_headers: dict[str, str],
+        mocker,
+    ):
+        """Test that SSML is passed to the provider as SSML rather than read aloud as plain text."""
+        async def stream_audio(*args, **kwargs):
+            yield b"fake-ssml-audio"
+
+        mock_stream = mocker.patch(
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
+        )
+
+        ssml_text = f"<speak>Hello {uuid.uuid4()}</speak>"
+        response = client.get(
+            "/v1/speech",
+            headers=user_auth_headers,
+            params={"voice": "Amy", "text": ssml_text, "text_type": "ssml"},
+        )
+
+        assert response.status_code == 200
+        assert response.content == b"fake-ssml-audio"
+
+        mock_stream.assert_called_once_with(
+            "Amy",
+            ssml_text,
+            output_format=AudioFormat.MP3,
+            text_type=TextTypeType.Ssml,
+        )
 
     def test_speech_returns_cached_response(
         self,
@@ -128,10 +184,12 @@ class TestSpeechEndpoint:
         """Test that cached responses are returned without calling provider."""
         mock_audio_content = b"cached-audio-content"
 
-        mock_synthesize = mocker.patch(
-            "src.routers.speech.PollyProvider.synthesize_speech",
-            new_callable=AsyncMock,
-            return_value=mock_audio_content,
+        async def stream_audio(*args, **kwargs):
+            yield mock_audio_content
+
+        mock_stream = mocker.patch(
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
         )
 
         unique_text = f"cache test {uuid.uuid4()}"
@@ -143,7 +201,7 @@ class TestSpeechEndpoint:
             params={"voice": "Amy", "text": unique_text},
         )
         assert response1.status_code == 200
-        assert mock_synthesize.call_count == 1
+        assert mock_stream.call_count == 1
 
         # Second request with same parameters - should use cache
         response2 = client.get(
@@ -154,7 +212,7 @@ class TestSpeechEndpoint:
         assert response2.status_code == 200
         assert response2.content == mock_audio_content
         # Provider should not be called again
-        assert mock_synthesize.call_count == 1
+        assert mock_stream.call_count == 1
 
     def test_speech_content_disposition_header(
         self,
@@ -165,10 +223,12 @@ class TestSpeechEndpoint:
         """Test that response includes correct Content-Disposition header."""
         mock_audio_content = b"audio-content"
 
+        async def stream_audio(*args, **kwargs):
+            yield mock_audio_content
+
         mocker.patch(
-            "src.routers.speech.PollyProvider.synthesize_speech",
-            new_callable=AsyncMock,
-            return_value=mock_audio_content,
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
         )
 
         response = client.get(
@@ -179,3 +239,317 @@ class TestSpeechEndpoint:
 
         assert response.status_code == 200
         assert 'filename="Amy.mp3"' in response.headers["content-disposition"]
+
+    def test_speech_format_negotiation(
+        self,
+        client: TestClient,
+        user_auth_headers: dict[str, str],
+        mocker,
+    ):
+        """Test that the output format follows the format parameter, then the Accept header."""
+        async def stream_audio(*args, **kwargs):
+            yield str(kwargs["output_format"]).encode()
+
+        mock_stream = mocker.patch(
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
+        )
+
+        text = f"format test {uuid.uuid4()}"
+
+        response = client.get(
+            "/v1/speech",
+            headers={**user_auth_headers, "Accept": "audio/ogg; codecs=opus"},
+            params={"voice": "Amy", "text": text},
+        )
+
+        assert response.status_code == 200
+        assert response.content == b"opus"
+        assert response.headers["content-type"] == "audio/ogg; codecs=opus"
+        assert 'filename="Amy.opus"' in response.headers["content-disposition"]
+
+        response = client.get(
+            "/v1/speech",
+            headers={**user_auth_headers, "Accept": "audio/ogg; codecs=opus"},
+            params={"voice": "Amy", "text": text, "format": "wav"},
+        )
+
+        assert response.status_code == 200
+        assert response.content == b"wav"
+        assert response.headers["content-type"] == "audio/wav"
+
+        # Each format is cached separately
+        assert mock_stream.call_count == 2
+
+    def test_speech_fragment_cache(
+        self,
+        client: TestClient,
+        user_auth_headers: dict[str, str],
+        mocker,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test that plain text is synthesized per sentence when the fragment cache is enabled."""
+        monkeypatch.setattr(client.app.state, "fragment_stitcher", FragmentStitcher(LRUCache(max_size=None)))
+
+        async def synthesize(voice, text, **kwargs):
+            return text.encode() * 2
+
+        mock_synthesize = mocker.patch(
+            "src.clients.polly.PollyProvider.synthesize_speech",
+            side_effect=synthesize,
+        )
+
+        suffix = uuid.uuid4()
+
+        for day in ("Monday", "Friday"):
+            response = client.get(
+                "/v1/speech",
+                headers=user_auth_headers,
+                params={"voice": "Amy", "text": f"Hello {suffix}. See you {day}!", "format": "pcm"},
+            )
+
+            assert response.status_code == 200
+            assert response.content.startswith(f"Hello {suffix}.".encode())
+
+        assert [call.args[1] for call in mock_synthesize.call_args_list] == [
+            f"Hello {suffix}.", "See you Monday!", "See you Friday!",
+        ]
+
+    def test_speech_conditional_and_range_requests(
+        self,
+        client: TestClient,
+        user_auth_headers: dict[str, str],
+        mocker,
+    ):
+        """Test that cached audio is served with validators, revalidated with 304 and sliced by Range."""
+        async def stream_audio(*args, **kwargs):
+            yield b"0123456789"
+
+        mock_stream = mocker.patch(
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
+        )
+
+        params = {"voice": "Amy", "text": f"http cache {uuid.uuid4()}"}
+        response = client.get("/v1/speech", headers=user_auth_headers, params=params)
+
+        etag = response.headers["etag"]
+
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == Configuration.get().polly_cache_control
+        assert response.headers["vary"] == "Accept"
+
+        # Revalidation does not touch the cache or the provider
+        response = client.get("/v1/speech", headers={**user_auth_headers, "If-None-Match": etag}, params=params)
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+        response = client.get("/v1/speech", headers={**user_auth_headers, "Range": "bytes=2-5"}, params=params)
+
+        assert response.status_code == 206
+        assert response.content == b"2345"
+        assert response.headers["content-range"] == "bytes 2-5/10"
+
+        response = client.get("/v1/speech", headers={**user_auth_headers, "Range": "bytes=10-"}, params=params)
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */10"
+
+        # A stale If-Range gets the whole audio
+        response = client.get(
+            "/v1/speech",
+            headers={**user_auth_headers, "Range": "bytes=2-5", "If-Range": '"stale"'},
+            params=params,
+        )
+
+        assert response.status_code == 200
+        assert response.content == b"0123456789"
+        assert mock_stream.call_count == 1
+
+    def test_speech_batch(
+        self,
+        client: TestClient,
+        user_auth_headers: dict[str, str],
+        mocker,
+    ):
+        """Test that a batch synthesizes only its cache misses and records usage once."""
+        async def stream_audio(voice, text, **kwargs):
+            yield f"{text}:{kwargs['output_format']}".encode()
+
+        mock_stream = mocker.patch(
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
+        )
+
+        cached, fresh = f"batch cached {uuid.uuid4()}", f"batch fresh {uuid.uuid4()}"
+
+        response = client.get("/v1/speech", headers=user_auth_headers, params={"voice": "Amy", "text": cached})
+        assert response.status_code == 200
+
+        record = mocker.spy(client.app.state.usage_writer, "record")  # type: ignore[attr-defined]
+
+        response = client.post(
+            "/v1/speech/batch",
+            headers=user_auth_headers,
+            json={"items": [
+                {"voice": "Amy", "text": cached},
+                {"voice": "Amy", "text": fresh},
+                {"voice": "Amy", "text": fresh, "format": "wav"},
+            ]},
+        )
+
+        assert response.status_code == 200
+
+        boundary = response.headers["content-type"].split("boundary=")[1]
+        parts = {}
+
+        for part in response.content.split(f"--{boundary}".encode())[1:-1]:
+            headers, content = part.split(b"\r\n\r\n", 1)
+            index = int(headers.split(b'name="')[1].split(b'"')[0])
+            parts[index] = content.removesuffix(b"\r\n")
+
+        assert parts == {
+            0: f"{cached}:mp3".encode(),
+            1: f"{fresh}:mp3".encode(),
+            2: f"{fresh}:wav".encode(),
+        }
+
+        assert mock_stream.call_count == 3
+        record.assert_called_once_with(mocker.ANY, len(fresh) * 2)
+
+    def test_speech_batch_ssml(
+        self,
+        client: TestClient,
+        user_auth_headers: dict[str, str],
+        mocker,
+    ):
+        """Test that batch items are synthesized as SSML, with SSML Polly rejects failing only that item."""
+        async def stream_audio(voice, text, **kwargs):
+            if "<break" in text:
+                raise SSMLException("Unsupported break")
+
+            yield f"{kwargs['text_type']}".encode()
+
+        mock_stream = mocker.patch(
+            "src.clients.polly.PollyProvider.stream_speech",
+            side_effect=stream_audio,
+        )
+
+        valid, invalid = f"<speak>batch {uuid.uuid4()}</speak>", f"<speak><break/>{uuid.uuid4()}</speak>"
+
+        response = client.post(
+            "/v1/speech/batch",
+            headers=user_auth_headers,
+            json={"items": [
+                {"voice": "Amy", "text": valid, "text_type": "ssml"},
+                {"voice": "Amy", "text": invalid, "text_type": "ssml"},
+            ]},
+        )
+
+        assert response.status_code == 200
+
+        boundary = response.headers["content-type"].split("boundary=")[1]
+        parts = {}
+
+        for part in response.content.split(f"--{boundary}".encode())[1:-1]:
+            headers, content = part.split(b"\r\n\r\n", 1)
+            index = int(headers.split(b'name="')[1].split(b'"')[0])
+            parts[index] = (headers, content.removesuffix(b"\r\n"))
+
+        assert parts[0][1] == b"ssml"
+        assert b"X-Status-Code: 400" in parts[1][0]
+        assert b"SSML synthesis error" in parts[1][1]
+
+        assert {call.kwargs["text_type"] for call in mock_stream.call_args_list} == {TextTypeType.Ssml}
+
+    def test_speech_batch_zip(
+        self,
+        client: TestClient,
+        user_auth_headers: dict[str, str],
+        mocker,
+    ):
+        """Test that a batch is returned as a zip archive when requested."""
+        async def stream_audio(voice, text, **kwargs):
+            yield text.encode()
+
+        mocker.patch("src.clients.polly.PollyProvider.stream_speech", side_effect=stream_audio)
+
+        response = client.post(
+            "/v1/speech/batch",
+            headers={**user_auth_headers, "Accept": "application/zip"},
+            json={"items": [{"voice": "Amy", "text": "zip one"}, {"voice": "Joanna", "text": "zip two"}]},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            assert sorted(archive.namelist()) == ["0-Amy.mp3", "1-Joanna.mp3"]
+            assert archive.read("1-Joanna.mp3") == b"zip two"
+
+    def test_speech_batch_is_validated_up_front(
+        self,
+        client: TestClient,
+        user_auth_headers: dict[str, str],
+        mocker,
+    ):
+        """Test that one invalid item rejects the whole batch before anything is synthesized."""
+        mock_stream = mocker.patch("src.clients.polly.PollyProvider.stream_speech")
+        maximum = Configuration.get().maximum_characters_per_request
+
+        response = client.post(
+            "/v1/speech/batch",
+            headers=user_auth_headers,
+            json={"items": [{"voice": "Amy", "text": "ok"}, {"voice": "Amy", "text": "x" * (maximum + 1)}]},
+        )
+
+        assert response.status_code == 413
+        assert response.json()["detail"].startswith("Item 1:")
+
+        response = client.post(
+            "/v1/speech/batch",
+            headers=user_auth_headers,
+            json={"items": [{"voice": "Amy", "text": "<speak>unclosed", "text_type": "ssml"}]},
+        )
+
+        assert response.status_code == 400
+        mock_stream.assert_not_called()
+
+    def test_speech_rate_limit(
+        self,
+        client: TestClient,
+        auth_headers: dict[str, str],
+        mocker,
+    ):
+        """Test that a user's own character limit is enforced, with cache hits charged a fraction of it."""
+        async def stream_audio(*args, **kwargs):
+            yield b"audio"
+
+        mock_stream = mocker.patch("src.clients.polly.PollyProvider.stream_speech", side_effect=stream_audio)
+
+        response = client.post(
+            "/users/",
+            headers=auth_headers,
+            json={"username": f"test-limited-{uuid.uuid4()}", "rate_limit": "10/minute"},
+        )
+        headers = {"Authorization": f"Bearer {response.json()['api_token']}"}
+
+        response = client.get("/v1/speech", headers=headers, params={"voice": "Amy", "text": "Hello..."})
+
+        assert response.status_code == 200
+        assert response.headers["x-ratelimit-limit"] == "10"
+        assert response.headers["x-ratelimit-remaining"] == "2"
+
+        response = client.get("/v1/speech", headers=headers, params={"voice": "Amy", "text": "Hello..."})
+
+        assert response.status_code == 200
+        assert response.headers["x-ratelimit-remaining"] == "1"
+
+        response = client.get("/v1/speech", headers=headers, params={"voice": "Amy", "text": "Goodbye!"})
+
+        assert response.status_code == 429
+        assert 0 < int(response.headers["retry-after"]) <= 42
+        assert response.headers["x-ratelimit-remaining"] == "1"
+        mock_stream.assert_called_once()
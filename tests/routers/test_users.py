@@ -93,3 +93,61 @@ class TestUserRoutes:
         # Check user is in list
         usernames = [u["username"] for u in users]
         assert username in usernames
+
+    def test_get_user_usage(self, client: TestClient, auth_headers: dict[str, str]):
+        """Test that GET /users/{id}/usage returns totals from the rollups."""
+        response = client.post(
+            "/users/",
+            headers=auth_headers,
+            json={"username": f"test-user-{uuid.uuid4()}"},
+        )
+        user_id = response.json()["id"]
+
+        usage_writer = client.app.state.usage_writer  # type: ignore[attr-defined]
+
+        for characters in (10, 20, 30):
+            client.portal.call(usage_writer.record, user_id, characters)  # type: ignore[union-attr]
+
+        client.portal.call(usage_writer.flush)  # type: ignore[union-attr]
+
+        for granularity in ("hour", "day"):
+            response = client.get(
+                f"/users/{user_id}/usage",
+                headers=auth_headers,
+                params={"granularity": granularity},
+            )
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["characters_used"] == 60
+            assert data["requests"] == 3
+            assert sum(bucket["characters_used"] for bucket in data["buckets"]) == 60
+
+    def test_get_user_usage_unknown_user(self, client: TestClient, auth_headers: dict[str, str]):
+        """Test that GET /users/{id}/usage returns 404 for an unknown user."""
+        response = client.get("/users/999999999/usage", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_get_user_usage_invalid_range(self, client: TestClient, auth_headers: dict[str, str]):
+        """Test that GET /users/{id}/usage rejects a range that ends before it starts."""
+        response = client.get(
+            "/users/1/usage",
+            headers=auth_headers,
+            params={"start": "2026-02-01T00:00:00Z", "end": "2026-01-01T00:00:00Z"},
+        )
+        assert response.status_code == 400
+
+    def test_get_user_usage_unauthorized(self, client: TestClient):
+        """Test that GET /users/{id}/usage returns 401 without auth."""
+        response = client.get("/users/1/usage")
+        assert response.status_code == 401
+
+    def test_create_user_invalid_rate_limit(self, client: TestClient, auth_headers: dict[str, str]):
+        """Test that a rate limit which cannot be parsed is rejected."""
+        response = client.post(
+            "/users/",
+            headers=auth_headers,
+            json={"username": f"test-user-{uuid.uuid4()}", "rate_limit": "often"},
+        )
+
+        assert response.status_code == 422
@@ -0,0 +1,318 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from src.cache import DiskCache, LRUCache, RedisCache, TieredCache, TTLCache, get_many
+from tests.redis_server import InMemoryRedisServer
+
+
+class TestLRUCache:
+    @pytest.mark.asyncio
+    async def test_get_missing_key(self):
+        """Test that a missing key returns None."""
+        cache: LRUCache[bytes] = LRUCache()
+        assert await cache.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used_by_count(self):
+        """Test that the least recently used entry is evicted when the count bound is exceeded."""
+        cache: LRUCache[bytes] = LRUCache(max_size=2)
+
+        await cache.set("a", b"1")
+        await cache.set("b", b"2")
+
+        # Touch "a" so that "b" becomes the least recently used entry
+        assert await cache.get("a") == b"1"
+
+        await cache.set("c", b"3")
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == b"1"
+        assert await cache.get("c") == b"3"
+
+    @pytest.mark.asyncio
+    async def test_evicts_by_total_bytes(self):
+        """Test that entries are evicted until the cache fits within its byte budget."""
+        cache: LRUCache[bytes] = LRUCache(max_size=None, max_bytes=10)
+
+        await cache.set("a", b"x" * 4)
+        await cache.set("b", b"x" * 4)
+        assert cache.memory_usage == 8
+
+        await cache.set("c", b"x" * 6)
+
+        assert await cache.get("a") is None
+        assert await cache.get("b") == b"x" * 4
+        assert await cache.get("c") == b"x" * 6
+        assert cache.memory_usage == 10
+        assert len(cache) == 2
+
+    @pytest.mark.asyncio
+    async def test_rejects_oversized_entries(self):
+        """Test that values larger than the per-entry limit are not cached."""
+        cache: LRUCache[bytes] = LRUCache(max_size=None, max_bytes=100, max_entry_bytes=5)
+
+        await cache.set("small", b"x" * 5)
+        await cache.set("large", b"x" * 6)
+
+        assert await cache.get("small") == b"x" * 5
+        assert await cache.get("large") is None
+        assert cache.memory_usage == 5
+
+    @pytest.mark.asyncio
+    async def test_overwrite_updates_memory_usage(self):
+        """Test that replacing a value accounts for the old entry's size."""
+        cache: LRUCache[bytes] = LRUCache(max_size=None, max_bytes=100)
+
+        await cache.set("a", b"x" * 10)
+        await cache.set("a", b"x" * 3)
+
+        assert cache.memory_usage == 3
+        assert len(cache) == 1
+
+
+class TestTTLCache:
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_removed(self):
+        """Test that expired entries are not returned and no longer count towards memory usage."""
+        cache: TTLCache[bytes] = TTLCache(maxsize=4, ttl=-1)
+
+        await cache.set("a", b"value")
+
+        assert await cache.get("a") is None
+        assert len(cache) == 0
+        assert cache.memory_usage == 0
+
+
+    @pytest.mark.asyncio
+    async def test_per_entry_ttl(self):
+        """Test that a per-entry TTL overrides the cache default."""
+        cache: TTLCache[bytes] = TTLCache(maxsize=4, ttl=60)
+
+        await cache.set("short", b"value", ttl=-1)
+        await cache.set("long", b"value")
+
+        assert await cache.get("short") is None
+        assert await cache.get("long") == b"value"
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_removed_on_write(self):
+        """Test that writes remove expired entries that are never read again."""
+        cache: TTLCache[bytes] = TTLCache(maxsize=100, ttl=60)
+
+        for i in range(10):
+            await cache.set(f"key-{i}", b"value", ttl=-1)
+
+        await cache.set("fresh", b"value")
+
+        assert len(cache) == 1
+        assert cache.expirations == 10
+
+    @pytest.mark.asyncio
+    async def test_background_sweep(self):
+        """Test that the background sweep removes expired entries without any further access."""
+        cache: TTLCache[bytes] = TTLCache(maxsize=100, ttl=0.05, sweep_interval=0.05)
+
+        for i in range(10):
+            await cache.set(f"key-{i}", b"value")
+
+        await asyncio.sleep(0.3)
+
+        assert len(cache) == 0
+        assert cache.memory_usage == 0
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_counters(self):
+        """Test that hits, misses and expirations are counted."""
+        cache: TTLCache[bytes] = TTLCache(maxsize=4, ttl=60)
+
+        await cache.set("a", b"value")
+        await cache.set("b", b"value", ttl=-1)
+
+        assert await cache.get("a") == b"value"
+        assert await cache.get("b") is None
+        assert await cache.get("missing") is None
+
+        assert (cache.hits, cache.misses, cache.expirations) == (1, 2, 1)
+
+    @pytest.mark.asyncio
+    async def test_heap_stays_bounded_under_rewrites(self):
+        """Test that rewriting the same keys does not grow the expiry heap without bound."""
+        cache: TTLCache[bytes] = TTLCache(maxsize=10, ttl=60)
+
+        for i in range(10_000):
+            await cache.set(f"key-{i % 20}", b"value")
+
+        assert len(cache) == 10
+        assert len(cache._expiry) <= 2 * len(cache) + 65
+
+class TestDiskCache:
+    @pytest.mark.asyncio
+    async def test_survives_reopen(self, tmp_path):
+        """Test that cached audio is still available after the cache is closed and reopened."""
+        cache = DiskCache(tmp_path)
+        await cache.set("key", b"audio")
+        await cache.close()
+
+        reopened = DiskCache(tmp_path)
+        assert await reopened.get("key") == b"audio"
+        assert reopened.disk_usage == 5
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_identical_audio_is_stored_once(self, tmp_path):
+        """Test that keys with identical audio share a single object on disk."""
+        cache = DiskCache(tmp_path)
+
+        await cache.set("a", b"audio")
+        await cache.set("b", b"audio")
+
+        assert cache.disk_usage == 5
+        assert len([p for p in (tmp_path / "objects").rglob("*") if p.is_file()]) == 1
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_accessed(self, tmp_path):
+        """Test that the least recently accessed keys are evicted once over budget."""
+        cache = DiskCache(tmp_path, max_bytes=10)
+
+        await cache.set("a", b"x" * 4)
+        await cache.set("b", b"y" * 4)
+        assert await cache.get("a") == b"x" * 4
+
+        await cache.set("c", b"z" * 4)
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == b"x" * 4
+        assert await cache.get("c") == b"z" * 4
+        assert cache.disk_usage == 8
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_budget_is_shared_between_workers(self, tmp_path):
+        """Test that caches sharing a directory evict to keep their combined size within max_bytes."""
+        first = DiskCache(tmp_path, max_bytes=10)
+        second = DiskCache(tmp_path, max_bytes=10)
+
+        await first.set("a", b"x" * 4)
+        await second.set("b", b"y" * 4)
+        await first.set("c", b"z" * 4)
+
+        assert await second.get("a") is None
+        assert await second.get("b") == b"y" * 4
+        assert first.disk_usage == 8
+        assert len([p for p in (tmp_path / "objects").rglob("*") if p.is_file()]) == 2
+
+        await first.close()
+        await second.close()
+
+    @pytest.mark.asyncio
+    async def test_access_times_are_batched(self, tmp_path):
+        """Test that reads record access times in batches rather than writing the index on every hit."""
+        cache = DiskCache(tmp_path, access_interval=3600, max_pending_accesses=2)
+        await cache.set("a", b"1")
+        await cache.set("b", b"2")
+
+        def accessed_at(key: str) -> float:
+            return cache.connection.execute("SELECT accessed_at FROM entries WHERE key = ?", (key,)).fetchone()[0]
+
+        before = accessed_at("a")
+        await cache.get("a")
+        assert accessed_at("a") == before
+
+        await cache.get("b")
+        assert accessed_at("a") > before
+        await cache.close()
+
+
+class TestTieredCache:
+    @pytest.mark.asyncio
+    async def test_promotes_hits_to_faster_tiers(self, tmp_path):
+        """Test that a hit in a slower tier is copied into the faster tiers."""
+        memory: LRUCache[bytes] = LRUCache()
+        disk = DiskCache(tmp_path)
+        cache = TieredCache(memory, disk)
+
+        await disk.set("key", b"audio")
+        assert await memory.get("key") is None
+
+        assert await cache.get("key") == b"audio"
+        assert await memory.get("key") == b"audio"
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_get_many(self, tmp_path):
+        """Test that several keys are looked up together across tiers."""
+        memory: LRUCache[bytes] = LRUCache()
+        disk = DiskCache(tmp_path)
+        cache = TieredCache(memory, disk)
+
+        await memory.set("a", b"1")
+        await disk.set("b", b"2")
+
+        assert await get_many(cache, ["a", "missing", "b"]) == [b"1", None, b"2"]
+        assert await memory.get("b") == b"2"
+        await cache.close()
+
+
+class TestRedisCache:
+    @pytest_asyncio.fixture
+    async def redis_server(self):
+        server = InMemoryRedisServer()
+        await server.start()
+        yield server
+        await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_get_and_set(self, redis_server: InMemoryRedisServer):
+        """Test that binary values round-trip through the Redis backend."""
+        cache: RedisCache[bytes] = RedisCache.from_url(redis_server.url)
+
+        assert await cache.get("key") is None
+        await cache.set("key", b"\x00audio\xff")
+        assert await cache.get("key") == b"\x00audio\xff"
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_values_are_shared_between_clients(self, redis_server: InMemoryRedisServer):
+        """Test that a value written by one client (worker) is visible to another."""
+        writer: RedisCache[bytes] = RedisCache.from_url(redis_server.url)
+        reader: RedisCache[bytes] = RedisCache.from_url(redis_server.url)
+
+        await writer.set("key", b"audio")
+        assert await reader.get("key") == b"audio"
+
+        await writer.close()
+        await reader.close()
+
+    @pytest.mark.asyncio
+    async def test_get_many(self, redis_server: InMemoryRedisServer):
+        """Test that several values can be read in a single round trip."""
+        cache: RedisCache[bytes] = RedisCache.from_url(redis_server.url)
+
+        await cache.set("a", b"1")
+        await cache.set("b", b"2")
+        assert await cache.get_many(["a", "missing", "b"]) == [b"1", None, b"2"]
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_ttl(self, redis_server: InMemoryRedisServer):
+        """Test that values expire after the configured TTL."""
+        cache: RedisCache[bytes] = RedisCache.from_url(redis_server.url, ttl=0.001)
+
+        await cache.set("key", b"audio")
+        await asyncio.sleep(0.01)
+
+        assert await cache.get("key") is None
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_unavailable_server_is_a_miss(self):
+        """Test that connection failures are treated as cache misses."""
+        cache: RedisCache[bytes] = RedisCache.from_url("redis://127.0.0.1:1/0")
+
+        assert await cache.get("key") is None
+        await cache.set("key", b"audio")
+        await cache.close()
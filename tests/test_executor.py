@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.executor import BoundedExecutor, ExecutorSaturated
+
+
+class TestBoundedExecutor:
+    @pytest.mark.asyncio
+    async def test_runs_on_dedicated_threads(self):
+        """Test that work runs on the executor's own named threads."""
+        executor = BoundedExecutor("test", max_workers=1, max_queue=4)
+
+        name = await executor.run(lambda: threading.current_thread().name)
+
+        assert name.startswith("test")
+        assert executor.completed == 1
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_work_when_queue_is_full(self):
+        """Test that new work is rejected once the queue limit is reached."""
+        executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(executor.run(lambda: None))
+        await asyncio.sleep(0)
+
+        assert executor.queued == 1
+
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(lambda: None)
+
+        # Work that has already been admitted may bypass the limit
+        bypassed = asyncio.ensure_future(executor.run(lambda: None, bounded=False))
+        await asyncio.sleep(0)
+
+        release.set()
+        await asyncio.gather(running, queued, bypassed)
+
+        assert executor.queued == 0
+        assert executor.completed == 3
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_work_leaves_the_queue(self):
+        """Test that cancelling queued work releases its queue slot."""
+        executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(executor.run(lambda: None))
+        await asyncio.sleep(0)
+
+        queued.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        assert executor.queued == 0
+
+        release.set()
+        await running
+        executor.shutdown()
@@ -0,0 +1,248 @@
+import asyncio
+import datetime
+import io
+
+import numpy as np
+import pytest
+import pytest_asyncio
+import soundfile as sf
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from src.database import Database
+from src.jobs import JobRunner
+from src.models.job import JobStatus, SynthesisJob
+from src.models.user import User
+from src.providers import ProviderRegistry
+from src.tts.formats import AudioFormat
+from src.tts.provider import TTSProvider
+
+
+class FakeProvider(TTSProvider[str]):
+    """Returns 100 samples per chunk, each set to the chunk's position in the text."""
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.max_active = 0
+        self.fail_on: str | None = None
+
+    @property
+    def sample_rate(self) -> int:
+        return 16000
+
+    @staticmethod
+    def voices() -> list[str]:
+        return ["voice"]
+
+    @property
+    def name(self) -> str:
+        return "fake"
+
+    async def synthesize_speech(self, voice: str, text: str, **kwargs) -> bytes:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+
+        # Later chunks finish first, so the output is only in order if it is assembled in order
+        number = int(text.split()[1].rstrip("."))
+        await asyncio.sleep(0.02 / number)
+
+        self.active -= 1
+
+        if text == self.fail_on:
+            raise RuntimeError("synthesis failed")
+
+        return np.full(100, number, dtype='<i2').tobytes()
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    database = Database(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}"))
+
+    async with database.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    async with database.get_session() as session:
+        session.add(User(id=1, username="alice", api_token="alice-token"))
+        await session.commit()
+
+    yield database
+    await database.close()
+
+
+async def wait_for(runner: JobRunner, job_id: str) -> SynthesisJob:
+    for _ in range(200):
+        job = await runner.get(job_id)
+
+        if job is not None and job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+            return job
+
+        await asyncio.sleep(0.01)
+
+    raise AssertionError("Job did not finish")
+
+
+TEXT = " ".join(f"Chunk {number}." for number in range(1, 9))
+
+
+class TestJobRunner:
+    @pytest.mark.asyncio
+    async def test_chunks_are_synthesized_in_parallel_and_assembled_in_order(self, database: Database, tmp_path):
+        """Test that a job's chunks are synthesized concurrently and written to one file in text order."""
+        provider = FakeProvider()
+        runner = JobRunner(
+            database,
+            ProviderRegistry.of(provider),
+            tmp_path / "jobs",
+            chunk_characters=10,
+            chunk_concurrency=3,
+        )
+        runner.start()
+
+        job = await runner.submit(1, "voice", TEXT, AudioFormat.WAV)
+        assert job.chunks_total == 8
+
+        job = await wait_for(runner, job.id)
+        await runner.close()
+
+        assert job.status == JobStatus.COMPLETED
+        assert job.chunks_done == 8
+        assert provider.max_active == 3
+
+        audio, samplerate = sf.read(io.BytesIO(runner.audio_path(job).read_bytes()), dtype='int16')
+
+        assert samplerate == 16000
+        assert list(audio[::100]) == list(range(1, 9))
+        assert list((tmp_path / "jobs").iterdir()) == [runner.audio_path(job)]
+
+    @pytest.mark.asyncio
+    async def test_failed_job(self, database: Database, tmp_path):
+        """Test that a failing chunk fails the job and leaves no partial file behind."""
+        provider = FakeProvider()
+        provider.fail_on = "Chunk 5."
+
+        runner = JobRunner(database, ProviderRegistry.of(provider), tmp_path / "jobs", chunk_characters=10)
+        runner.start()
+
+        job = await wait_for(runner, (await runner.submit(1, "voice", TEXT, AudioFormat.MP3)).id)
+        await runner.close()
+
+        assert job.status == JobStatus.FAILED
+        assert job.error == "synthesis failed"
+        assert list((tmp_path / "jobs").iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_abandoned_job_is_claimed_again(self, database: Database, tmp_path):
+        """Test that a running job that stopped making progress is picked up by another worker."""
+        async with database.get_session() as session:
+            session.add(SynthesisJob(
+                id="abandoned",
+                user_id=1,
+                voice="voice",
+                text="Chunk 1.",
+                status=JobStatus.RUNNING,
+                updated_at=datetime.datetime(2000, 1, 1),
+            ))
+            await session.commit()
+
+        runner = JobRunner(database, ProviderRegistry.of(FakeProvider()), tmp_path / "jobs")
+        runner.start()
+
+        job = await wait_for(runner, "abandoned")
+        await runner.close()
+
+        assert job.status == JobStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_mp3_job_decodes_in_full(self, database: Database, tmp_path):
+        """Test that a job's MP3 output decodes to at least every sample synthesized."""
+        runner = JobRunner(database, ProviderRegistry.of(FakeProvider()), tmp_path / "jobs", chunk_characters=10)
+        job = await runner.submit(1, "voice", TEXT, AudioFormat.MP3)
+
+        await runner._process(await runner._claim())
+
+        audio, samplerate = sf.read(io.BytesIO(runner.audio_path(job).read_bytes()))
+
+        assert samplerate == 16000
+        assert len(audio) >= 800
+
+    @pytest.mark.asyncio
+    async def test_runners_racing_for_a_stale_job(self, database: Database, tmp_path):
+        """Test that a worker presumed dead stops once its job is reclaimed, leaving the new owner to finish it."""
+        first = JobRunner(database, ProviderRegistry.of(FakeProvider()), tmp_path / "jobs", chunk_characters=10)
+        second = JobRunner(database, ProviderRegistry.of(FakeProvider()), tmp_path / "jobs", chunk_characters=10)
+        job = await first.submit(1, "voice", TEXT, AudioFormat.WAV)
+
+        claimed = await first._claim()
+        assert claimed is not None
+
+        async with database.get_session() as session:
+            stalled = await session.get(SynthesisJob, job.id)
+            stalled.updated_at = datetime.datetime(2000, 1, 1)
+            session.add(stalled)
+            await session.commit()
+
+        reclaimed = await second._claim()
+        assert reclaimed is not None
+        assert reclaimed.claim_token != claimed.claim_token
+
+        await asyncio.gather(first._process(claimed), second._process(reclaimed))
+
+        job = await second.get(job.id)
+
+        assert job.status == JobStatus.COMPLETED
+        assert job.chunks_done == 8
+        assert job.claim_token == reclaimed.claim_token
+        assert list((tmp_path / "jobs").iterdir()) == [second.audio_path(job)]
+
+        audio, _ = sf.read(io.BytesIO(second.audio_path(job).read_bytes()), dtype='int16')
+        assert list(audio[::100]) == list(range(1, 9))
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_keeps_slow_jobs_claimed(self, database: Database, tmp_path):
+        """Test that a running job stays fresh while no chunk completes, and is abandoned once reclaimed."""
+        provider = FakeProvider()
+        synthesizing = asyncio.Event()
+
+        async def stall(voice: str, text: str, **kwargs) -> bytes:
+            synthesizing.set()
+            await asyncio.sleep(3600)
+            return b""
+
+        provider.synthesize_speech = stall  # type: ignore[method-assign]
+        runner = JobRunner(database, ProviderRegistry.of(provider), tmp_path / "jobs", heartbeat_interval=0.01)
+        job = await runner.submit(1, "voice", "Chunk 1.", AudioFormat.WAV)
+
+        claimed = await runner._claim()
+        processing = asyncio.create_task(runner._process(claimed))
+        await synthesizing.wait()
+
+        first_seen = (await runner.get(job.id)).updated_at
+        await asyncio.sleep(0.05)
+        assert (await runner.get(job.id)).updated_at > first_seen
+
+        async with database.get_session() as session:
+            reclaimed = await session.get(SynthesisJob, job.id)
+            reclaimed.claim_token = "another-worker"
+            session.add(reclaimed)
+            await session.commit()
+
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(processing, timeout=1)
+
+        assert (await runner.get(job.id)).status == JobStatus.RUNNING
+        assert list((tmp_path / "jobs").iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_expire(self, database: Database, tmp_path):
+        """Test that finished jobs and their audio are removed after the retention period."""
+        runner = JobRunner(database, ProviderRegistry.of(FakeProvider()), tmp_path / "jobs", retention=0.0)
+        job = await runner.submit(1, "voice", "Chunk 1.", AudioFormat.PCM)
+
+        await runner._process(await runner._claim())
+        assert runner.audio_path(job).exists()
+
+        await asyncio.sleep(0.01)
+        await runner._expire()
+
+        assert await runner.get(job.id) is None
+        assert list((tmp_path / "jobs").iterdir()) == []
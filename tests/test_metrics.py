@@ -0,0 +1,97 @@
+from typing import AsyncIterator
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.cache import LRUCache, TTLCache
+from src.database import TimedQueuePool
+from src.executor import BoundedExecutor
+from src.metrics import StateCollector, instrument_synthesis
+
+
+class FakeProvider:
+    name = "fake"
+
+    @instrument_synthesis
+    async def stream_speech(self, voice: str, text: str, **kwargs) -> AsyncIterator[bytes]:
+        for word in text.split():
+            yield word.encode()
+
+
+class TestInstrumentSynthesis:
+    @pytest.mark.asyncio
+    async def test_records_completed_streams(self):
+        """Test that a completed stream records its latency and characters, and an abandoned one does not."""
+        def sample(name: str, **labels: str) -> float:
+            return REGISTRY.get_sample_value(name, labels) or 0.0
+
+        provider = FakeProvider()
+        count = sample("tts_synthesis_duration_seconds_count", provider="fake")
+        characters = sample("tts_synthesized_characters_total", provider="fake", voice="Amy")
+
+        assert [chunk async for chunk in provider.stream_speech("Amy", "hello there")] == [b"hello", b"there"]
+
+        assert sample("tts_synthesis_duration_seconds_count", provider="fake") == count + 1
+        assert sample("tts_synthesis_first_chunk_seconds_count", provider="fake") >= 1
+        assert sample("tts_synthesized_characters_total", provider="fake", voice="Amy") == characters + 11
+
+        stream = provider.stream_speech("Amy", "hello there")
+        await anext(stream)
+        await stream.aclose()
+
+        assert sample("tts_synthesis_duration_seconds_count", provider="fake") == count + 1
+
+
+class TestStateCollector:
+    @pytest.mark.asyncio
+    async def test_collects_cache_and_executor_state(self):
+        """Test that cache counters and sizes and executor queue depth are read at collection time."""
+        audio: LRUCache[bytes] = LRUCache(max_size=1)
+        users: TTLCache[str] = TTLCache(maxsize=4, ttl=60)
+        executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+
+        registry = CollectorRegistry()
+        registry.register(StateCollector({"audio": audio, "users": users}, executors=lambda: [executor]))
+
+        await audio.set("a", b"1234")
+        await audio.set("b", b"56")
+        await audio.get("a")
+        await audio.get("b")
+        await users.get("missing")
+
+        assert registry.get_sample_value("tts_cache_hits_total", {"cache": "audio"}) == 1
+        assert registry.get_sample_value("tts_cache_misses_total", {"cache": "audio"}) == 1
+        assert registry.get_sample_value("tts_cache_evictions_total", {"cache": "audio"}) == 1
+        assert registry.get_sample_value("tts_cache_bytes", {"cache": "audio"}) == 2
+        assert registry.get_sample_value("tts_cache_misses_total", {"cache": "users"}) == 1
+        assert registry.get_sample_value("tts_cache_expirations_total", {"cache": "users"}) == 0
+        assert registry.get_sample_value("tts_executor_queue_depth", {"executor": "test"}) == 0
+
+        executor.shutdown()
+
+
+class TestTimedQueuePool:
+    @pytest.mark.asyncio
+    async def test_records_checkout_wait(self, tmp_path):
+        """Test that every connection checkout records how long it waited."""
+        before = REGISTRY.get_sample_value("tts_db_pool_checkout_seconds_count") or 0.0
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=TimedQueuePool)
+
+        async with engine.connect():
+            pass
+
+        assert REGISTRY.get_sample_value("tts_db_pool_checkout_seconds_count") == before + 1
+        await engine.dispose()
+
+
+class TestMetricsEndpoint:
+    def test_metrics(self, client: TestClient):
+        """Test that /metrics serves the Prometheus text format without authentication."""
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'tts_cache_hits_total{cache="audio"}' in response.text
+        assert "tts_executor_queue_depth" in response.text
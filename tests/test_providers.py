@@ -0,0 +1,163 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+import pytest
+
+from src.configuration import Configuration
+from src.providers import ProviderRegistry, ProviderSpec, ProviderUnavailable, configured_providers
+
+
+class FakeProvider:
+    def __init__(self, name: str = "fake") -> None:
+        self._name = name
+        self.closed = False
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @staticmethod
+    def voices() -> list[str]:
+        return ["voice"]
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class TestProviderRegistry:
+    @pytest.mark.asyncio
+    async def test_loads_once_in_the_background(self):
+        """Test that preload builds each provider once, and requests made while it loads wait for it."""
+        released = threading.Event()
+        loads = 0
+
+        def load() -> FakeProvider:
+            nonlocal loads
+            loads += 1
+            released.wait(5)
+            return FakeProvider()
+
+        registry = ProviderRegistry([ProviderSpec("fake", ["voice"], load)])
+        assert registry.status() == {"fake": "not_loaded"}
+
+        registry.preload()
+        waiting = [asyncio.create_task(registry.for_voice("voice")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        assert registry.status() == {"fake": "loading"}
+        assert not registry.ready
+
+        released.set()
+        providers = await asyncio.gather(*waiting)
+
+        assert loads == 1
+        assert all(provider is providers[0] for provider in providers)
+        assert registry.status() == {"fake": "loaded"}
+        assert registry.ready
+
+        await registry.close()
+        assert providers[0].closed
+
+    @pytest.mark.asyncio
+    async def test_failed_load_is_retried(self):
+        """Test that a provider that fails to load is reported as failed and loaded again on the next request."""
+        attempts = 0
+
+        def load() -> FakeProvider:
+            nonlocal attempts
+            attempts += 1
+
+            if attempts == 1:
+                raise RuntimeError("model missing")
+
+            return FakeProvider()
+
+        registry = ProviderRegistry([ProviderSpec("fake", ["voice"], load)])
+
+        with pytest.raises(ProviderUnavailable):
+            await registry.get("fake")
+
+        assert registry.status() == {"fake": "failed"}
+        assert registry.errors == {"fake": "model missing"}
+
+        assert (await registry.get("fake")).name == "fake"
+        assert registry.status() == {"fake": "loaded"}
+        assert registry.errors == {}
+
+    @pytest.mark.asyncio
+    async def test_unknown_voices_and_disabled_providers(self):
+        """Test that voices of disabled providers are not routed and disabled providers are unavailable."""
+        registry = ProviderRegistry.of(FakeProvider())
+
+        assert registry.voices() == ["voice"]
+        assert registry.ready
+        assert await registry.for_voice("Amy") is None
+
+        with pytest.raises(ProviderUnavailable):
+            await registry.get("kokoro")
+
+    def test_configured_providers(self):
+        """Test that only the providers enabled in the configuration are registered."""
+        configuration = Configuration(providers=["polly"])
+        specs = configured_providers(configuration)
+
+        assert [spec.name for spec in specs] == ["polly"]
+        assert "Amy" in specs[0].voices
+
+    def test_kokoro_is_imported_lazily(self):
+        """Test that importing the application does not import torch or kokoro."""
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, src.main; print('torch' in sys.modules or 'src.tts.kokoro' in sys.modules)",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=60,
+            env={**os.environ, "PYTHONPATH": os.getcwd()},
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "False"
+
+
+class TestHealthEndpoints:
+    def test_liveness(self, client: TestClient):
+        """Test that the liveness probe answers without checking dependencies."""
+        response = client.get("/health/live")
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+    def test_readiness(self, client: TestClient):
+        """Test that the readiness probe reports ready once every provider has loaded."""
+        deadline = time.monotonic() + 10
+
+        while (response := client.get("/health/ready")).status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert response.status_code == 200
+
+        body = response.json()
+        assert body["status"] == "ok"
+        assert body["database"] == "ok"
+        assert body["providers"] == {"polly": "loaded", "kokoro": "loaded"}
+
+    def test_readiness_while_loading(self, client: TestClient):
+        """Test that the readiness probe fails while a provider is still loading."""
+        providers: ProviderRegistry = client.app.state.providers  # type: ignore[attr-defined]
+        kokoro = providers.providers.pop("kokoro")
+
+        try:
+            response = client.get("/health/ready")
+        finally:
+            providers.providers["kokoro"] = kokoro
+
+        assert response.status_code == 503
+        assert response.json()["providers"]["kokoro"] == "not_loaded"
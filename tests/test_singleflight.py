@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from src.singleflight import Broadcast, SingleFlight, StreamingSingleFlight
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_coalesced(self):
+        """Test that concurrent calls with the same key run the function once."""
+        flights: SingleFlight[str] = SingleFlight()
+        calls = 0
+
+        async def work() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flights.do("key", work) for _ in range(50)))
+
+        assert results == ["result"] * 50
+        assert calls == 1
+        assert len(flights) == 0
+
+    @pytest.mark.asyncio
+    async def test_different_keys_are_not_coalesced(self):
+        """Test that calls with different keys run independently."""
+        flights: SingleFlight[str] = SingleFlight()
+        calls = 0
+
+        async def work() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        await asyncio.gather(flights.do("a", work), flights.do("b", work))
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_exceptions_are_shared(self):
+        """Test that every waiting caller receives the exception raised by the shared call."""
+        flights: SingleFlight[str] = SingleFlight()
+
+        async def work() -> str:
+            await asyncio.sleep(0.01)
+            raise RuntimeError("failed")
+
+        results = await asyncio.gather(
+            flights.do("key", work),
+            flights.do("key", work),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(flights) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that cancelling the first caller does not cancel the shared work."""
+        flights: SingleFlight[str] = SingleFlight()
+
+        async def work() -> str:
+            await asyncio.sleep(0.02)
+            return "result"
+
+        first = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+
+        first.cancel()
+
+        assert await second == "result"
+
+
+class TestStreamingSingleFlight:
+    @pytest.mark.asyncio
+    async def test_subscribers_receive_every_chunk(self):
+        """Test that a subscriber joining mid-stream still receives the stream from the beginning."""
+        flights = StreamingSingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def source():
+            nonlocal calls
+            calls += 1
+            yield b"a"
+            await release.wait()
+            yield b"b"
+
+        first = flights.join("key", source)
+        stream = first.subscribe()
+        assert await anext(stream) == b"a"
+
+        second = flights.join("key", source)
+        release.set()
+
+        assert second is first
+        assert [chunk async for chunk in second.subscribe()] == [b"a", b"b"]
+        assert [chunk async for chunk in stream] == [b"b"]
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_on_complete_receives_full_payload(self):
+        """Test that the completion callback receives the joined audio once the stream finishes."""
+        completed: list[bytes] = []
+
+        async def source():
+            yield b"a"
+            yield b"b"
+
+        async def store(content: bytes) -> None:
+            completed.append(content)
+
+        flights = StreamingSingleFlight()
+        assert await flights.join("key", source, on_complete=store).result() == b"ab"
+        assert completed == [b"ab"]
+        assert len(flights) == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_are_raised_to_subscribers(self):
+        """Test that a failing source raises to subscribers and does not call the completion callback."""
+        completed: list[bytes] = []
+
+        async def source():
+            yield b"a"
+            raise RuntimeError("failed")
+
+        async def store(content: bytes) -> None:
+            completed.append(content)
+
+        broadcast = Broadcast(source(), on_complete=store)
+
+        with pytest.raises(RuntimeError):
+            [chunk async for chunk in broadcast.subscribe()]
+
+        with pytest.raises(RuntimeError):
+            await broadcast.result()
+
+        assert completed == []
@@ -0,0 +1,74 @@
+import logging
+from typing import AsyncIterator
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from src.timing import PhaseTimer, ServerTimingMiddleware, current_timer, timed, timed_iter
+
+
+class TestPhaseTimer:
+    def test_header(self):
+        """Test that repeated phases are summed and reported in milliseconds, followed by the total."""
+        timer = PhaseTimer()
+        timer.add("inference", 0.010)
+        timer.add("inference", 0.0025)
+        timer.add("cache", 0.0001)
+
+        header = timer.header()
+
+        assert header.startswith("inference;dur=12.5, cache;dur=0.1, total;dur=")
+
+    def test_timed_without_request(self):
+        """Test that timing outside of a request does nothing."""
+        assert current_timer.get() is None
+
+        with timed("inference"):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_timed_iter(self):
+        """Test that waiting for each item is timed as one phase, and every item is passed through."""
+        async def items() -> AsyncIterator[int]:
+            for item in range(3):
+                yield item
+
+        timer = PhaseTimer()
+        token = current_timer.set(timer)
+
+        try:
+            assert [item async for item in timed_iter("inference", items())] == [0, 1, 2]
+        finally:
+            current_timer.reset(token)
+
+        assert list(timer.phases) == ["inference"]
+
+
+class TestServerTimingMiddleware:
+    @pytest.fixture
+    def app(self) -> FastAPI:
+        app = FastAPI()
+        app.add_middleware(ServerTimingMiddleware, log=True)
+
+        @app.get("/")
+        async def index() -> dict[str, str]:
+            with timed("cache"):
+                pass
+
+            return {"status": "ok"}
+
+        return app
+
+    def test_header_and_log(self, app: FastAPI, caplog):
+        """Test that phases recorded while handling a request are sent as Server-Timing and logged."""
+        with caplog.at_level(logging.INFO, logger="src.timing"), TestClient(app) as client:
+            response = client.get("/")
+
+        assert response.status_code == 200
+        assert response.headers["server-timing"].startswith("cache;dur=")
+        assert "total;dur=" in response.headers["server-timing"]
+
+        record = next(record for record in caplog.records if record.name == "src.timing")
+        assert record.status_code == 200
+        assert set(record.phases_ms) == {"cache"}
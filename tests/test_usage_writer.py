@@ -0,0 +1,186 @@
+import asyncio
+import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, func, select
+
+from src.database import Database
+from src.models.usage import Usage, UsageDaily, UsageHourly
+from src.models.user import User
+from src.usage_writer import UsageWriter
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    database = Database(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'usage.db'}"))
+
+    async with database.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    async with database.get_session() as session:
+        session.add(User(id=1, username="user", api_token="token"))
+        await session.commit()
+
+    yield database
+    await database.close()
+
+
+async def count_usage(database: Database) -> int:
+    async with database.get_session() as session:
+        return (await session.exec(select(func.count()).select_from(Usage))).one()
+
+
+class TestUsageWriter:
+    @pytest.mark.asyncio
+    async def test_flush_writes_pending_events(self, database: Database):
+        """Test that pending events are written in bulk and removed from the buffer."""
+        writer = UsageWriter(database, max_batch_size=2)
+
+        for characters in (5, 10, 15):
+            await writer.record(1, characters)
+
+        assert await count_usage(database) == 0
+        assert await writer.flush() == 3
+        assert len(writer) == 0
+
+        async with database.get_session() as session:
+            rows = (await session.exec(select(Usage).order_by(Usage.id))).all()
+
+        assert [row.characters_used for row in rows] == [5, 10, 15]
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_batch_is_full(self, database: Database):
+        """Test that the background writer flushes as soon as a full batch is pending."""
+        writer = UsageWriter(database, max_batch_size=3, flush_interval=60)
+        writer.start()
+
+        for _ in range(3):
+            await writer.record(1, 1)
+
+        await asyncio.sleep(0.2)
+
+        assert await count_usage(database) == 3
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_flushes_on_interval(self, database: Database):
+        """Test that a partial batch is written once the flush interval passes."""
+        writer = UsageWriter(database, max_batch_size=100, flush_interval=0.05)
+        writer.start()
+
+        await writer.record(1, 1)
+        await asyncio.sleep(0.3)
+
+        assert await count_usage(database) == 1
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_close_drains_buffer(self, database: Database):
+        """Test that closing the writer writes every event still buffered."""
+        writer = UsageWriter(database, max_batch_size=100, flush_interval=60)
+        writer.start()
+
+        for _ in range(5):
+            await writer.record(1, 1)
+
+        await writer.close()
+
+        assert await count_usage(database) == 5
+        assert len(writer) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_retried(self, database: Database, mocker):
+        """Test that events from a failed insert stay pending and are written on retry."""
+        writer = UsageWriter(database, max_batch_size=100, flush_interval=0.05, retry_interval=0.05)
+        original_write = writer._write
+        failures = [RuntimeError("database unavailable")]
+
+        async def write(rows):
+            if failures:
+                raise failures.pop()
+
+            await original_write(rows)
+
+        mocker.patch.object(writer, "_write", side_effect=write)
+
+        writer.start()
+        await writer.record(1, 1)
+        await asyncio.sleep(0.5)
+
+        assert await count_usage(database) == 1
+        assert len(writer) == 0
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_full_backlog_is_written_in_the_background(self, database: Database):
+        """Test that reaching max_pending wakes the background writer instead of writing on the request path."""
+        writer = UsageWriter(database, max_batch_size=100, flush_interval=60, max_pending=3)
+        writer.start()
+
+        for _ in range(4):
+            await writer.record(1, 1)
+
+        assert writer.dropped == 1
+        await asyncio.sleep(0.2)
+
+        assert len(writer) == 0
+        assert await count_usage(database) == 3
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_failing_flush_at_capacity_never_raises(self, database: Database, mocker):
+        """Test that recording at capacity during a database outage drops events rather than raising."""
+        writer = UsageWriter(database, max_batch_size=100, flush_interval=60, max_pending=3, retry_interval=0.05)
+        write = mocker.patch.object(writer, "_write", side_effect=RuntimeError("database unavailable"))
+        writer.start()
+
+        for _ in range(5):
+            await writer.record(1, 1)
+
+        await asyncio.sleep(0.1)
+
+        assert write.called
+        assert len(writer) == 3
+        assert writer.dropped == 2
+
+        mocker.stopall()
+        await writer.close()
+
+        assert await count_usage(database) == 3
+
+    @pytest.mark.asyncio
+    async def test_rollups_are_updated_incrementally(self, database: Database):
+        """Test that hourly and daily rollups accumulate across batches."""
+        writer = UsageWriter(database, max_batch_size=100)
+        hour = datetime.datetime(2026, 1, 1, 10)
+
+        for minute, characters in ((5, 10), (50, 20)):
+            await writer.record(1, characters)
+            writer.pending[-1]["created_at"] = hour.replace(minute=minute)
+            await writer.flush()
+
+        await writer.record(1, 5)
+        writer.pending[-1]["created_at"] = hour.replace(hour=11)
+        await writer.flush()
+
+        async with database.get_session() as session:
+            hourly = (await session.exec(select(UsageHourly).order_by(UsageHourly.bucket))).all()
+            daily = (await session.exec(select(UsageDaily))).all()
+
+        assert [(row.bucket, row.characters_used, row.requests) for row in hourly] == [
+            (hour, 30, 2),
+            (hour.replace(hour=11), 5, 1),
+        ]
+        assert [(row.bucket, row.characters_used, row.requests) for row in daily] == [
+            (datetime.date(2026, 1, 1), 35, 3),
+        ]
+
+    def test_unsupported_database_is_rejected(self, mocker):
+        """Test that a database without rollup upserts is rejected when the writer is created."""
+        database = mocker.Mock()
+        database.engine.dialect.name = "mysql"
+
+        with pytest.raises(ValueError, match="mysql"):
+            UsageWriter(database)
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from src.database import Database
+from src.models.user import User, UserChange, token_key
+from src.user_directory import UserDirectory
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path):
+    database = Database(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}"))
+
+    async with database.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    async with database.get_session() as session:
+        session.add(User(id=1, username="alice", api_token="alice-token"))
+        session.add(User(id=2, username="bob", api_token="bob-token"))
+        await session.commit()
+
+    yield database
+    await database.close()
+
+
+async def change_user(database: Database, user_id: int, operation: str, api_token: str | None = None) -> None:
+    """Apply a change and log it, as the database trigger does in Postgres."""
+    async with database.get_session() as session:
+        user = await session.get(User, user_id)
+
+        match operation:
+            case "INSERT":
+                session.add(User(id=user_id, username=f"user-{user_id}", api_token=api_token))
+            case "UPDATE":
+                user.api_token = api_token
+                session.add(user)
+            case "DELETE":
+                await session.delete(user)
+
+        session.add(UserChange(user_id=user_id, operation=operation))
+        await session.commit()
+
+
+class TestUserDirectory:
+    @pytest.mark.asyncio
+    async def test_load_indexes_users_by_token_hash(self, database: Database):
+        """Test that every user is loaded and looked up by the hash of their token."""
+        directory = UserDirectory(database)
+        await directory.load()
+
+        assert len(directory) == 2
+        assert directory.get(token_key("alice-token")).username == "alice"
+        assert directory.get("alice-token") is None
+
+    @pytest.mark.asyncio
+    async def test_sync_applies_changes(self, database: Database):
+        """Test that inserts, token changes and deletes are applied from the change log."""
+        directory = UserDirectory(database)
+        await directory.load()
+
+        await change_user(database, 3, "INSERT", api_token="carol-token")
+        await change_user(database, 1, "UPDATE", api_token="alice-rotated")
+        await change_user(database, 2, "DELETE")
+
+        assert await directory.sync() == 3
+        assert directory.get(token_key("carol-token")).username == "user-3"
+        assert directory.get(token_key("alice-rotated")).username == "alice"
+        assert directory.get(token_key("alice-token")) is None
+        assert directory.get(token_key("bob-token")) is None
+
+        # Nothing new to apply
+        assert await directory.sync() == 0
+
+    @pytest.mark.asyncio
+    async def test_late_committed_change_is_applied(self, database: Database):
+        """Test that a change whose id is below one already applied is still picked up."""
+        directory = UserDirectory(database)
+        await directory.load()
+
+        async with database.get_session() as session:
+            session.add(UserChange(id=10, user_id=1, operation="UPDATE"))
+            await session.commit()
+
+        await directory.sync()
+
+        async with database.get_session() as session:
+            user = await session.get(User, 2)
+            user.api_token = "bob-rotated"
+            session.add(user)
+            session.add(UserChange(id=5, user_id=2, operation="UPDATE"))
+            await session.commit()
+
+        assert await directory.sync() == 1
+        assert directory.get(token_key("bob-rotated")).username == "bob"
+
+    @pytest.mark.asyncio
+    async def test_polls_for_changes_in_background(self, database: Database):
+        """Test that the directory keeps up by polling when notifications are unavailable."""
+        directory = UserDirectory(database, poll_interval=0.05)
+        await directory.start()
+
+        await change_user(database, 3, "INSERT", api_token="carol-token")
+        await asyncio.sleep(0.3)
+
+        assert directory.get(token_key("carol-token")) is not None
+        await directory.close()
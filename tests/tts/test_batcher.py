@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from src.executor import BoundedExecutor
+from src.tts.batcher import InferenceBatcher
+
+
+class TestInferenceBatcher:
+    @pytest.fixture
+    def executor(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=8)
+        yield executor
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_items_are_batched(self, executor: BoundedExecutor):
+        """Test that items submitted together run as one batch and each caller gets its own output."""
+        batches: list[list[int]] = []
+
+        def run_batch(items: list[int]) -> list[int]:
+            batches.append(items)
+            return [item * 2 for item in items]
+
+        batcher = InferenceBatcher(run_batch, executor, max_batch_size=8, max_wait=0.01)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+        assert results == [0, 2, 4, 6, 8]
+        assert batches == [[0, 1, 2, 3, 4]]
+
+    @pytest.mark.asyncio
+    async def test_batches_are_capped_at_max_batch_size(self, executor: BoundedExecutor):
+        """Test that a full batch is dispatched immediately without waiting for the window."""
+        batches: list[list[int]] = []
+
+        def run_batch(items: list[int]) -> list[int]:
+            batches.append(items)
+            return items
+
+        batcher = InferenceBatcher(run_batch, executor, max_batch_size=2, max_wait=10)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(4))),
+            timeout=1,
+        )
+
+        assert results == [0, 1, 2, 3]
+        assert sorted(batches) == [[0, 1], [2, 3]]
+
+    @pytest.mark.asyncio
+    async def test_errors_are_raised_to_every_caller(self, executor: BoundedExecutor):
+        """Test that a failing batch raises to each of its callers."""
+        def run_batch(items: list[int]) -> list[int]:
+            raise RuntimeError("inference failed")
+
+        batcher = InferenceBatcher(run_batch, executor, max_batch_size=8, max_wait=0.01)
+        results = await asyncio.gather(
+            batcher.submit(1),
+            batcher.submit(2),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
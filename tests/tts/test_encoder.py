@@ -0,0 +1,94 @@
+import io
+from typing import get_args
+
+import numpy as np
+import soundfile as sf
+
+from src.configuration import Configuration
+from src.tts.encoder import StreamEncoder
+from src.tts.formats import AudioFormat, EncoderSettings, Quality
+
+
+def tone() -> np.ndarray:
+    return (np.sin(np.arange(24000) / 10) * 0.3).astype(np.float32)
+
+
+class TestStreamEncoder:
+    def test_returns_audio_incrementally(self):
+        """Test that encoded audio is available after each segment rather than only at the end."""
+        encoder = StreamEncoder(samplerate=24000, format=AudioFormat.WAV)
+        segment = np.zeros(24000, dtype=np.float32)
+
+        first = encoder.encode(segment)
+        second = encoder.encode(segment)
+        remaining = encoder.finish()
+
+        assert len(first) > 0
+        assert len(second) > 0
+
+        audio, samplerate = sf.read(io.BytesIO(first + second + remaining))
+
+        assert samplerate == 24000
+        assert len(audio) == 48000
+
+    def test_mp3(self):
+        """Test that the streamed MP3 output decodes in full, with every segment encoded as it arrives."""
+        encoder = StreamEncoder(samplerate=24000, format=AudioFormat.MP3)
+        segment = tone()
+
+        chunks = [encoder.encode(segment) for _ in range(3)]
+        chunks.append(encoder.finish())
+
+        assert all(len(chunk) > 0 for chunk in chunks[:3])
+
+        audio, samplerate = sf.read(io.BytesIO(b"".join(chunks)))
+
+        assert samplerate == 24000
+        assert len(audio) >= 3 * len(segment)
+
+    def test_every_configurable_preset_encodes(self):
+        """Test that every format and quality preset the configuration accepts encodes decodable audio."""
+        for quality in get_args(Quality):
+            configuration = Configuration(mp3_quality=quality, opus_quality=quality, ogg_quality=quality)
+
+            for format, settings in configuration.encoders.items():
+                encoder = StreamEncoder(samplerate=24000, format=format, settings=settings)
+                output = encoder.encode(tone()) + encoder.encode(tone()) + encoder.finish()
+
+                audio, _ = sf.read(io.BytesIO(output))
+                assert len(audio) >= 2 * len(tone()), (format, quality)
+
+    def test_opus(self):
+        """Test that Opus output is a decodable Ogg stream."""
+        encoder = StreamEncoder(samplerate=24000, format=AudioFormat.OPUS)
+        output = b"".join([encoder.encode(tone()), encoder.encode(tone()), encoder.finish()])
+
+        assert output.startswith(b"OggS")
+        assert b"OpusHead" in output[:128]
+
+        audio, _ = sf.read(io.BytesIO(output))
+        assert len(audio) > 0
+
+    def test_ogg_vorbis(self):
+        """Test that Ogg output is encoded with Vorbis."""
+        encoder = StreamEncoder(samplerate=24000, format=AudioFormat.OGG)
+        output = b"".join([encoder.encode(tone()), encoder.finish()])
+
+        assert output.startswith(b"OggS")
+        assert b"vorbis" in output[:128]
+
+    def test_pcm(self):
+        """Test that raw PCM is headerless 16-bit little-endian samples."""
+        encoder = StreamEncoder(samplerate=24000, format=AudioFormat.PCM)
+        segment = np.array([0.0, 0.5, -1.0, 2.0], dtype=np.float32)
+
+        assert encoder.encode(segment) == np.array([0, 16383, -32767, 32767], dtype='<i2').tobytes()
+        assert encoder.finish() == b""
+
+    def test_quality_presets_trade_size_for_quality(self):
+        """Test that a lower quality preset produces smaller output."""
+        def encode(settings: EncoderSettings) -> bytes:
+            encoder = StreamEncoder(samplerate=24000, format=AudioFormat.MP3, settings=settings)
+            return encoder.encode(tone()) + encoder.finish()
+
+        assert len(encode(EncoderSettings.preset("low"))) < len(encode(EncoderSettings.preset("high")))
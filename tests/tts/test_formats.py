@@ -0,0 +1,46 @@
+import io
+
+import numpy as np
+import soundfile as sf
+
+from src.tts.formats import AudioFormat, negotiate_format, wav_header
+
+
+class TestNegotiateFormat:
+    def test_explicit_format_wins(self):
+        """Test that an explicit format is used regardless of the Accept header."""
+        assert negotiate_format(AudioFormat.WAV, "audio/ogg") == AudioFormat.WAV
+
+    def test_defaults_to_mp3(self):
+        """Test that MP3 is used without an Accept header, or with a wildcard one."""
+        assert negotiate_format(None, None) == AudioFormat.MP3
+        assert negotiate_format(None, "*/*") == AudioFormat.MP3
+        assert negotiate_format(None, "audio/*") == AudioFormat.MP3
+
+    def test_media_types(self):
+        """Test that each supported media type selects its format."""
+        assert negotiate_format(None, "audio/mpeg") == AudioFormat.MP3
+        assert negotiate_format(None, "audio/ogg; codecs=opus") == AudioFormat.OPUS
+        assert negotiate_format(None, "audio/ogg") == AudioFormat.OGG
+        assert negotiate_format(None, "audio/wav") == AudioFormat.WAV
+        assert negotiate_format(None, "audio/L16") == AudioFormat.PCM
+
+    def test_quality_values(self):
+        """Test that the most preferred supported media type is chosen."""
+        assert negotiate_format(None, "audio/mpeg;q=0.5, audio/wav") == AudioFormat.WAV
+        assert negotiate_format(None, "audio/flac, audio/ogg;q=0.8, */*;q=0.1") == AudioFormat.OGG
+        assert negotiate_format(None, "audio/wav;q=0, audio/opus;q=0.2") == AudioFormat.OPUS
+
+    def test_unsupported_media_types_fall_back(self):
+        """Test that an Accept header naming nothing supported falls back to MP3 rather than failing."""
+        assert negotiate_format(None, "application/json") == AudioFormat.MP3
+
+
+class TestWavHeader:
+    def test_streaming_header_is_readable(self):
+        """Test that audio prefixed with the streaming header decodes."""
+        samples = np.zeros(1600, dtype='<i2').tobytes()
+        audio, samplerate = sf.read(io.BytesIO(wav_header(16000) + samples))
+
+        assert samplerate == 16000
+        assert len(audio) == 1600
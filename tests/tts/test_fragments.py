@@ -0,0 +1,192 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from src.cache import LRUCache
+from src.executor import BoundedExecutor, ExecutorSaturated
+from src.tts.formats import AudioFormat
+from src.tts.fragments import FragmentStitcher, chunk_text, split_sentences
+from src.tts.provider import TTSProvider
+
+
+class FakeProvider(TTSProvider[str]):
+    """Returns a short tone per sentence, its amplitude derived from the sentence length."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.bounded: list[bool] = []
+        self.active = 0
+        self.max_active = 0
+
+    @property
+    def name(self) -> str:
+        return "fake"
+
+    @property
+    def model_version(self) -> str:
+        return "1"
+
+    @property
+    def sample_rate(self) -> int:
+        return 16000
+
+    @property
+    def can_cache(self) -> bool:
+        return True
+
+    @staticmethod
+    def pcm(sentence: str) -> bytes:
+        return np.full(1600, len(sentence), dtype='<i2').tobytes()
+
+    async def synthesize_speech(self, voice: str, text: str, **kwargs) -> bytes:
+        assert kwargs["output_format"] == AudioFormat.PCM
+
+        self.calls.append(text)
+        self.bounded.append(kwargs["bounded"])
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+
+        await asyncio.sleep(0.01)
+
+        self.active -= 1
+        return self.pcm(text)
+
+
+async def collect(stitcher: FragmentStitcher, provider: FakeProvider, text: str, **kwargs) -> bytes:
+    return b"".join([chunk async for chunk in stitcher.stream(provider, "voice", text, **kwargs)])
+
+
+class TestSplitSentences:
+    def test_splits_on_sentence_boundaries(self):
+        """Test that text is split after sentence punctuation and on newlines."""
+        assert split_sentences("Hello there. How are you?\nFine! Thanks") == [
+            "Hello there.", "How are you?", "Fine!", "Thanks",
+        ]
+
+    def test_punctuation_only_pieces_are_merged(self):
+        """Test that pieces with nothing to speak are attached to the previous sentence."""
+        assert split_sentences("Wait. ... Okay.") == ["Wait. ...", "Okay."]
+        assert split_sentences("  ") == []
+
+
+class TestChunkText:
+    def test_sentences_are_packed_into_chunks(self):
+        """Test that whole sentences are packed together up to the limit."""
+        assert chunk_text("One two. Three. Four five six.", 16) == ["One two. Three.", "Four five six."]
+
+    def test_long_sentences_are_broken_between_words(self):
+        """Test that a sentence over the limit is broken between words, and a word over it anywhere."""
+        assert chunk_text("aaa bbb ccc ddd", 8) == ["aaa bbb", "ccc ddd"]
+        assert chunk_text("abcdefghij", 4) == ["abcd", "efgh", "ij"]
+
+
+class TestFragmentStitcher:
+    @pytest.mark.asyncio
+    async def test_only_missing_sentences_are_synthesized(self):
+        """Test that sentences shared with an earlier text are served from the cache."""
+        provider = FakeProvider()
+        stitcher = FragmentStitcher(LRUCache(max_size=None))
+
+        pcm = AudioFormat.PCM
+
+        await collect(stitcher, provider, "Your order shipped. It arrives Monday. Thanks!", output_format=pcm)
+        audio = await collect(stitcher, provider, "Your order shipped. It arrives Friday. Thanks!", output_format=pcm)
+
+        assert provider.calls == [
+            "Your order shipped.", "It arrives Monday.", "Thanks!",
+            "It arrives Friday.",
+        ]
+
+        # Sentences are stitched in order, as PCM
+        assert audio == b"".join(
+            provider.pcm(sentence) for sentence in ["Your order shipped.", "It arrives Friday.", "Thanks!"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_missing_sentences_are_synthesized_in_parallel(self):
+        """Test that missing sentences are synthesized concurrently, up to the concurrency limit."""
+        provider = FakeProvider()
+        stitcher = FragmentStitcher(LRUCache(max_size=None), concurrency=2)
+
+        await collect(stitcher, provider, "One. Two. Three. Four. Five.", output_format=AudioFormat.PCM)
+
+        assert len(provider.calls) == 5
+        assert provider.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_stitched_audio_is_encoded(self):
+        """Test that stitched fragments are encoded once, into a single stream."""
+        provider = FakeProvider()
+        stitcher = FragmentStitcher(LRUCache(max_size=None))
+
+        wav = await collect(stitcher, provider, "One. Two.", output_format=AudioFormat.WAV)
+        audio, samplerate = sf.read(io.BytesIO(wav))
+
+        assert samplerate == 16000
+        assert len(audio) == 3200
+
+        mp3 = await collect(stitcher, provider, "One. Two.", output_format=AudioFormat.MP3)
+
+        assert mp3.startswith(b"\xff")
+        assert len(provider.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_is_raised(self):
+        """Test that a failed fragment fails the stream and is not cached."""
+        provider = FakeProvider()
+        cache: LRUCache[bytes] = LRUCache(max_size=None)
+        stitcher = FragmentStitcher(cache)
+
+        async def fail(voice: str, text: str, **kwargs) -> bytes:
+            raise RuntimeError("synthesis failed")
+
+        provider.synthesize_speech = fail  # type: ignore[method-assign]
+
+        with pytest.raises(RuntimeError, match="synthesis failed"):
+            await collect(stitcher, provider, "One. Two.")
+
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_only_the_first_missing_fragment_is_bounded(self):
+        """Test that the stream is admitted by its first missing fragment and the rest are always queued."""
+        provider = FakeProvider()
+        stitcher = FragmentStitcher(LRUCache(max_size=None))
+
+        await collect(stitcher, provider, "One.", output_format=AudioFormat.PCM)
+        await collect(stitcher, provider, "One. Two. Three. Four.", output_format=AudioFormat.PCM)
+
+        assert provider.calls[:2] == ["One.", "Two."]
+        assert provider.bounded == [True, True, False, False]
+
+    @pytest.mark.asyncio
+    async def test_saturated_provider_fails_before_the_first_chunk(self):
+        """Test that a rejected first missing fragment fails the stream before any audio, even after cached ones."""
+        provider = FakeProvider()
+        stitcher = FragmentStitcher(LRUCache(max_size=None))
+        await collect(stitcher, provider, "One.", output_format=AudioFormat.PCM)
+
+        async def reject(voice: str, text: str, **kwargs) -> bytes:
+            raise ExecutorSaturated("The fake executor queue is full")
+
+        provider.synthesize_speech = reject  # type: ignore[method-assign]
+        stream = stitcher.stream(provider, "voice", "One. Two.", output_format=AudioFormat.PCM)
+
+        with pytest.raises(ExecutorSaturated):
+            await anext(stream)
+
+    @pytest.mark.asyncio
+    async def test_encoding_runs_on_the_provider_executor(self):
+        """Test that compressed encoding uses the provider's executor, outside its queue limit."""
+        provider = FakeProvider()
+        provider.executor = BoundedExecutor("fake", max_workers=1, max_queue=0)  # type: ignore[attr-defined]
+        stitcher = FragmentStitcher(LRUCache(max_size=None))
+
+        mp3 = await collect(stitcher, provider, "One. Two.", output_format=AudioFormat.MP3)
+
+        assert len(mp3) > 0
+        assert provider.executor.completed == 3  # type: ignore[attr-defined]
+        provider.executor.shutdown()  # type: ignore[attr-defined]
@@ -0,0 +1,52 @@
+from src.tts.formats import AudioFormat
+from src.tts.provider import TTSProvider
+
+
+class Provider(TTSProvider[str]):
+    def __init__(self, name: str = "polly", model_version: str = "standard") -> None:
+        self._name = name
+        self._model_version = model_version
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def model_version(self) -> str:
+        return self._model_version
+
+
+class TestGenerateCache:
+    def test_keys_are_fixed_size(self):
+        """Test that keys are the same size however long the text is."""
+        provider = Provider()
+
+        assert len(provider.generate_cache("Amy", "Hi")) == 32
+        assert len(provider.generate_cache("Amy", "word " * 200)) == 32
+
+    def test_plain_text_is_normalized(self):
+        """Test that case and whitespace differences in plain text share a key."""
+        provider = Provider()
+
+        assert provider.generate_cache("Amy", "Hello  World\n") == provider.generate_cache("amy", "hello world")
+
+    def test_ssml_is_case_sensitive(self):
+        """Test that SSML keeps its case, since markup and attribute values are significant."""
+        provider = Provider()
+        ssml = '<speak><say-as interpret-as="characters">{}</say-as></speak>'
+
+        upper = provider.generate_cache("Amy", ssml.format("AB"), text_type="ssml")
+        lower = provider.generate_cache("Amy", ssml.format("ab"), text_type="ssml")
+
+        assert upper != lower
+
+    def test_request_attributes_are_part_of_the_key(self):
+        """Test that text type, format, provider and model version each change the key."""
+        provider = Provider()
+        key = provider.generate_cache("Amy", "Hello", output_format=AudioFormat.MP3, text_type="text")
+
+        assert key == provider.generate_cache("Amy", "Hello")
+        assert key != provider.generate_cache("Amy", "Hello", text_type="ssml")
+        assert key != provider.generate_cache("Amy", "Hello", output_format=AudioFormat.OPUS)
+        assert key != Provider(name="kokoro").generate_cache("Amy", "Hello")
+        assert key != Provider(model_version="neural").generate_cache("Amy", "Hello")